@@ -0,0 +1,83 @@
+"""
+Throughput of batched RAG question answering vs the one-at-a-time loop.
+
+Runs offline: a synthetic store embedded with `FakeEmbeddingBackend`, a
+simulated embedding round trip (`--embed-latency`) and a fake answer call
+(`--generate-latency`).
+
+- loop:  per question, embed it, search one row, call the LLM (the notebook flow)
+- batch: `RAGPipeline.answer_batch` (one embedding request, one search,
+         concurrent answer calls)
+
+Usage:
+    python benchmark_rag.py --questions 50 --chunks 5000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from embeddings import BatchEmbedder, FakeEmbeddingBackend
+from rag import RAGPipeline, build_prompt
+from retriever import IndexConfig, Retriever
+from vector_store import VectorStore
+
+TOPICS = ["agents", "rerankers", "evaluation", "embeddings", "retrieval", "observability", "indexing", "routing"]
+
+
+def _fake_llm(latency: float):
+    def generate(prompt: str) -> str:
+        time.sleep(latency)
+        return f"answer ({len(prompt)} chars of prompt)"
+    return generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50, help="Questions per run")
+    parser.add_argument("--chunks", type=int, default=5000, help="Corpus size")
+    parser.add_argument("-k", type=int, default=3, help="Chunks per question")
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="Simulated embedding request time (s)")
+    parser.add_argument("--generate-latency", type=float, default=0.8, help="Simulated answer call time (s)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent answer calls")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    texts = [f"Section {i} about llama-index {rng.choice(TOPICS)} and {rng.choice(TOPICS)}" for i in range(args.chunks)]
+    questions = [f"What does the blog say about {rng.choice(TOPICS)} number {i}?" for i in range(args.questions)]
+    generate = _fake_llm(args.generate_latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        offline = FakeEmbeddingBackend()
+        store = VectorStore.from_arrays(directory, np.stack([offline.embed_one(t) for t in texts]), texts,
+                                        model=offline.model)
+        retriever = Retriever.build(store, IndexConfig(kind="flat"))
+        backend = FakeEmbeddingBackend(latency=args.embed_latency)
+
+        # No embedding cache, so neither mode gets repeat questions for free.
+        loop_embedder = BatchEmbedder(backend)
+        started = time.perf_counter()
+        for question in questions:
+            question_embeddings = np.array([loop_embedder.embed_one(question)])
+            generate(build_prompt(question, retriever.retrieve(question_embeddings, args.k)))
+        loop_s = time.perf_counter() - started
+
+        pipeline = RAGPipeline(retriever, BatchEmbedder(backend), generate, args.workers)
+        started = time.perf_counter()
+        pipeline.retrieve_batch(questions, args.k)
+        retrieve_s = time.perf_counter() - started
+        started = time.perf_counter()
+        pipeline.answer_batch(questions, args.k)
+        batch_s = time.perf_counter() - started
+
+    n = len(questions)
+    print(f"{n} questions, {args.chunks} chunks, k={args.k}, embed {args.embed_latency * 1000:.0f}ms, "
+          f"answer {args.generate_latency * 1000:.0f}ms, {args.workers} workers")
+    print(f"{'one-at-a-time loop':<22} {n / loop_s:>8.1f} questions/s")
+    print(f"{'retrieve_batch only':<22} {n / retrieve_s:>8.1f} questions/s")
+    print(f"{'answer_batch':<22} {n / batch_s:>8.1f} questions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Recall / latency / memory benchmark for the retriever index types.
+
+For each corpus, every index type in `retriever.INDEX_TYPES` is built and
+compared against the exact flat inner-product baseline:
+
+- recall@k: fraction of the true top-k found
+- p50 / p99 latency of single-query searches
+- build time and index size
+
+Corpora are the real store (`--store vector_store`) and/or synthetic
+clustered corpora (`--synthetic 100000 1000000`). Queries are perturbed
+corpus vectors, so they have close neighbours as real questions do.
+
+Usage:
+    python benchmark_retriever.py --store vector_store --synthetic 100000 1000000 --dimension 384
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from retriever import INDEX_TYPES, IndexConfig, Retriever, index_bytes, normalize
+from vector_store import VectorStore
+
+
+def _synthetic_store(directory: str, n: int, dimension: int, clusters: int = 256) -> VectorStore:
+    """Gaussian clusters around random centres; written to the store in slices to bound memory."""
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    store = None
+    for start in range(0, n, 100_000):
+        size = min(100_000, n - start)
+        vectors = centres[rng.integers(0, clusters, size)] + 0.5 * rng.standard_normal((size, dimension)).astype(np.float32)
+        texts = [""] * size
+        if store is None:
+            store = VectorStore.from_arrays(directory, vectors, texts, model="synthetic")
+        else:
+            store.append(vectors, texts)
+    return store
+
+
+def _queries(store: VectorStore, count: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    picks = np.sort(rng.choice(len(store), size=min(count, len(store)), replace=False))
+    vectors = normalize(store.vectors[picks])
+    return vectors + 0.05 * rng.standard_normal(vectors.shape).astype(np.float32)
+
+
+def _benchmark(store: VectorStore, config: IndexConfig, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    started = time.perf_counter()
+    retriever = Retriever.build(store, config)
+    build_s = time.perf_counter() - started
+
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, indices = retriever.search(query, k)
+        latencies.append(time.perf_counter() - started)
+        found.append(indices[0])
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    latencies = np.array(latencies) * 1000
+    return {
+        "kind": config.kind,
+        "build_s": build_s,
+        f"recall@{k}": recall,
+        "p50_ms": np.percentile(latencies, 50),
+        "p99_ms": np.percentile(latencies, 99),
+        "size_mb": index_bytes(retriever.index) / 2**20,
+    }
+
+
+def run(store: VectorStore, label: str, args):
+    queries = _queries(store, args.queries)
+    baseline = Retriever.build(store, IndexConfig(kind="flat"))
+    _, truth = baseline.search(queries, args.k)
+    del baseline
+
+    print(f"\n{label}: {len(store)} vectors x {store.dimension} dims, {len(queries)} queries")
+    print(f"{'index':<9} {'build':>8} {f'recall@{args.k}':>10} {'p50':>9} {'p99':>9} {'size':>9}")
+    for kind in args.kinds:
+        config = IndexConfig(kind=kind, nprobe=args.nprobe, ef_search=args.ef_search)
+        result = _benchmark(store, config, queries, truth, args.k)
+        print(f"{result['kind']:<9} {result['build_s']:>7.1f}s {result[f'recall@{args.k}']:>10.3f} "
+              f"{result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms {result['size_mb']:>7.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Real vector store directory to benchmark")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[100_000], help="Synthetic corpus sizes")
+    parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--kinds", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--queries", type=int, default=500, help="Queries per corpus")
+    parser.add_argument("-k", type=int, default=10, help="Top-k for recall")
+    parser.add_argument("--nprobe", type=int, default=16, help="IVF cells searched per query")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW search depth")
+    args = parser.parse_args()
+
+    if args.store:
+        run(VectorStore.open(args.store), "real corpus", args)
+    for n in args.synthetic:
+        with tempfile.TemporaryDirectory() as directory:
+            run(_synthetic_store(f"{directory}/store", n, args.dimension), "synthetic", args)
+
+
+if __name__ == "__main__":
+    main()
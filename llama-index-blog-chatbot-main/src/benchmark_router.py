@@ -0,0 +1,188 @@
+"""
+Cold/warm start of the persisted LlamaIndex indexes, and per-query routing
+cost of the selectors in `routing.py` against `LLMSingleSelector`.
+
+Runs offline: a synthetic vector store embedded with `FakeEmbeddingBackend`,
+the same backend behind a LlamaIndex embedding model with a simulated
+request time (`--embed-latency`), and a fake LLM for `LLMSingleSelector`
+with a simulated completion time (`--llm-latency`).
+
+- cold (from_documents): `VectorStoreIndex`/`SummaryIndex.from_documents`,
+  re-embedding every chunk (the notebook's first run)
+- cold (from store):     `index_storage.build_indexes`, reusing stored vectors
+- warm:                  `index_storage.load_indexes` from the persist dir
+- routing:               per-query latency and model calls to route and then
+  retrieve for the vector tool, and accuracy on a small labelled query set
+  (the fake LLM always picks the vector tool, so its accuracy is not reported)
+
+Usage:
+    python benchmark_router.py --chunks 2000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from llama_index.core import Document, Settings, SummaryIndex, VectorStoreIndex
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools import ToolMetadata
+
+from embeddings import FakeEmbeddingBackend
+from index_storage import build_indexes, load_indexes
+from routing import SUMMARY_TOOL, TOOL_DESCRIPTIONS, VECTOR_TOOL, create_selector
+from vector_store import VectorStore
+
+TOPICS = ["agents", "rerankers", "evaluation", "embeddings", "retrieval", "observability", "indexing", "routing"]
+
+LABELLED_QUERIES = [
+    ("Summarize the posts about evaluation", SUMMARY_TOOL),
+    ("Give me an overview of the blog's agent posts", SUMMARY_TOOL),
+    ("What are the main themes of the LlamaIndex blog?", SUMMARY_TOOL),
+    ("Key takeaways from the observability posts", SUMMARY_TOOL),
+    ("Summarise what the blog says about rerankers", SUMMARY_TOOL),
+    ("What do all the posts about RAG have in common?", SUMMARY_TOOL),
+    ("What are key features of llama-agents?", VECTOR_TOOL),
+    ("What are the two main metrics used to evaluate the performance of the different rerankers?", VECTOR_TOOL),
+    ("Which class loads an index from storage?", VECTOR_TOOL),
+    ("What chunk size does the evaluation tutorial use?", VECTOR_TOOL),
+    ("How does llama-agents handle the message queue?", VECTOR_TOOL),
+    ("Which embedding model is used in the Langfuse post?", VECTOR_TOOL),
+]
+
+
+class _OfflineEmbedding(BaseEmbedding):
+    """LlamaIndex embedding model over `FakeEmbeddingBackend` (which counts requests)."""
+
+    _backend: FakeEmbeddingBackend = PrivateAttr()
+
+    def __init__(self, backend: FakeEmbeddingBackend, **kwargs):
+        super().__init__(model_name=backend.model, **kwargs)
+        self._backend = backend
+
+    def _get_query_embedding(self, query: str):
+        return [float(x) for x in self._backend([query])[0]]
+
+    async def _aget_query_embedding(self, query: str):
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        return [[float(x) for x in vector] for vector in self._backend(list(texts))]
+
+
+class _FakeSelectorLLM(CustomLLM):
+    """Answers every prompt with a selector choice of the vector tool, after `latency` seconds."""
+
+    latency: float = 0.8
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="fake-selector-llm")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        return CompletionResponse(text='[{"choice": 2, "reason": "Simulated LLM choice"}]')
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponseGen:
+        yield self.complete(prompt, formatted, **kwargs)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def _route(name, selector, queries, choices, vector_retriever, backend, llm):
+    """Routes each query (and retrieves for the vector tool). Returns a report row."""
+    latencies, correct = [], 0
+    embed_calls, llm_calls = backend.calls, llm.calls
+    for query, expected in queries:
+        bundle = QueryBundle(query)
+        started = time.perf_counter()
+        result = selector.select(choices, bundle)
+        routed_ms = (time.perf_counter() - started) * 1000
+        chosen = choices[result.ind].name
+        if chosen == VECTOR_TOOL:
+            # Uses bundle.embedding if the selector already embedded the query.
+            vector_retriever.retrieve(bundle)
+        latencies.append(routed_ms)
+        correct += chosen == expected
+    n = len(queries)
+    return {
+        "selector": name,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "max_ms": max(latencies),
+        "embed_requests_per_query": (backend.calls - embed_calls) / n,
+        "llm_calls_per_query": (llm.calls - llm_calls) / n,
+        "accuracy": None if name.startswith("llm") else correct / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="Simulated embedding request time (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Simulated selector LLM call time (s)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    texts = [f"Title: Post {i // 5}\n\nSection {i} about llama-index {rng.choice(TOPICS)} and {rng.choice(TOPICS)}"
+             for i in range(args.chunks)]
+    offline = FakeEmbeddingBackend()
+    backend = FakeEmbeddingBackend(latency=args.embed_latency)
+    embed_model = _OfflineEmbedding(backend)
+    llm = _FakeSelectorLLM(latency=args.llm_latency)
+    Settings.embed_model = embed_model
+    Settings.llm = llm
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = VectorStore.from_arrays(f"{directory}/store", np.stack([offline.embed_one(t) for t in texts]), texts,
+                                        model=offline.model)
+
+        calls = backend.calls
+        documents = [Document(text=text) for text in texts]
+        _, from_documents_s = _timed(lambda: (VectorStoreIndex.from_documents(documents),
+                                              SummaryIndex.from_documents(documents)))
+        print(f"cold (from_documents): {from_documents_s:7.2f}s  {backend.calls - calls} embedding requests")
+
+        calls = backend.calls
+        _, from_store_s = _timed(lambda: build_indexes(store, f"{directory}/storage", embed_model))
+        print(f"cold (from store):     {from_store_s:7.2f}s  {backend.calls - calls} embedding requests")
+
+        calls = backend.calls
+        (vector_index, _), warm_s = _timed(lambda: load_indexes(f"{directory}/storage", embed_model))
+        print(f"warm (load):           {warm_s:7.2f}s  {backend.calls - calls} embedding requests")
+
+    choices = [ToolMetadata(description=TOOL_DESCRIPTIONS[name], name=name) for name in (SUMMARY_TOOL, VECTOR_TOOL)]
+    vector_retriever = vector_index.as_retriever(similarity_top_k=1)
+    queries = LABELLED_QUERIES
+    cached = create_selector("embedding", embed_model=embed_model)
+    rows = [
+        _route("llm", create_selector("llm", llm=llm, cache=False), queries, choices, vector_retriever, backend, llm),
+        _route("keyword", create_selector("keyword", cache=False), queries, choices, vector_retriever, backend, llm),
+        _route("embedding", create_selector("embedding", embed_model=embed_model, cache=False),
+               queries, choices, vector_retriever, backend, llm),
+        _route("embedding+cache (cold)", cached, queries, choices, vector_retriever, backend, llm),
+        _route("embedding+cache (warm)", cached, queries, choices, vector_retriever, backend, llm),
+    ]
+    print()
+    print(f"{'selector':24} {'p50 ms':>8} {'max ms':>8} {'embed/q':>8} {'llm/q':>6} {'accuracy':>9}")
+    for row in rows:
+        accuracy = "n/a" if row["accuracy"] is None else f"{row['accuracy']:.2f}"
+        print(f"{row['selector']:24} {row['p50_ms']:8.1f} {row['max_ms']:8.1f} "
+              f"{row['embed_requests_per_query']:8.2f} {row['llm_calls_per_query']:6.2f} {accuracy:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark: pickled embeddings vs the memory-mapped vector store.
+
+Writes a synthetic corpus in both formats, then starts fresh worker processes
+that load it and answer one query, reporting load time and memory:
+
+- pickle: unpickles `crawl_content.pkl` and a float64 `embeddings.pkl`, then
+  copies the vectors into `faiss.IndexFlatL2` (the notebook's approach)
+- store: `VectorStore.open` plus an exact search over the memory map
+
+`RssAnon` is private memory; `RssFile` is page cache shared by every process
+mapping the same files. Also times appending rows to each format.
+
+Usage:
+    python benchmark_vector_store.py --chunks 20000 --dimension 1536 --workers 4
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import VectorStore
+
+WORKER = r"""
+import json, pickle, sys, time
+started = time.perf_counter()
+import numpy as np
+mode, directory, dimension = sys.argv[1], sys.argv[2], int(sys.argv[3])
+query = np.random.default_rng(1).standard_normal((1, dimension)).astype(np.float32)
+if mode == "pickle":
+    import faiss
+    with open(f"{directory}/crawl_content.pkl", "rb") as f:
+        crawl_content = pickle.load(f)
+    with open(f"{directory}/embeddings.pkl", "rb") as f:
+        text_embeddings = pickle.load(f)
+    index = faiss.IndexFlatL2(dimension)
+    index.add(text_embeddings.astype(np.float32))
+    D, I = index.search(query, 1)
+    text = crawl_content[I[0][0]]
+else:
+    from vector_store import VectorStore
+    store = VectorStore.open(f"{directory}/vector_store")
+    D, I = store.search(query, 1)
+    text = store.text(int(I[0][0]))
+elapsed = time.perf_counter() - started
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if ":" in line)
+mb = lambda key: int(status.get(key, "0 kB").split()[0]) / 1024
+print(json.dumps({"seconds": elapsed, "rss": mb("VmRSS"), "anon": mb("RssAnon"), "file": mb("RssFile")}))
+"""
+
+
+def _write_corpus(directory: str, chunks: int, dimension: int):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks, dimension))
+    texts = [f"Title: Post {i}\n-----------\nSession title: Section\n-----------\nContent: " + "lorem ipsum " * 80
+             for i in range(chunks)]
+    with open(os.path.join(directory, "crawl_content.pkl"), "wb") as f:
+        pickle.dump(texts, f)
+    with open(os.path.join(directory, "embeddings.pkl"), "wb") as f:
+        pickle.dump(vectors, f)
+    VectorStore.from_arrays(os.path.join(directory, "vector_store"), vectors, texts, model="synthetic")
+    return rng
+
+
+def _run_workers(mode: str, directory: str, dimension: int, workers: int) -> list:
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER, mode, directory, str(dimension)],
+                         stdout=subprocess.PIPE, env=env, text=True)
+        for _ in range(workers)
+    ]
+    return [json.loads(process.communicate()[0]) for process in processes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent worker processes")
+    parser.add_argument("--append", type=int, default=100, help="Rows to append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        rng = _write_corpus(directory, args.chunks, args.dimension)
+        print(f"{args.chunks} chunks x {args.dimension} dims, {args.workers} worker processes")
+        print(f"{'format':<8} {'cold start':>11} {'RSS':>9} {'RssAnon':>9} {'RssFile':>9}  (mean per worker)")
+        for mode in ("pickle", "store"):
+            # One untimed run so both formats start from a warm page cache.
+            _run_workers(mode, directory, args.dimension, 1)
+            results = _run_workers(mode, directory, args.dimension, args.workers)
+            mean = lambda key: sum(result[key] for result in results) / len(results)
+            print(f"{mode:<8} {mean('seconds') * 1000:>9.0f}ms {mean('rss'):>7.0f}MB "
+                  f"{mean('anon'):>7.0f}MB {mean('file'):>7.0f}MB")
+
+        new_vectors = rng.standard_normal((args.append, args.dimension))
+        new_texts = ["appended chunk"] * args.append
+
+        started = time.perf_counter()
+        with open(os.path.join(directory, "crawl_content.pkl"), "rb") as f:
+            texts = pickle.load(f) + new_texts
+        with open(os.path.join(directory, "embeddings.pkl"), "rb") as f:
+            vectors = np.vstack([pickle.load(f), new_vectors])
+        with open(os.path.join(directory, "crawl_content.pkl"), "wb") as f:
+            pickle.dump(texts, f)
+        with open(os.path.join(directory, "embeddings.pkl"), "wb") as f:
+            pickle.dump(vectors, f)
+        pickle_append = time.perf_counter() - started
+
+        started = time.perf_counter()
+        VectorStore.open(os.path.join(directory, "vector_store")).append(new_vectors, new_texts)
+        store_append = time.perf_counter() - started
+        print(f"Append {args.append} rows: pickle rewrite {pickle_append * 1000:.0f}ms, "
+              f"store append {store_append * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
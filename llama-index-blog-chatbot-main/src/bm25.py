@@ -0,0 +1,203 @@
+"""
+In-process BM25 lexical index over the chunk texts.
+
+Dense retrieval is good at paraphrases but can miss queries that hinge on an
+exact name ("llama-agents", a metric or class name). This index scores those
+terms directly and is fused with the dense results in `rag.RAGPipeline`.
+
+- Postings are compact typed arrays (doc id, term frequency) per term;
+  queries score them with vectorized numpy over zero-copy views.
+- Hyphenated/dotted/underscored identifiers are indexed both whole and split
+  into parts, so "llama-agents", "llama agents" and "agents" all match.
+- `add` appends documents incrementally, `remove` tombstones them, and
+  `sync(store)` indexes rows appended to a `VectorStore` since the last call.
+- `save`/`load` write the postings as CSR numpy arrays plus a JSON vocabulary.
+
+Searches may run concurrently with each other but not with `add`.
+"""
+import json
+import math
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in is it its of on or that the this "
+    "to was were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Args:
+        k1 (float): Term-frequency saturation.
+        b (float): Document-length normalization.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._doc_ids: List[array] = []   # per term id
+        self._tfs: List[array] = []       # per term id
+        self._doc_lengths = array("i")
+        self._deleted = array("b")
+        self._live_docs = 0
+        self._total_length = 0
+        # Build of the VectorStore this index mirrors (its manifest "created_at")
+        self.store_created_at: Optional[float] = None
+
+    def __len__(self):
+        """Number of document slots, including removed ones (doc ids are positions)."""
+        return len(self._doc_lengths)
+
+    # -- indexing -----------------------------------------------------------
+
+    def add(self, texts: Iterable[str]) -> range:
+        """Appends documents; their ids continue from `len(self)`. Returns the new ids."""
+        start = len(self)
+        for doc_id, text in enumerate(texts, start):
+            counts: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_id = self.vocabulary.get(token)
+                if term_id is None:
+                    term_id = self.vocabulary[token] = len(self._doc_ids)
+                    self._doc_ids.append(array("i"))
+                    self._tfs.append(array("i"))
+                self._doc_ids[term_id].append(doc_id)
+                self._tfs[term_id].append(tf)
+            self._doc_lengths.append(len(tokens))
+            self._deleted.append(0)
+            self._live_docs += 1
+            self._total_length += len(tokens)
+        return range(start, len(self))
+
+    def remove(self, doc_ids: Iterable[int]):
+        """Tombstones documents; they stop matching and leave the BM25 statistics."""
+        for doc_id in doc_ids:
+            if not self._deleted[doc_id]:
+                self._deleted[doc_id] = 1
+                self._live_docs -= 1
+                self._total_length -= self._doc_lengths[doc_id]
+
+    def sync(self, store) -> int:
+        """Indexes rows appended to `store` (a `VectorStore`) since the last sync. Returns the count added."""
+        if self.store_created_at is None and not len(self):
+            self.store_created_at = store.manifest["created_at"]
+        if store.manifest["created_at"] != self.store_created_at or len(store) < len(self):
+            raise ValueError("The vector store was rebuilt; rebuild the BM25 index")
+        added = self.add(store.text(i) for i in range(len(self), len(store)))
+        return len(added)
+
+    @classmethod
+    def from_store(cls, store, **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        index.sync(store)
+        return index
+
+    # -- search -------------------------------------------------------------
+
+    def _scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        if not self._live_docs:
+            return scores
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32)
+        average_length = self._total_length / self._live_docs or 1.0
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            ids = np.frombuffer(self._doc_ids[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self._tfs[term_id], dtype=np.int32).astype(np.float32)
+            # Document frequency counts removed docs too; it's only used for IDF.
+            df = len(ids)
+            idf = math.log(1 + (self._live_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[ids] / average_length)
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        scores[np.frombuffer(self._deleted, dtype=np.int8).astype(bool)] = 0.0
+        return scores
+
+    def search(self, query: str, k: int = 10):
+        """Returns (scores, doc_ids) of the top-k matching documents, best first (may be fewer than k)."""
+        scores = self._scores(query)
+        matches = np.flatnonzero(scores > 0)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        order = matches[np.argsort(-scores[matches], kind="stable")]
+        return scores[order], order
+
+    def search_batch(self, queries: Sequence[str], k: int = 10) -> List[tuple]:
+        return [self.search(query, k) for query in queries]
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: str):
+        """Writes the index as CSR arrays (postings.npz) plus a JSON vocabulary."""
+        os.makedirs(path, exist_ok=True)
+        lengths = np.array([len(ids) for ids in self._doc_ids], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        concat = lambda arrays: (np.concatenate([np.frombuffer(a, dtype=np.int32) for a in arrays])
+                                 if arrays else np.zeros(0, dtype=np.int32))
+        np.savez(
+            os.path.join(path, "postings.npz"),
+            offsets=offsets,
+            doc_ids=concat(self._doc_ids),
+            tfs=concat(self._tfs),
+            doc_lengths=np.frombuffer(self._doc_lengths, dtype=np.int32),
+            deleted=np.frombuffer(self._deleted, dtype=np.int8),
+        )
+        with open(os.path.join(path, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "store_created_at": self.store_created_at,
+                       "vocabulary": self.vocabulary}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "bm25.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.vocabulary = meta["vocabulary"]
+        index.store_created_at = meta.get("store_created_at")
+        with np.load(os.path.join(path, "postings.npz")) as data:
+            offsets = data["offsets"]
+            doc_ids, tfs = data["doc_ids"], data["tfs"]
+            index._doc_ids = [array("i", doc_ids[s:e].tobytes()) for s, e in zip(offsets[:-1], offsets[1:])]
+            index._tfs = [array("i", tfs[s:e].tobytes()) for s, e in zip(offsets[:-1], offsets[1:])]
+            index._doc_lengths = array("i", data["doc_lengths"].tobytes())
+            index._deleted = array("b", data["deleted"].tobytes())
+        deleted = np.frombuffer(index._deleted, dtype=np.int8).astype(bool)
+        lengths = np.frombuffer(index._doc_lengths, dtype=np.int32)
+        index._live_docs = int((~deleted).sum())
+        index._total_length = int(lengths[~deleted].sum())
+        return index
+
+    @classmethod
+    def load_or_build(cls, store, path: Optional[str] = None, **kwargs) -> "BM25Index":
+        """Loads the index at `path` and syncs it with `store`, or builds (and saves) a new one."""
+        index = None
+        if path and os.path.exists(os.path.join(path, "bm25.json")):
+            index = cls.load(path)
+            if index.store_created_at != store.manifest["created_at"] or len(index) > len(store):
+                index = None
+        if index is None:
+            index = cls(**kwargs)
+        if index.sync(store) and path:
+            index.save(path)
+        return index
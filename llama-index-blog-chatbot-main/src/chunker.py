@@ -0,0 +1,285 @@
+"""
+Structure-aware chunking of blog posts into token-bounded records.
+
+A post's content div is flattened into text blocks (paragraphs, list items,
+quotes, code, captions) with whitespace normalized and nested duplicates
+skipped. Blocks are grouped into sections at each <h2> (or <h3> when a post
+has no <h2>). Within a section, sentences are packed into chunks of at most
+`max_tokens`, consecutive chunks overlap by about `overlap_tokens`, and chunks
+smaller than `min_tokens` are merged into a neighbour when they fit.
+
+Each `Chunk` carries its title, section, URL, character offsets into the
+post's plain text and its token count; `Chunk.to_text()` is what gets
+embedded and shown to the LLM.
+
+Usage (chunk statistics for saved pages or URLs):
+    python chunker.py saved_post.html https://www.llamaindex.ai/blog/some-post
+"""
+import argparse
+import re
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+from embeddings import count_tokens
+
+DEFAULT_MIN_TOKENS = 40
+DEFAULT_MAX_TOKENS = 350
+DEFAULT_OVERLAP_TOKENS = 40
+
+CONTENT_TAGS = ('h2', 'h3', 'p', 'blockquote', 'li', 'pre', 'figcaption')
+POST_CONTENT_CLASS = 'BlogPost_htmlPost__Z5oDL'
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+
+
+@dataclass
+class Chunk:
+    text: str
+    title: str
+    section: Optional[str]
+    url: Optional[str]
+    start: int
+    end: int
+    token_count: int
+    chunk_index: int = 0
+
+    def to_text(self) -> str:
+        header = f"Title: {self.title}"
+        if self.section:
+            header += f"\nSection: {self.section}"
+        return f"{header}\n\n{self.text}"
+
+    def metadata(self) -> dict:
+        """Everything but the text, for the vector store's metadata column."""
+        metadata = asdict(self)
+        del metadata['text']
+        return metadata
+
+
+@dataclass
+class _Unit:
+    """A contiguous span of the post's plain text: a sentence, code line or a piece of one."""
+    start: int
+    end: int
+    tokens: int  # including one for the whitespace joining it to the previous unit
+
+
+def _block_text(element) -> str:
+    if element.name == 'pre':
+        # Keep code layout, only trim trailing spaces and blank edges.
+        return "\n".join(line.rstrip() for line in element.get_text().strip("\n").splitlines())
+    return " ".join(element.get_text(" ").split())
+
+
+class Chunker:
+    """
+    Args:
+        min_tokens (int): Chunks below this are merged into a neighbour when possible.
+        max_tokens (int): Hard upper bound on chunk size (body text only).
+        overlap_tokens (int): Approximate overlap between consecutive chunks of a section.
+    """
+
+    def __init__(self, min_tokens: int = DEFAULT_MIN_TOKENS, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        if not 0 <= overlap_tokens < max_tokens or min_tokens > max_tokens:
+            raise ValueError("Expected 0 <= overlap_tokens < max_tokens and min_tokens <= max_tokens")
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @property
+    def signature(self) -> str:
+        """Identifies the chunking settings, so stored chunks can be invalidated when they change."""
+        return f"chunker-v2:{self.min_tokens}:{self.max_tokens}:{self.overlap_tokens}"
+
+    # -- parsing ------------------------------------------------------------
+
+    @staticmethod
+    def _sections(content_div):
+        """Returns (plain text, [(section title, [(start, end, is_code)])])."""
+        heading = 'h2' if content_div.find('h2') is not None else 'h3'
+        tags = set(CONTENT_TAGS) - ({'h2'} if heading == 'h3' else set())
+        parts, sections, offset = [], [(None, [])], 0
+        for element in content_div.find_all(list(tags)):
+            # A <p> inside an <li> (or a nested list) is already part of its parent's text.
+            if element.find_parent(list(tags)) is not None:
+                continue
+            text = _block_text(element)
+            if not text:
+                continue
+            if parts:
+                offset += 1  # the "\n" joining blocks
+            start, offset = offset, offset + len(text)
+            parts.append(text)
+            if element.name == heading:
+                sections.append((text, []))
+            else:
+                sections[-1][1].append((start, offset, element.name == 'pre'))
+        return "\n".join(parts), [section for section in sections if section[1]]
+
+    def _units(self, text: str, start: int, end: int, is_code: bool) -> List[_Unit]:
+        """Splits a block into sentence (or line) units, hard-splitting any unit above max_tokens."""
+        block = text[start:end]
+        if is_code:
+            spans = [(m.start(), m.end()) for m in re.finditer(r'[^\n]+(?:\n|$)', block)]
+        else:
+            spans, last = [], 0
+            for match in _SENTENCE_END.finditer(block):
+                spans.append((last, match.start()))
+                last = match.end()
+            spans.append((last, len(block)))
+
+        units = []
+        for span_start, span_end in spans:
+            span_text = block[span_start:span_end].rstrip()
+            if not span_text.strip():
+                continue
+            tokens = count_tokens(span_text) + 1
+            if tokens <= self.max_tokens:
+                units.append(_Unit(start + span_start, start + span_start + len(span_text), tokens))
+                continue
+            # Oversized sentence or line: split at word boundaries into the
+            # longest pieces that fit (found by bisection over word counts).
+            # A single word too long to fit (a URL, a minified line) is split
+            # between characters instead.
+            words = []
+            for m in re.finditer(r'\S+', span_text):
+                if count_tokens(m.group()) + 1 <= self.max_tokens:
+                    words.append((m.start(), m.end()))
+                else:
+                    words.extend((i, i + 1) for i in range(m.start(), m.end()))
+            first = 0
+            while first < len(words):
+                lo, hi = first + 1, len(words)
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if count_tokens(span_text[words[first][0]:words[mid - 1][1]]) + 1 <= self.max_tokens:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                piece_start, piece_end = words[first][0], words[lo - 1][1]
+                units.append(_Unit(start + span_start + piece_start, start + span_start + piece_end,
+                                   count_tokens(span_text[piece_start:piece_end]) + 1))
+                first = lo
+        return units
+
+    def _pack(self, units: List[_Unit]) -> List[List[_Unit]]:
+        """Greedily packs units into groups of at most max_tokens, overlapping consecutive groups."""
+        groups, current, current_tokens = [], [], 0
+        for unit in units:
+            if current and current_tokens + unit.tokens > self.max_tokens:
+                groups.append(current)
+                # Carry trailing units over as overlap, leaving room for the new unit.
+                overlap, overlap_tokens = [], 0
+                for previous in reversed(current):
+                    if overlap_tokens + previous.tokens > self.overlap_tokens or \
+                            overlap_tokens + previous.tokens + unit.tokens > self.max_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous.tokens
+                current, current_tokens = overlap, overlap_tokens
+            current.append(unit)
+            current_tokens += unit.tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    # -- chunking -----------------------------------------------------------
+
+    def chunk(self, content_div, title: str, url: Optional[str] = None) -> List[Chunk]:
+        """Chunks a post's content div (a BeautifulSoup element)."""
+        if content_div is None:
+            return []
+        text, sections = self._sections(content_div)
+
+        chunks: List[Chunk] = []
+        for section, blocks in sections:
+            units = [unit for start, end, is_code in blocks for unit in self._units(text, start, end, is_code)]
+            for group in self._pack(units):
+                # Unit counts are estimates: tokens can merge or split across the whitespace
+                # between units, so the joined text is recounted and, when it runs over,
+                # trailing units move to a chunk of their own.
+                while group:
+                    fit = len(group)
+                    token_count = count_tokens(text[group[0].start:group[-1].end])
+                    while token_count > self.max_tokens and fit > 1:
+                        fit -= 1
+                        token_count = count_tokens(text[group[0].start:group[fit - 1].end])
+                    start, end = group[0].start, group[fit - 1].end
+                    chunks.append(Chunk(text=text[start:end], title=title, section=section, url=url,
+                                        start=start, end=end, token_count=token_count))
+                    group = group[fit:]
+
+        chunks = self._merge_small(chunks, text)
+        for index, chunk in enumerate(chunks):
+            chunk.chunk_index = index
+        return chunks
+
+    def _merge_small(self, chunks: List[Chunk], text: str) -> List[Chunk]:
+        """Merges chunks below min_tokens into the previous chunk when the union fits in max_tokens."""
+        merged: List[Chunk] = []
+        for chunk in chunks:
+            previous = merged[-1] if merged else None
+            if previous and (chunk.token_count < self.min_tokens or previous.token_count < self.min_tokens):
+                start, end = previous.start, max(previous.end, chunk.end)
+                token_count = count_tokens(text[start:end])
+                if token_count <= self.max_tokens:
+                    sections = [s for s in dict.fromkeys((previous.section, chunk.section)) if s]
+                    merged[-1] = Chunk(text=text[start:end], title=chunk.title, section=" / ".join(sections) or None,
+                                       url=chunk.url, start=start, end=end, token_count=token_count)
+                    continue
+            merged.append(chunk)
+        return merged
+
+    def chunk_html(self, html, url: Optional[str] = None) -> List[Chunk]:
+        """Chunks a full blog post page (HTML string/bytes or a parsed BeautifulSoup)."""
+        soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+        title = soup.find('h1')
+        title = " ".join(title.get_text(" ").split()) if title else "No title found"
+        return self.chunk(soup.find('div', class_=POST_CONTENT_CLASS), title, url)
+
+
+def chunk_stats(chunks: List[Chunk]) -> dict:
+    """Chunk count and token distribution."""
+    tokens = np.array([chunk.token_count for chunk in chunks]) if chunks else np.zeros(1)
+    return {
+        "chunks": len(chunks),
+        "total_tokens": int(tokens.sum()),
+        "min": int(tokens.min()),
+        "p50": int(np.percentile(tokens, 50)),
+        "p95": int(np.percentile(tokens, 95)),
+        "max": int(tokens.max()),
+        "mean": float(tokens.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="+", help="Saved HTML files or URLs of blog posts")
+    parser.add_argument("--min-tokens", type=int, default=DEFAULT_MIN_TOKENS)
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    args = parser.parse_args()
+
+    chunker = Chunker(args.min_tokens, args.max_tokens, args.overlap_tokens)
+    chunks = []
+    for page in args.pages:
+        if page.startswith(("http://", "https://")):
+            from crawler import create_session
+
+            html = create_session(pool_size=1).get(page, timeout=10).content
+        else:
+            with open(page, 'rb') as f:
+                html = f.read()
+        page_chunks = chunker.chunk_html(html, url=page)
+        print(f"{page}: {chunk_stats(page_chunks)}")
+        chunks.extend(page_chunks)
+    if len(args.pages) > 1:
+        print(f"total: {chunk_stats(chunks)}")
+
+
+if __name__ == "__main__":
+    main()
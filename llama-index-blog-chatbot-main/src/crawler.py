@@ -0,0 +1,325 @@
+"""
+Incremental, concurrent crawler for the LlamaIndex blog.
+
+- Posts are fetched by a bounded thread pool that shares one pooled
+  `requests.Session` (keep-alive, retries on transient errors).
+- Requests are rate limited per host, so more workers never means more
+  pressure on a single site than `requests_per_second`.
+- Every post's ETag, Last-Modified and a hash of its article body are kept in
+  a JSON state file. Re-runs send conditional requests and only re-chunk posts
+  whose content actually changed; unchanged posts reuse their stored chunks.
+- Posts are split by `chunker.Chunker` into token-bounded `Chunk` records;
+  changing the chunker settings re-chunks every post on the next run.
+
+Usage:
+    python crawler.py --state crawl_state.json --output crawl_content.pkl
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from chunker import POST_CONTENT_CLASS, Chunk, Chunker, chunk_stats
+
+BLOG_URL = "https://www.llamaindex.ai/blog"
+BASE_URL = "https://www.llamaindex.ai"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+DEFAULT_TIMEOUT = 10
+
+CARD_CLASS = 'CardBlog_card__mm0Zw'
+CARD_TITLE_CLASS = 'CardBlog_title__qC51U'
+
+
+def create_session(pool_size: int = DEFAULT_MAX_WORKERS, retries: int = 3) -> requests.Session:
+    """Returns a session with a connection pool sized for `pool_size` concurrent workers."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1 / `requests_per_second` apart."""
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        # Sleep outside the lock so other hosts aren't held up.
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _post_content(soup: BeautifulSoup):
+    """Returns (title, content div) of a parsed blog post page."""
+    blog_title = soup.find('h1')
+    blog_title = " ".join(blog_title.get_text(" ").split()) if blog_title else "No title found"
+    return blog_title, soup.find('div', class_=POST_CONTENT_CLASS)
+
+
+def extract_blog_content(url: str, session: Optional[requests.Session] = None,
+                         chunker: Optional[Chunker] = None) -> List[Chunk]:
+    """Fetches one blog post and returns its chunks (no caching)."""
+    session = session or create_session(pool_size=1)
+    chunker = chunker or Chunker()
+    r = session.get(url, timeout=DEFAULT_TIMEOUT)
+    r.raise_for_status()
+    blog_title, content_div = _post_content(BeautifulSoup(r.content, 'html.parser'))
+    return chunker.chunk(content_div, blog_title, url)
+
+
+def list_blog_posts(session: requests.Session, blog_url: str = BLOG_URL, base_url: str = BASE_URL,
+                    rate_limiter: Optional[HostRateLimiter] = None) -> List[str]:
+    """Returns the post URLs linked from the blog index page, in page order."""
+    if rate_limiter is not None:
+        rate_limiter.wait(blog_url)
+    r = session.get(blog_url, timeout=DEFAULT_TIMEOUT)
+    r.raise_for_status()
+    soup = BeautifulSoup(r.content, 'html.parser')
+
+    urls = []
+    for card in soup.find_all('div', class_=CARD_CLASS):
+        title_element = card.find('p', class_=CARD_TITLE_CLASS)
+        link = title_element.find('a') if title_element else None
+        if link and link.get('href'):
+            url = urljoin(base_url, link['href'])
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+@dataclass
+class PageState:
+    """What we know about a post from the last crawl."""
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    chunks: List[dict] = field(default_factory=list)  # Chunk fields
+    chunker: Optional[str] = None  # Chunker.signature the chunks were made with
+    fetched_at: float = 0.0
+
+
+@dataclass
+class CrawlResult:
+    """
+    Outcome of one crawl.
+
+    `chunks` holds the chunks of every known post in blog order, `changed`
+    the URLs whose chunks are new or different from the previous run.
+    """
+    chunks: List[Chunk] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.changed)} changed, {len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed, {len(self.failed)} failed; "
+            f"{len(self.chunks)} chunks in {self.elapsed:.1f}s"
+        )
+
+    def texts(self) -> List[str]:
+        """The chunks as the texts to embed."""
+        return [chunk.to_text() for chunk in self.chunks]
+
+    def metadatas(self) -> List[dict]:
+        return [chunk.metadata() for chunk in self.chunks]
+
+
+class BlogCrawler:
+    """
+    Crawls the blog index and its posts concurrently, reusing previous results.
+
+    Args:
+        state_path (str, optional): JSON file with per-post ETag, Last-Modified,
+            content hash and chunks. None keeps state in memory only.
+        max_workers (int): Concurrent fetches (also the connection pool size).
+        requests_per_second (float): Per-host request rate limit; 0 disables it.
+        timeout (float): Per-request timeout in seconds.
+        session (requests.Session, optional): Session to use instead of a new pooled one.
+        chunker (Chunker, optional): How posts are split; defaults to `Chunker()`.
+    """
+
+    def __init__(
+        self,
+        state_path: Optional[str] = "crawl_state.json",
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        timeout: float = DEFAULT_TIMEOUT,
+        session: Optional[requests.Session] = None,
+        chunker: Optional[Chunker] = None,
+    ):
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or create_session(pool_size=max_workers)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.chunker = chunker or Chunker()
+        self.pages: Dict[str, PageState] = self._load_state()
+
+    def _load_state(self) -> Dict[str, PageState]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            # Pages saved before chunks were structured records are crawled afresh.
+            return {url: PageState(**page) for url, page in json.load(f).items() if page.get('chunker')}
+
+    def save_state(self):
+        """Writes the state file atomically, so an interrupted run never leaves it half-written."""
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({url: asdict(page) for url, page in self.pages.items()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _get(self, url: str, headers: Optional[dict] = None) -> requests.Response:
+        self.rate_limiter.wait(url)
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def _fetch(self, url: str) -> tuple:
+        """Returns (PageState, changed) for one post, using a conditional request when possible."""
+        previous = self.pages.get(url)
+        if previous and previous.chunker != self.chunker.signature:
+            # Chunked with other settings: the stored chunks can't be reused.
+            previous = None
+        headers = {}
+        if previous and previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous and previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+
+        r = self._get(url, headers=headers)
+        if r.status_code == 304 and previous:
+            previous.fetched_at = time.time()
+            return previous, False
+        r.raise_for_status()
+
+        blog_title, content_div = _post_content(BeautifulSoup(r.content, 'html.parser'))
+        # Hash only the article itself: the surrounding page changes with every
+        # site deploy (build IDs, related posts) even when the post doesn't.
+        content_hash = hashlib.sha256(f"{blog_title}\n{content_div}".encode('utf-8')).hexdigest()
+        page = PageState(
+            url=url,
+            etag=r.headers.get('ETag'),
+            last_modified=r.headers.get('Last-Modified'),
+            content_hash=content_hash,
+            chunker=self.chunker.signature,
+            fetched_at=time.time(),
+        )
+        if previous and previous.content_hash == content_hash:
+            page.chunks = previous.chunks
+            return page, False
+        page.chunks = [asdict(chunk) for chunk in self.chunker.chunk(content_div, blog_title, url)]
+        return page, True
+
+    def crawl(self, urls: Optional[List[str]] = None) -> CrawlResult:
+        """
+        Crawls `urls` (default: every post on the blog index) and updates the state file.
+
+        Posts that fail to download, parse or chunk keep their previous chunks,
+        if any, and are reported in `CrawlResult.failed`. Posts no longer listed are dropped.
+        """
+        started = time.perf_counter()
+        result = CrawlResult()
+        if urls is None:
+            urls = list_blog_posts(self.session, rate_limiter=self.rate_limiter)
+
+        def fetch(url):
+            try:
+                return url, self._fetch(url), None
+            except requests.RequestException as e:
+                return url, None, str(e)
+            except Exception as e:
+                # A malformed page fails only its own post, not the whole crawl.
+                return url, None, f"{type(e).__name__}: {e}"
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetched = list(executor.map(fetch, urls))
+
+        for url, outcome, error in fetched:
+            if error is not None:
+                result.failed[url] = error
+                continue
+            page, changed = outcome
+            self.pages[url] = page
+            (result.changed if changed else result.unchanged).append(url)
+
+        listed = set(urls)
+        result.removed = [url for url in self.pages if url not in listed]
+        for url in result.removed:
+            del self.pages[url]
+
+        for url in urls:
+            if url in self.pages:
+                result.chunks.extend(Chunk(**chunk) for chunk in self.pages[url].chunks)
+
+        self.save_state()
+        result.elapsed = time.perf_counter() - started
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--state", default="crawl_state.json", help="Crawl state file")
+    parser.add_argument("--output", default="crawl_content.pkl", help="Where to pickle the list of chunk texts")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent fetches")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Requests per second per host (0 = unlimited)")
+    args = parser.parse_args()
+
+    crawler = BlogCrawler(state_path=args.state, max_workers=args.workers, requests_per_second=args.rps)
+    result = crawler.crawl()
+    print(result.summary())
+    print(f"chunk tokens: {chunk_stats(result.chunks)}")
+    for url, error in result.failed.items():
+        print(f"  failed: {url}: {error}")
+
+    with open(args.output, 'wb') as crawl_file:
+        pickle.dump(result.texts(), crawl_file)
+
+
+if __name__ == "__main__":
+    main()
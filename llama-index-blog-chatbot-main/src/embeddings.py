@@ -0,0 +1,309 @@
+"""
+Batched, cached embedding generation for the RAG ingestion pipeline.
+
+- `BatchEmbedder.embed(texts)` packs texts into requests bounded by input count
+  and total tokens and sends the batches concurrently.
+- `EmbeddingCache` stores vectors in SQLite keyed by (model, sha256(text)), so
+  re-ingesting the blog only embeds chunks that are new or changed.
+- `OpenAIEmbeddingBackend` calls the OpenAI embeddings API through the
+  chatbot's shared `llm_control` controller (see `llm_controller`), so
+  ingestion and query embedding get the same retries, `retry-after` pauses,
+  AIMD concurrency limit and circuit breaker as every other LLM call;
+  `FakeEmbeddingBackend` is a deterministic offline stand-in for tests and benchmarks.
+
+Usage:
+    python embeddings.py --input crawl_content.pkl --output vector_store
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from vector_store import VectorStore
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding can't be downloaded
+    _encoding = None
+
+DEFAULT_MODEL = "text-embedding-3-small"
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_TOKENS = 100_000
+DEFAULT_MAX_INPUT_TOKENS = 8191
+DEFAULT_MAX_WORKERS = 4
+SIMPLE_CHATBOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  "simple_chatbot")
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else _encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def llm_controller(model: str):
+    """
+    Returns the process-wide `llm_control.LLMController` for `model`'s provider.
+
+    The controller lives in `simple_chatbot/`, next to this project; in the
+    Streamlit app it is the same one that runs the chat calls.
+    """
+    if SIMPLE_CHATBOT_DIR not in sys.path:
+        sys.path.append(SIMPLE_CHATBOT_DIR)
+    from llm_control import get_controller, provider_for
+
+    return get_controller(provider_for(model))
+
+
+class OpenAIEmbeddingBackend:
+    """
+    Embeds a batch of texts with one `client.embeddings.create` call, run by
+    the provider's `LLMController` (the client's own retries are turned off).
+    """
+
+    def __init__(self, client=None, model: str = DEFAULT_MODEL, dimensions: Optional[int] = None,
+                 controller=None):
+        import openai
+
+        self.client = (client or openai.OpenAI()).with_options(max_retries=0)
+        self.model = model
+        self.dimensions = dimensions
+        self.controller = controller or llm_controller(model)
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        params = {"model": self.model, "input": texts}
+        if self.dimensions is not None:
+            params["dimensions"] = self.dimensions
+        response = self.controller.call(self.client.embeddings.create, timeout_arg="timeout", **params)
+        # The API doesn't promise to keep input order; `index` does.
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class FakeEmbeddingBackend:
+    """
+    Deterministic offline embeddings: hashed bag-of-words, L2-normalized.
+
+    Texts sharing words get similar vectors, so retrieval over fake embeddings
+    still behaves sensibly. `latency` simulates the per-request round trip.
+    """
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.0, model: str = "fake-embedding"):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+        self.texts_embedded = 0
+        self._lock = threading.Lock()
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            self.texts_embedded += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self.embed_one(text) for text in texts]
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store (SQLite, float32 blobs).
+
+    Args:
+        path (str): Database file; ":memory:" keeps the cache in memory only.
+    """
+
+    def __init__(self, path: str = "embeddings_cache.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(hashes), 500):
+                part = list(hashes[start:start + 500])
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(part))})",
+                    [model, *part],
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                 for text_hash, vector in vectors.items()],
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts with few requests, reusing cached vectors.
+
+    Args:
+        backend: Callable taking a list of texts and returning one vector per
+            text, e.g. `OpenAIEmbeddingBackend` or `FakeEmbeddingBackend`.
+            Retries and pacing are the backend's (its `LLMController`).
+        model (str, optional): Cache namespace; defaults to `backend.model`.
+        cache (EmbeddingCache, optional): Where to look up and store vectors.
+        max_batch_size (int): Maximum texts per request.
+        max_batch_tokens (int): Maximum total tokens per request.
+        max_input_tokens (int): Longer texts are truncated to this many tokens.
+        max_workers (int): Batches in flight at once (the controller may allow fewer).
+    """
+
+    def __init__(
+        self,
+        backend,
+        model: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_input_tokens: int = DEFAULT_MAX_INPUT_TOKENS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        self.backend = backend
+        self.model = model or getattr(backend, "model", DEFAULT_MODEL)
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_input_tokens = max_input_tokens
+        self.max_workers = max_workers
+        self._stats_lock = threading.Lock()
+        self.stats = {"texts": 0, "cache_hits": 0, "embedded": 0, "requests": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        # `embed` is called from several threads at once (retrieval, RAG answering).
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        """Greedily packs texts into batches within the size and token limits."""
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = min(count_tokens(text), self.max_input_tokens)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[np.ndarray]:
+        inputs = [_truncate(text, self.max_input_tokens) for text in batch]
+        self._count("requests")
+        return [np.asarray(vector, dtype=np.float32) for vector in self.backend(inputs)]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns a float32 array with one row per text, in input order."""
+        texts = list(texts)
+        self._count("texts", len(texts))
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, list(set(hashes))) if self.cache is not None else {}
+        self._count("cache_hits", sum(1 for text_hash in hashes if text_hash in vectors))
+
+        # Embed each distinct uncached text once.
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+        if missing:
+            batches = self._batches(list(missing.values()))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+            new_vectors = {}
+            for batch, batch_vectors in zip(batches, results):
+                for text, vector in zip(batch, batch_vectors):
+                    new_vectors[EmbeddingCache.text_hash(text)] = vector
+            self._count("embedded", len(new_vectors))
+            if self.cache is not None:
+                self.cache.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[text_hash] for text_hash in hashes])
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Embeds a single text (e.g. a query), using the cache like `embed`."""
+        return self.embed([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default="crawl_content.pkl", help="Pickled list of chunks")
+    parser.add_argument("--output", default="vector_store", help="Vector store directory to write")
+    parser.add_argument("--cache", default="embeddings_cache.sqlite", help="Embedding cache database")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="OpenAI embedding model")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent requests")
+    parser.add_argument("--fake", action="store_true", help="Use the offline fake backend")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as crawl_file:
+        crawl_content = pickle.load(crawl_file)
+
+    backend = FakeEmbeddingBackend() if args.fake else OpenAIEmbeddingBackend(model=args.model)
+    embedder = BatchEmbedder(backend, cache=EmbeddingCache(args.cache), max_workers=args.workers)
+    started = time.perf_counter()
+    text_embeddings = embedder.embed(crawl_content)
+    print(f"Embedded {len(crawl_content)} chunks in {time.perf_counter() - started:.1f}s: {embedder.stats}")
+
+    VectorStore.from_arrays(args.output, text_embeddings, crawl_content, model=embedder.model)
+
+
+if __name__ == "__main__":
+    main()
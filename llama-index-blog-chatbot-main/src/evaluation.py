@@ -0,0 +1,402 @@
+"""
+Concurrent, resumable RAG evaluation over a whole question set.
+
+- Every LLM call (answers and judges) takes its budget from one shared
+  `TokenBucket` (requests and tokens per minute), so concurrent workers stay
+  under the account's rate limits instead of tripping them and backing off.
+- Retrieval runs once for all pending questions (`RAGPipeline.retrieve_batch`),
+  and each question's answer and contexts are computed once and reused by every
+  evaluator.
+- Results are appended per question to a JSON-lines checkpoint. An interrupted
+  run resumes where it stopped, and adding an evaluator later only runs that
+  evaluator on the stored answers.
+- Faithfulness (is the answer supported by the contexts?) and relevancy (do
+  the answer and contexts address the question?) are YES/NO LLM judgments, as
+  in LlamaIndex's evaluators. The report adds throughput, token usage and cost.
+
+`--stub` runs offline with a deterministic stub LLM and `FakeEmbeddingBackend`
+(the store must be built with it, e.g. `python embeddings.py --fake`).
+
+Usage:
+    python evaluation.py --questions questions.jsonl --checkpoint eval_results.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from embeddings import count_tokens
+
+DEFAULT_RPM = 3500
+DEFAULT_TPM = 90_000
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_COMPLETION_TOKENS = 512
+# USD per 1K tokens (gpt-3.5-turbo)
+DEFAULT_PROMPT_PRICE = 0.0005
+DEFAULT_COMPLETION_PRICE = 0.0015
+
+FAITHFULNESS_TEMPLATE = """Please tell if a given piece of information is supported by the context.
+You need to answer with either YES or NO.
+Answer YES if any of the context supports the information, even if most of the context is unrelated.
+Then give a one-sentence reason.
+
+Information: {answer}
+Context:
+{context}
+Answer: """
+
+RELEVANCY_TEMPLATE = """Your task is to evaluate if the response for the query is in line with the context information provided.
+You need to answer with either YES or NO.
+Answer YES if the response for the query is in line with the context information, otherwise NO.
+Then give a one-sentence reason.
+
+Query and Response:
+{question}
+{answer}
+Context:
+{context}
+Answer: """
+
+
+class TokenBucket:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by every LLM caller.
+
+    Both buckets start full and refill continuously. `acquire` blocks until a
+    request and its token estimate fit; `refund` returns unused tokens.
+    0 disables a limit. `waited` is the total time callers spent blocked.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int):
+        # A single request larger than the whole bucket waits for a full bucket.
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+        while True:
+            with self._lock:
+                self._refill()
+                missing_requests = 1 - self._requests if self.rpm else 0
+                missing_tokens = tokens - self._tokens if self.tpm else 0
+                if missing_requests <= 0 and missing_tokens <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+                wait = max(missing_requests * 60 / self.rpm if self.rpm else 0,
+                           missing_tokens * 60 / self.tpm if self.tpm else 0)
+                self.waited += wait
+            time.sleep(wait)
+
+    def refund(self, tokens: int):
+        if tokens > 0 and self.tpm:
+            with self._lock:
+                self._tokens = min(self.tpm, self._tokens + tokens)
+
+
+def _default_retryable_errors() -> tuple:
+    try:
+        import openai
+    except ImportError:
+        return ConnectionError, TimeoutError
+    return openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError
+
+
+class LimitedLLM:
+    """
+    A `prompt -> text` function that draws on a shared `TokenBucket`, retries
+    rate-limit and transient errors with exponential backoff, and counts usage.
+
+    Args:
+        generate (callable): `prompt -> text`, e.g. `rag.openai_generator(client)`.
+        bucket (TokenBucket): Shared rate-limit budget.
+        max_completion_tokens (int): Tokens reserved per call for the reply.
+        retryable_errors (tuple, optional): Errors to retry (default: OpenAI's transient errors).
+    """
+
+    def __init__(self, generate: Callable[[str], str], bucket: TokenBucket,
+                 max_completion_tokens: int = DEFAULT_MAX_COMPLETION_TOKENS,
+                 retryable_errors: Optional[tuple] = None, max_retries: int = 6, initial_delay: float = 1.0):
+        self.generate = generate
+        self.bucket = bucket
+        self.max_completion_tokens = max_completion_tokens
+        self.retryable_errors = retryable_errors or _default_retryable_errors()
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.stats = {"calls": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def __call__(self, prompt: str) -> str:
+        prompt_tokens = count_tokens(prompt)
+        reserved = prompt_tokens + self.max_completion_tokens
+        delay = self.initial_delay
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire(reserved)
+            try:
+                reply = self.generate(prompt)
+                break
+            except self.retryable_errors:
+                if attempt == self.max_retries:
+                    raise
+                self._count(retries=1)
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+        completion_tokens = count_tokens(reply)
+        self.bucket.refund(self.max_completion_tokens - completion_tokens)
+        self._count(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return reply
+
+    def cost(self, prompt_price: float = DEFAULT_PROMPT_PRICE,
+             completion_price: float = DEFAULT_COMPLETION_PRICE) -> float:
+        """USD spent so far, given prices per 1K prompt and completion tokens."""
+        return (self.stats["prompt_tokens"] * prompt_price + self.stats["completion_tokens"] * completion_price) / 1000
+
+
+@dataclass
+class JudgeEvaluator:
+    """A YES/NO LLM judgment of one answer; the score is 1.0 for YES and 0.0 otherwise."""
+    name: str
+    template: str
+
+    def __call__(self, llm: Callable[[str], str], question: str, answer: str, contexts: Sequence[str]) -> dict:
+        reply = llm(self.template.format(question=question, answer=answer, context="\n\n".join(contexts)))
+        passing = reply.strip().upper().startswith("YES")
+        return {"passing": passing, "score": 1.0 if passing else 0.0, "feedback": reply.strip()}
+
+
+EVALUATORS = {
+    "faithfulness": JudgeEvaluator("faithfulness", FAITHFULNESS_TEMPLATE),
+    "relevancy": JudgeEvaluator("relevancy", RELEVANCY_TEMPLATE),
+}
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(question.encode("utf-8")).hexdigest()[:16]
+
+
+def load_questions(path: str) -> List[dict]:
+    """
+    Reads a question set: JSON lines or a JSON list of {"question", optional "id"},
+    or plain text with one question per line.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        items = json.loads(content)
+    elif path.endswith(".jsonl"):
+        items = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        items = [{"question": line.strip()} for line in content.splitlines() if line.strip()]
+    items = [{"question": item} if isinstance(item, str) else dict(item) for item in items]
+    for item in items:
+        item.setdefault("id", question_id(item["question"]))
+    return items
+
+
+class EvalCheckpoint:
+    """
+    Per-question results as append-only JSON lines; the last line for an id wins.
+    A torn final line (from an interrupted write) is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["id"]] = record
+
+    def save(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.records[record["id"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _missing(record: Optional[dict], evaluators: Sequence[str]) -> List[str]:
+    done = (record or {}).get("evaluations", {})
+    return [name for name in evaluators if name not in done]
+
+
+def run_evaluation(pipeline, llm: LimitedLLM, questions: Sequence[dict], checkpoint: EvalCheckpoint,
+                   evaluators: Sequence[str] = tuple(EVALUATORS), k: int = 3,
+                   workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    Answers and evaluates every question not already complete in `checkpoint`.
+
+    Args:
+        pipeline (RAGPipeline): Retrieval for the questions (its `generate` is not used).
+        llm (LimitedLLM): Answers and judges, under the shared rate limit.
+        questions: Items from `load_questions`.
+        checkpoint (EvalCheckpoint): Where results are read from and appended to.
+        evaluators: Names from EVALUATORS.
+        k (int): Chunks retrieved per question.
+        workers (int): Questions processed concurrently.
+
+    Returns:
+        dict: Scores over all completed questions, plus this run's throughput and usage.
+    """
+    from rag import build_prompt
+
+    started = time.perf_counter()
+    pending = [item for item in questions if _missing(checkpoint.records.get(item["id"]), evaluators)]
+    to_answer = [item for item in pending if "answer" not in checkpoint.records.get(item["id"], {})]
+
+    # One batched retrieval for every question that still needs an answer.
+    retrieved = dict(zip(
+        (item["id"] for item in to_answer),
+        pipeline.retrieve_batch([item["question"] for item in to_answer], k) if to_answer else [],
+    ))
+
+    def process(item: dict) -> dict:
+        record = dict(checkpoint.records.get(item["id"]) or {"id": item["id"], "question": item["question"]})
+        record.setdefault("evaluations", {})
+        if "answer" not in record:
+            chunks = retrieved[item["id"]]
+            answer_started = time.perf_counter()
+            record["answer"] = llm(build_prompt(item["question"], chunks))
+            record["answer_seconds"] = time.perf_counter() - answer_started
+            record["contexts"] = [chunk.text for chunk in chunks]
+            record["sources"] = [chunk.index for chunk in chunks]
+            checkpoint.save(record)
+        for name in _missing(record, evaluators):
+            record["evaluations"] = {**record["evaluations"],
+                                     name: EVALUATORS[name](llm, record["question"], record["answer"], record["contexts"])}
+        checkpoint.save(record)
+        return record
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process, item): item for item in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed[futures[future]["id"]] = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+
+    ids = {item["id"] for item in questions}
+    complete = [r for r in checkpoint.records.values() if r["id"] in ids and not _missing(r, evaluators)]
+    scores = {
+        name: sum(r["evaluations"][name]["score"] for r in complete) / len(complete) if complete else None
+        for name in evaluators
+    }
+    processed = len(pending) - len(failed)
+    return {
+        "questions": len(questions),
+        "complete": len(complete),
+        "resumed": len(questions) - len(pending),
+        "processed": processed,
+        "failed": failed,
+        "scores": scores,
+        "elapsed_s": elapsed,
+        "questions_per_s": processed / elapsed if elapsed else 0.0,
+        "llm": dict(llm.stats),
+        "tokens_per_min": (llm.stats["prompt_tokens"] + llm.stats["completion_tokens"]) * 60 / elapsed if elapsed else 0.0,
+        "rate_limit_wait_s": llm.bucket.waited,
+    }
+
+
+def stub_llm(latency: float = 0.05) -> Callable[[str], str]:
+    """
+    Deterministic offline LLM: answers with the first sentence of the context,
+    and judges YES when most answer words appear in the context.
+    """
+    def words(text: str) -> set:
+        return set(re.findall(r"\w+", text.lower()))
+
+    def generate(prompt: str) -> str:
+        time.sleep(latency)
+        if "answer with either YES or NO" in prompt:
+            answer = prompt.split("Context:")[0].split("Information:")[-1].split("Query and Response:")[-1]
+            context = prompt.split("Context:")[-1]
+            overlap = len(words(answer) & words(context)) / max(1, len(words(answer)))
+            return ("YES" if overlap >= 0.5 else "NO") + f": {overlap:.0%} of the answer's words are in the context."
+        context = prompt.split("---------------------")[1].strip()
+        return re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0] or "I don't know."
+
+    return generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True, help="Question set (.jsonl, .json or one question per line)")
+    parser.add_argument("--checkpoint", default="eval_results.jsonl", help="Per-question results (resumed if present)")
+    parser.add_argument("--store", default="vector_store", help="VectorStore directory")
+    parser.add_argument("--index", default="vector_index", help="Retriever index directory")
+    parser.add_argument("--bm25-index", help="BM25 index directory (enables hybrid retrieval)")
+    parser.add_argument("--evaluators", nargs="+", default=list(EVALUATORS), choices=list(EVALUATORS))
+    parser.add_argument("--model", default="gpt-3.5-turbo", help="Answer and judge model")
+    parser.add_argument("-k", type=int, default=3, help="Chunks per question")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Questions processed concurrently")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=DEFAULT_TPM, help="Tokens per minute (0 = unlimited)")
+    parser.add_argument("--prompt-price", type=float, default=DEFAULT_PROMPT_PRICE, help="USD per 1K prompt tokens")
+    parser.add_argument("--completion-price", type=float, default=DEFAULT_COMPLETION_PRICE,
+                        help="USD per 1K completion tokens")
+    parser.add_argument("--stub", action="store_true", help="Offline: stub LLM and fake embeddings")
+    args = parser.parse_args()
+
+    from bm25 import BM25Index
+    from embeddings import BatchEmbedder, FakeEmbeddingBackend, OpenAIEmbeddingBackend
+    from rag import RAGPipeline, openai_generator
+    from retriever import Retriever
+    from vector_store import VectorStore
+
+    store = VectorStore.open(args.store)
+    if args.stub:
+        backend, generate = FakeEmbeddingBackend(), stub_llm()
+    else:
+        from openai import OpenAI
+
+        client = OpenAI()
+        backend, generate = OpenAIEmbeddingBackend(client, model=store.model), openai_generator(client, args.model)
+    lexical = BM25Index.load_or_build(store, args.bm25_index) if args.bm25_index else None
+    pipeline = RAGPipeline(Retriever.load_or_build(store, args.index), BatchEmbedder(backend), lexical=lexical)
+    # openai_generator already retries under the shared LLM controller; the stub never fails.
+    llm = LimitedLLM(generate, TokenBucket(args.rpm, args.tpm), max_retries=0)
+
+    report = run_evaluation(pipeline, llm, load_questions(args.questions), EvalCheckpoint(args.checkpoint),
+                            args.evaluators, args.k, args.workers)
+    report["cost_usd"] = llm.cost(args.prompt_price, args.completion_price)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
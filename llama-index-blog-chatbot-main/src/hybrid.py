@@ -0,0 +1,167 @@
+"""
+Fusion, reranking and latency budgets for hybrid (dense + BM25) retrieval.
+
+- `reciprocal_rank_fusion` merges ranked lists by summing 1 / (rrf_k + rank),
+  which needs no score calibration between BM25 and cosine similarity.
+- Rerankers reorder the fused top-k only: `CrossEncoderReranker` (optional
+  `sentence-transformers` dependency) or `LLMReranker` (any prompt -> text function).
+- `LatencyBudget` records per-stage timings; the rerank stage runs with its
+  budget as a deadline and falls back to the fused order when it is missed.
+"""
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_RRF_K = 60
+
+STAGES = ("embed", "dense", "lexical", "fuse", "rerank")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], rrf_k: int = DEFAULT_RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[tuple]:
+    """
+    Fuses ranked lists of doc ids. Returns [(doc_id, fused_score)], best first.
+
+    Args:
+        rankings: One ranked list of doc ids per retriever, best first.
+        rrf_k (int): Damping constant; larger values flatten the rank weights.
+        weights: Optional per-ranking multipliers.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            if doc_id >= 0:
+                scores[int(doc_id)] += weight / (rrf_k + rank + 1)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+@dataclass
+class LatencyBudget:
+    """
+    Per-stage latency budgets in milliseconds, and observed timings.
+
+    Only `rerank` is enforced (it is optional, so it can be skipped); the other
+    stages are measured and counted as overruns when they exceed their budget.
+    Timings keep the last 1000 samples per stage. Failures of the optional
+    stage are counted in `errors`, with the latest message in `last_error`.
+    """
+    embed_ms: float = 500.0
+    dense_ms: float = 50.0
+    lexical_ms: float = 50.0
+    fuse_ms: float = 5.0
+    rerank_ms: float = 300.0
+    timings: Dict[str, deque] = field(default_factory=lambda: defaultdict(lambda: deque(maxlen=1000)))
+    overruns: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    last_error: Dict[str, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def limit_ms(self, stage: str) -> float:
+        return getattr(self, f"{stage}_ms")
+
+    def record(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            self.timings[stage].append(elapsed_ms)
+            if elapsed_ms > self.limit_ms(stage):
+                self.overruns[stage] += 1
+
+    def record_error(self, stage: str, error: BaseException):
+        with self._lock:
+            self.errors[stage] += 1
+            self.last_error[stage] = f"{type(error).__name__}: {error}"
+
+    @contextmanager
+    def stage(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000)
+
+    def summary(self) -> Dict[str, dict]:
+        """Returns {stage: {p50_ms, max_ms, budget_ms, overruns, errors}} for every stage that ran."""
+        with self._lock:
+            result = {}
+            for stage in STAGES:
+                values = sorted(self.timings.get(stage, []))
+                if values:
+                    result[stage] = {
+                        "p50_ms": values[len(values) // 2],
+                        "max_ms": values[-1],
+                        "budget_ms": self.limit_ms(stage),
+                        "overruns": self.overruns.get(stage, 0),
+                        "errors": self.errors.get(stage, 0),
+                    }
+            return result
+
+
+class CrossEncoderReranker:
+    """Scores (question, chunk) pairs with a sentence-transformers cross-encoder."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name)
+
+    def __call__(self, question: str, texts: Sequence[str]) -> List[float]:
+        return [float(score) for score in self.model.predict([(question, text) for text in texts])]
+
+
+class LLMReranker:
+    """Asks an LLM to rate each chunk's relevance 0-10 in one call."""
+
+    PROMPT = """Rate how relevant each passage is to the question, from 0 (irrelevant) to 10 (answers it).
+Reply with one line per passage in the form "<passage number>: <score>".
+
+Question: {question}
+
+{passages}
+"""
+
+    def __init__(self, generate: Callable[[str], str], max_chars: int = 1500):
+        self.generate = generate
+        self.max_chars = max_chars
+
+    def __call__(self, question: str, texts: Sequence[str]) -> List[float]:
+        passages = "\n\n".join(f"Passage {i + 1}:\n{text[:self.max_chars]}" for i, text in enumerate(texts))
+        reply = self.generate(self.PROMPT.format(question=question, passages=passages))
+        scores = [0.0] * len(texts)
+        for number, score in re.findall(r"(\d+)\s*:\s*(\d+(?:\.\d+)?)", reply):
+            if 1 <= int(number) <= len(texts):
+                scores[int(number) - 1] = float(score)
+        return scores
+
+
+_rerank_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rerank")
+
+
+def rerank_within_budget(reranker, questions: Sequence[str], texts: Sequence[Sequence[str]],
+                         budget: LatencyBudget) -> List[Optional[List[float]]]:
+    """
+    Reranks each question's texts concurrently, all under one rerank deadline.
+    Returns one score list per question, or None where the reranker missed the
+    deadline or failed (callers then keep the fused order); failures are
+    recorded on `budget`.
+    """
+    started = time.perf_counter()
+    deadline = started + budget.rerank_ms / 1000
+    futures = [_rerank_executor.submit(reranker, question, question_texts)
+               for question, question_texts in zip(questions, texts)]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.perf_counter())))
+        except FutureTimeout:
+            future.cancel()
+            results.append(None)
+        except Exception as e:
+            budget.record_error("rerank", e)
+            results.append(None)
+    budget.record("rerank", (time.perf_counter() - started) * 1000)
+    return results
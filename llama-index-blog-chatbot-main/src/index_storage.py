@@ -0,0 +1,140 @@
+"""
+Persisted LlamaIndex indexes for `chatbot.ipynb`, built from the vector store.
+
+`VectorStoreIndex.from_documents` embeds every chunk through the embedding
+API on each fresh build. The chunks and their embeddings already live in the
+`VectorStore` written by `crawl_data_and_build_from_scratch.ipynb`, so here
+both indexes are built from nodes that carry those vectors: building makes no
+embedding calls, and loading never does.
+
+- The vector and summary indexes share one storage context (one docstore)
+  under `persist_dir`, with index ids "vector" and "summary".
+- `build.json` records the store build and version the indexes cover;
+  `load_or_build_indexes` rebuilds when the store has changed since.
+
+Usage:
+    python index_storage.py --store vector_store --persist-dir storage_openai
+"""
+import argparse
+import json
+import os
+import time
+from typing import List, Tuple
+
+from llama_index.core import StorageContext, SummaryIndex, VectorStoreIndex, load_indices_from_storage
+from llama_index.core.schema import TextNode
+
+from vector_store import VectorStore
+
+VECTOR_INDEX_ID = "vector"
+SUMMARY_INDEX_ID = "summary"
+BUILD_FILE = "build.json"
+
+
+def nodes_from_store(store: VectorStore) -> List[TextNode]:
+    """One node per stored chunk, with its stored embedding and metadata."""
+    vectors = store.vectors
+    nodes = []
+    for i in range(len(store)):
+        metadata = store.metadata(i)
+        nodes.append(TextNode(
+            id_=f"chunk-{i}",
+            text=store.text(i),
+            embedding=vectors[i].tolist(),
+            metadata=metadata,
+            # The chunk text already starts with its title and section.
+            excluded_embed_metadata_keys=list(metadata),
+            excluded_llm_metadata_keys=list(metadata),
+        ))
+    return nodes
+
+
+def _check_embed_model(store: VectorStore, embed_model):
+    model_name = getattr(embed_model, "model_name", None)
+    if embed_model is not None and model_name not in (None, store.model):
+        raise ValueError(f"Queries would be embedded with {model_name}, but the store uses {store.model}")
+
+
+def build_indexes(store: VectorStore, persist_dir: str, embed_model=None) -> Tuple[VectorStoreIndex, SummaryIndex]:
+    """
+    Builds the vector and summary indexes from `store` and persists them to `persist_dir`.
+
+    Args:
+        store (VectorStore): Chunk texts, metadata and embeddings.
+        persist_dir (str): Where to persist the shared storage context.
+        embed_model (optional): Query embedding model; must be the store's model.
+    """
+    _check_embed_model(store, embed_model)
+    nodes = nodes_from_store(store)
+    storage_context = StorageContext.from_defaults()
+    storage_context.docstore.add_documents(nodes)
+
+    vector_index = VectorStoreIndex(nodes, storage_context=storage_context, embed_model=embed_model)
+    vector_index.set_index_id(VECTOR_INDEX_ID)
+    summary_index = SummaryIndex(nodes, storage_context=storage_context)
+    summary_index.set_index_id(SUMMARY_INDEX_ID)
+
+    storage_context.persist(persist_dir=persist_dir)
+    with open(os.path.join(persist_dir, BUILD_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": store.model,
+            "store_created_at": store.manifest["created_at"],
+            "store_version": store.version,
+            "count": len(store),
+            "built_at": time.time(),
+        }, f, indent=2)
+    return vector_index, summary_index
+
+
+def load_indexes(persist_dir: str, embed_model=None) -> Tuple[VectorStoreIndex, SummaryIndex]:
+    """Loads both indexes from one storage context (no embedding calls)."""
+    storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+    kwargs = {"embed_model": embed_model} if embed_model is not None else {}
+    vector_index, summary_index = load_indices_from_storage(
+        storage_context, index_ids=[VECTOR_INDEX_ID, SUMMARY_INDEX_ID], **kwargs
+    )
+    return vector_index, summary_index
+
+
+def is_current(store: VectorStore, persist_dir: str) -> bool:
+    """True if the indexes in `persist_dir` were built from the store's current version."""
+    try:
+        with open(os.path.join(persist_dir, BUILD_FILE), "r", encoding="utf-8") as f:
+            build = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        build.get("model") == store.model
+        and build.get("store_created_at") == store.manifest["created_at"]
+        and build.get("store_version") == store.version
+    )
+
+
+def load_or_build_indexes(store: VectorStore, persist_dir: str,
+                          embed_model=None) -> Tuple[VectorStoreIndex, SummaryIndex]:
+    """Loads the persisted indexes if they cover the store's current version; otherwise rebuilds them."""
+    _check_embed_model(store, embed_model)
+    if is_current(store, persist_dir):
+        return load_indexes(persist_dir, embed_model)
+    return build_indexes(store, persist_dir, embed_model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="vector_store", help="VectorStore directory")
+    parser.add_argument("--persist-dir", default="storage_openai", help="Where to persist the indexes")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the indexes are current")
+    args = parser.parse_args()
+
+    store = VectorStore.open(args.store)
+    started = time.perf_counter()
+    if args.rebuild or not is_current(store, args.persist_dir):
+        build_indexes(store, args.persist_dir)
+        print(f"Built indexes for {len(store)} chunks in {time.perf_counter() - started:.2f}s")
+    else:
+        load_indexes(args.persist_dir)
+        print(f"Indexes are current; loaded in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Batched RAG question answering: retrieve for many questions at once, then
+generate the answers concurrently.
+
+- `retrieve_batch(questions, k)` embeds every question in one embedding
+  request, runs one vectorized index search over the whole query matrix, and
+  reads each distinct chunk from the store once.
+- With a BM25 index, dense and lexical results are fused by reciprocal rank,
+  and an optional reranker reorders the fused top-k within a latency budget.
+- `answer_batch(questions, k)` builds the prompts from those chunks and runs
+  the answer calls on a thread pool.
+
+`openai_generator(client)` wraps the chat completions call that the notebooks
+use as `run_llm`, under the same retry and concurrency controller as the
+embeddings; any `prompt -> answer` callable works.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+from bm25 import BM25Index
+from embeddings import BatchEmbedder, llm_controller
+from hybrid import DEFAULT_RRF_K, LatencyBudget, reciprocal_rank_fusion, rerank_within_budget
+from retriever import RetrievedChunk, Retriever
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_CANDIDATES = 20
+
+PROMPT_TEMPLATE = """
+Context information is below.
+---------------------
+{context}
+---------------------
+Given the context information and not prior knowledge, answer the query.
+Query: {question}
+Answer:
+"""
+
+
+@dataclass
+class Answer:
+    question: str
+    answer: str
+    chunks: List[RetrievedChunk] = field(default_factory=list)
+
+
+def openai_generator(client, model: str = "gpt-3.5-turbo", controller=None) -> Callable[[str], str]:
+    """
+    Returns a `prompt -> answer` function backed by the OpenAI chat completions
+    API, run by the provider's shared `LLMController` (see `embeddings.llm_controller`).
+    """
+    client = client.with_options(max_retries=0)
+    controller = controller or llm_controller(model)
+
+    def run_llm(user_message: str) -> str:
+        chat_response = controller.call(
+            client.chat.completions.create,
+            model=model,
+            messages=[dict(role="user", content=user_message)],
+            timeout_arg="timeout",
+        )
+        return chat_response.choices[0].message.content
+    return run_llm
+
+
+def build_prompt(question: str, chunks: Sequence[RetrievedChunk]) -> str:
+    return PROMPT_TEMPLATE.format(context="\n\n".join(chunk.text for chunk in chunks), question=question)
+
+
+class RAGPipeline:
+    """
+    Args:
+        retriever (Retriever): Index and vector store to search.
+        embedder (BatchEmbedder): Embeds the questions (same model as the store).
+        generate (callable, optional): `prompt -> answer`, e.g. `openai_generator(client)`.
+        max_workers (int): Concurrent answer calls in `answer_batch`.
+        lexical (BM25Index, optional): Enables hybrid retrieval with BM25.
+        reranker (callable, optional): `(question, texts) -> scores` applied to
+            the top-k, e.g. `hybrid.CrossEncoderReranker()` or `hybrid.LLMReranker(generate)`.
+        budget (LatencyBudget, optional): Per-stage budgets and timings.
+        candidates (int): Per-retriever depth fed into the fusion.
+        rrf_k (int): Reciprocal-rank-fusion constant.
+    """
+
+    def __init__(
+        self,
+        retriever: Retriever,
+        embedder: BatchEmbedder,
+        generate: Callable[[str], str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        lexical: Optional[BM25Index] = None,
+        reranker: Optional[Callable[[str, Sequence[str]], List[float]]] = None,
+        budget: Optional[LatencyBudget] = None,
+        candidates: int = DEFAULT_CANDIDATES,
+        rrf_k: int = DEFAULT_RRF_K,
+    ):
+        if embedder.model != retriever.store.model:
+            raise ValueError(f"Embedder model {embedder.model} does not match the store's {retriever.store.model}")
+        self.retriever = retriever
+        self.embedder = embedder
+        self.generate = generate
+        self.max_workers = max_workers
+        self.lexical = lexical
+        self.reranker = reranker
+        self.budget = budget or LatencyBudget()
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def retrieve_batch(self, questions: Sequence[str], k: int = 5) -> List[List[RetrievedChunk]]:
+        """
+        Returns the top-k chunks for each question, best first.
+
+        With a `lexical` index, the dense and BM25 top `candidates` are fused by
+        reciprocal rank (chunk scores are then fused scores); with a `reranker`,
+        the fused top-k are reordered by its scores if it meets its budget.
+
+        Chunks retrieved by several questions are read from the store once and
+        shared; chunks whose text duplicates a better-ranked one for the same
+        question are dropped, so a dense-only question may get fewer than k.
+        """
+        if not questions:
+            return []
+        with self.budget.stage("embed"):
+            query_vectors = self.embedder.embed(questions)
+        depth = max(k, self.candidates) if self.lexical is not None else k
+        with self.budget.stage("dense"):
+            scores, indices = self.retriever.search(query_vectors, depth)
+
+        if self.lexical is None:
+            ranked = [[(int(i), float(score)) for score, i in zip(row_scores, row_indices) if i >= 0]
+                      for row_scores, row_indices in zip(scores, indices)]
+        else:
+            with self.budget.stage("lexical"):
+                lexical_results = self.lexical.search_batch(questions, depth)
+            with self.budget.stage("fuse"):
+                ranked = [
+                    reciprocal_rank_fusion([dense_ids, lexical_ids], self.rrf_k)
+                    for dense_ids, (_, lexical_ids) in zip(indices, lexical_results)
+                ]
+
+        store = self.retriever.store
+        cache: Dict[int, tuple] = {}
+        results = []
+        for candidates in ranked:
+            chunks, seen_texts = [], set()
+            for i, score in candidates:
+                if i not in cache:
+                    cache[i] = (store.text(i), store.metadata(i))
+                text, metadata = cache[i]
+                if text in seen_texts:
+                    continue
+                seen_texts.add(text)
+                chunks.append(RetrievedChunk(index=i, score=score, text=text, metadata=metadata))
+                if len(chunks) == k:
+                    break
+            results.append(chunks)
+
+        if self.reranker is not None:
+            rerank_scores = rerank_within_budget(
+                self.reranker, questions, [[chunk.text for chunk in chunks] for chunks in results], self.budget
+            )
+            for chunks, chunk_scores in zip(results, rerank_scores):
+                if chunk_scores is not None:
+                    for chunk, score in zip(chunks, chunk_scores):
+                        chunk.score = score
+                    chunks.sort(key=lambda chunk: -chunk.score)
+        return results
+
+    def answer_batch(self, questions: Sequence[str], k: int = 5) -> List[Answer]:
+        """Retrieves for all questions at once, then generates the answers concurrently (in input order)."""
+        if self.generate is None:
+            raise ValueError("RAGPipeline needs a `generate` function to answer questions")
+        retrieved = self.retrieve_batch(questions, k)
+        prompts = [build_prompt(question, chunks) for question, chunks in zip(questions, retrieved)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            answers = list(executor.map(self.generate, prompts))
+        return [
+            Answer(question=question, answer=answer, chunks=chunks)
+            for question, answer, chunks in zip(questions, answers, retrieved)
+        ]
+
+    def answer(self, question: str, k: int = 5) -> Answer:
+        return self.answer_batch([question], k)[0]
@@ -0,0 +1,240 @@
+"""
+Dense retrieval over a `VectorStore` with a choice of faiss index.
+
+OpenAI embeddings are compared by cosine similarity, so every index here
+works on L2-normalized vectors with inner product (cosine) scores:
+
+- "flat":     exact search (`IndexFlatIP`); the recall baseline
+- "ivf_flat": inverted lists over k-means cells; searches `nprobe` cells
+- "ivf_pq":   inverted lists with product-quantized vectors; much less memory
+- "hnsw":     graph index; no training, fast and high recall, more memory
+
+Indexes are built from the store, saved next to it with the store version
+they cover, and loaded (memory-mapped where faiss supports it) on start-up.
+Rows appended to the store after the index was built are added by `refresh()`.
+"""
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from vector_store import VectorStore
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# faiss wants at least ~39 training points per IVF cell
+_MIN_POINTS_PER_CELL = 39
+_ADD_BATCH_SIZE = 65536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Returns an L2-normalized float32 copy (the input, e.g. a memory map, is untouched)."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2, copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+@dataclass
+class IndexConfig:
+    """
+    Index type and tuning knobs.
+
+    Args:
+        kind (str): One of INDEX_TYPES.
+        nlist (int, optional): IVF cells; default ~4 * sqrt(n).
+        nprobe (int): IVF cells searched per query (recall vs latency).
+        pq_m (int): PQ sub-quantizers; rounded down to a divisor of the dimension.
+        pq_bits (int): Bits per PQ code; lowered for small corpora.
+        hnsw_m (int): HNSW neighbours per node.
+        ef_construction (int): HNSW build-time search depth.
+        ef_search (int): HNSW query-time search depth (recall vs latency).
+        train_size (int): Maximum vectors sampled to train IVF/PQ.
+    """
+    kind: str = "flat"
+    nlist: Optional[int] = None
+    nprobe: int = 16
+    pq_m: int = 32
+    pq_bits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    train_size: int = 100_000
+
+    def __post_init__(self):
+        if self.kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.kind!r}; expected one of {INDEX_TYPES}")
+
+
+@dataclass
+class RetrievedChunk:
+    index: int
+    score: float
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+def _nlist_for(n: int, requested: Optional[int]) -> int:
+    nlist = requested or int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_CELL))
+
+
+def _pq_m_for(dimension: int, requested: int) -> int:
+    return next(m for m in range(min(requested, dimension), 0, -1) if dimension % m == 0)
+
+
+def _pq_bits_for(n: int, requested: int) -> int:
+    # Each sub-quantizer has 2**bits centroids, which need training points too.
+    return max(1, min(requested, int(math.log2(max(2, n // _MIN_POINTS_PER_CELL)))))
+
+
+def create_index(config: IndexConfig, dimension: int, n: int) -> faiss.Index:
+    """Returns an empty (untrained) inner-product index for `n` vectors."""
+    if config.kind == "flat":
+        return faiss.IndexFlatIP(dimension)
+    if config.kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = config.ef_construction
+        return index
+    quantizer = faiss.IndexFlatIP(dimension)
+    nlist = _nlist_for(n, config.nlist)
+    if config.kind == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    pq_m = _pq_m_for(dimension, config.pq_m)
+    pq_bits = _pq_bits_for(min(n, config.train_size), config.pq_bits)
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+
+
+def _apply_search_params(index: faiss.Index, config: IndexConfig):
+    if config.kind in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = config.nprobe
+    elif config.kind == "hnsw":
+        index.hnsw.efSearch = config.ef_search
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Serialized size of an index, a close proxy for its memory footprint."""
+    return int(faiss.serialize_index(index).size)
+
+
+class Retriever:
+    """
+    Top-k retrieval over a `VectorStore`. Use `build` or `load`.
+
+    Args:
+        store (VectorStore): Chunk texts, metadata and vectors.
+        index (faiss.Index): Index over the store's normalized vectors.
+        config (IndexConfig): How the index was built.
+    """
+
+    def __init__(self, store: VectorStore, index: faiss.Index, config: IndexConfig):
+        self.store = store
+        self.index = index
+        self.config = config
+        _apply_search_params(index, config)
+
+    @classmethod
+    def build(cls, store: VectorStore, config: Optional[IndexConfig] = None) -> "Retriever":
+        config = config or IndexConfig()
+        vectors = store.vectors
+        index = create_index(config, store.dimension, len(vectors))
+        if not index.is_trained:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(len(vectors), size=min(len(vectors), config.train_size), replace=False)
+            index.train(normalize(vectors[np.sort(sample)]))
+        retriever = cls(store, index, config)
+        retriever._add(0, len(vectors))
+        return retriever
+
+    def _add(self, start: int, end: int):
+        # Normalize in batches so the whole corpus is never copied at once.
+        for batch_start in range(start, end, _ADD_BATCH_SIZE):
+            self.index.add(normalize(self.store.vectors[batch_start:min(end, batch_start + _ADD_BATCH_SIZE)]))
+
+    def refresh(self) -> int:
+        """Reloads the store and indexes rows appended since. Returns the number added."""
+        self.store.reload()
+        if len(self.store) < self.index.ntotal:
+            raise ValueError("The vector store was rebuilt with fewer rows; rebuild the index")
+        added = len(self.store) - self.index.ntotal
+        self._add(self.index.ntotal, len(self.store))
+        return added
+
+    @staticmethod
+    def _paths(path: str):
+        return os.path.join(path, "index.faiss"), os.path.join(path, "index.json")
+
+    def save(self, path: str):
+        """Writes the index and its config (with the store version it covers) to `path`."""
+        os.makedirs(path, exist_ok=True)
+        index_path, meta_path = self._paths(path)
+        faiss.write_index(self.index, index_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": asdict(self.config),
+                "model": self.store.model,
+                "store_version": self.store.version,
+                "store_created_at": self.store.manifest["created_at"],
+                "count": self.index.ntotal,
+                "saved_at": time.time(),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, store: VectorStore, path: str, mmap: bool = True) -> "Retriever":
+        """
+        Loads a saved index for `store`. Raises ValueError if it was built for a
+        different embedding model or for an earlier build of the store (rows
+        appended since are fine: they are indexed on load).
+        """
+        index_path, meta_path = cls._paths(path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["model"] != store.model:
+            raise ValueError(f"Index at {path} was built for {meta['model']}, store uses {store.model}")
+        if meta["store_created_at"] != store.manifest["created_at"] or meta["count"] > len(store):
+            raise ValueError(f"Index at {path} was built for another version of the store; rebuild it")
+
+        # A memory-mapped index is read-only, so load it normally if rows must be added.
+        mmap = mmap and meta["count"] == len(store)
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError:
+            # Not every index type can be memory-mapped.
+            index = faiss.read_index(index_path)
+        retriever = cls(store, index, IndexConfig(**meta["config"]))
+        if index.ntotal < len(store):
+            retriever._add(index.ntotal, len(store))
+        return retriever
+
+    @classmethod
+    def load_or_build(cls, store: VectorStore, path: str, config: Optional[IndexConfig] = None) -> "Retriever":
+        """Loads the index at `path` if it matches `config` and the store; otherwise builds and saves it."""
+        config = config or IndexConfig()
+        try:
+            retriever = cls.load(store, path)
+            if retriever.config == config:
+                return retriever
+        except (OSError, ValueError, RuntimeError):
+            pass
+        retriever = cls.build(store, config)
+        retriever.save(path)
+        return retriever
+
+    def search(self, query_vectors: np.ndarray, k: int = 5):
+        """Returns (scores, indices), each (n_queries, k); scores are cosine similarities."""
+        scores, indices = self.index.search(normalize(query_vectors), min(k, max(1, self.index.ntotal)))
+        return scores, indices
+
+    def retrieve(self, query_vector: np.ndarray, k: int = 5) -> List[RetrievedChunk]:
+        """Returns the top-k chunks for one query embedding, best first."""
+        scores, indices = self.search(query_vector, k)
+        return [
+            RetrievedChunk(index=int(i), score=float(s), text=self.store.text(int(i)), metadata=self.store.metadata(int(i)))
+            for s, i in zip(scores[0], indices[0])
+            if i >= 0
+        ]
@@ -0,0 +1,273 @@
+"""
+Cheap tool selectors for LlamaIndex's `RouterQueryEngine`.
+
+`LLMSingleSelector` spends one LLM call per query just to choose between the
+summary and vector tools. The selectors here choose without one:
+
+- `KeywordSelector`: regular expressions per tool name ("summarize",
+  "overview", ... go to the summary tool), falling back to a default tool.
+- `EmbeddingSelector`: cosine similarity between the query and each tool's
+  description plus example queries. The tool embeddings are computed once,
+  and the query embedding is kept on the query bundle, so the vector tool's
+  retriever reuses it instead of embedding the query again.
+- `CachedSelector`: wraps any selector with an LRU cache of routing decisions
+  keyed by the normalized query and the tool set.
+
+`create_router_query_engine` builds the notebook's router with any of them.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.base_selector import BaseSelector, SelectorResult, SingleSelection
+from llama_index.core.query_engine.router_query_engine import RouterQueryEngine
+from llama_index.core.tools import QueryEngineTool
+
+SUMMARY_TOOL = "summary"
+VECTOR_TOOL = "vector"
+
+DEFAULT_SUMMARY_PATTERNS = (
+    r"\bsummar(y|ize|ise|ies)\b",
+    r"\boverview\b",
+    r"\bmain (points|ideas|themes|topics)\b",
+    r"\bkey takeaways?\b",
+    r"\b(all|every|most) (the )?(blogs?|posts?|articles?)\b",
+    r"\bin general\b",
+)
+
+DEFAULT_EXAMPLES = {
+    SUMMARY_TOOL: [
+        "Summarize the blog posts about agents",
+        "Give me an overview of what the LlamaIndex blog covers",
+        "What are the main themes across the posts?",
+    ],
+    VECTOR_TOOL: [
+        "What are key features of llama-agents?",
+        "Which metrics are used to evaluate the rerankers?",
+        "How do I configure the query engine in the tutorial?",
+    ],
+}
+
+TOOL_DESCRIPTIONS = {
+    SUMMARY_TOOL: "Useful for summarization questions related to the llama-index blogs",
+    VECTOR_TOOL: "Useful for retrieving specific information in the llama-index blogs",
+}
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+def _single(index: int, reason: str) -> SelectorResult:
+    return SelectorResult(selections=[SingleSelection(index=index, reason=reason)])
+
+
+def _choice_index(choices, name: str) -> Optional[int]:
+    return next((i for i, choice in enumerate(choices) if choice.name == name), None)
+
+
+class KeywordSelector(BaseSelector):
+    """
+    Routes by regular expressions on the query text.
+
+    Args:
+        patterns (dict): Tool name -> regular expressions; the first tool with a
+            matching pattern wins (checked in choice order).
+        default (str): Tool name used when nothing matches (else the last choice).
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, Sequence[str]]] = None, default: str = VECTOR_TOOL):
+        patterns = patterns if patterns is not None else {SUMMARY_TOOL: DEFAULT_SUMMARY_PATTERNS}
+        self._patterns = {name: [re.compile(p, re.IGNORECASE) for p in ps] for name, ps in patterns.items()}
+        self._default = default
+
+    def _get_prompts(self):
+        return {}
+
+    def _get_prompt_modules(self):
+        return {}
+
+    def _update_prompts(self, prompts) -> None:
+        pass
+
+    def _select(self, choices, query) -> SelectorResult:
+        for i, choice in enumerate(choices):
+            for pattern in self._patterns.get(choice.name, ()):
+                if pattern.search(query.query_str):
+                    return _single(i, f"Matched {pattern.pattern!r}")
+        default = _choice_index(choices, self._default)
+        return _single(len(choices) - 1 if default is None else default, "No keyword matched; default tool")
+
+    async def _aselect(self, choices, query) -> SelectorResult:
+        return self._select(choices, query)
+
+
+class EmbeddingSelector(BaseSelector):
+    """
+    Routes to the tool whose profile (description plus example queries) is most
+    similar to the query.
+
+    Args:
+        embed_model: A LlamaIndex embedding model, e.g. `Settings.embed_model`;
+            use the vector index's model so the query embedding can be reused.
+        examples (dict): Tool name -> example queries added to its profile.
+    """
+
+    def __init__(self, embed_model, examples: Optional[Dict[str, Sequence[str]]] = None):
+        self._embed_model = embed_model
+        self._examples = DEFAULT_EXAMPLES if examples is None else examples
+        self._profiles: Dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _get_prompts(self):
+        return {}
+
+    def _get_prompt_modules(self):
+        return {}
+
+    def _update_prompts(self, prompts) -> None:
+        pass
+
+    def _profile_texts(self, choice) -> List[str]:
+        return [choice.description, *self._examples.get(choice.name, ())]
+
+    def _profile(self, choice) -> np.ndarray:
+        """Normalized embeddings of a tool's profile texts, computed once per (name, description)."""
+        key = (choice.name, choice.description)
+        with self._lock:
+            profile = self._profiles.get(key)
+        if profile is None:
+            vectors = np.asarray(self._embed_model.get_text_embedding_batch(self._profile_texts(choice)),
+                                 dtype=np.float32)
+            profile = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            with self._lock:
+                self._profiles[key] = profile
+        return profile
+
+    def _route(self, choices, query_embedding) -> SelectorResult:
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        scores = [float((self._profile(choice) @ query_vector).max()) for choice in choices]
+        best = int(np.argmax(scores))
+        return _single(best, f"Most similar tool profile ({scores[best]:.3f})")
+
+    def _select(self, choices, query) -> SelectorResult:
+        if query.embedding is None:
+            # Kept on the bundle: the router passes it on to the selected engine.
+            query.embedding = self._embed_model.get_query_embedding(query.query_str)
+        return self._route(choices, query.embedding)
+
+    async def _aselect(self, choices, query) -> SelectorResult:
+        if query.embedding is None:
+            query.embedding = await self._embed_model.aget_query_embedding(query.query_str)
+        return self._route(choices, query.embedding)
+
+
+class CachedSelector(BaseSelector):
+    """
+    Caches another selector's decisions by normalized query and tool set (LRU).
+
+    Args:
+        selector (BaseSelector): Makes the decisions on cache misses.
+        max_size (int): Cached decisions kept.
+    """
+
+    def __init__(self, selector: BaseSelector, max_size: int = DEFAULT_CACHE_SIZE):
+        self._selector = selector
+        self._max_size = max_size
+        self._cache: "OrderedDict[tuple, SelectorResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_prompts(self):
+        return {}
+
+    def _get_prompt_modules(self):
+        return {"selector": self._selector}
+
+    def _update_prompts(self, prompts) -> None:
+        pass
+
+    @staticmethod
+    def _key(choices, query) -> tuple:
+        return " ".join(query.query_str.lower().split()), tuple((c.name, c.description) for c in choices)
+
+    def _lookup(self, key) -> Optional[SelectorResult]:
+        with self._lock:
+            result = self._cache.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def _remember(self, key, result: SelectorResult):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    def _select(self, choices, query) -> SelectorResult:
+        key = self._key(choices, query)
+        result = self._lookup(key)
+        if result is None:
+            result = self._selector.select(choices, query)
+            self._remember(key, result)
+        return result
+
+    async def _aselect(self, choices, query) -> SelectorResult:
+        key = self._key(choices, query)
+        result = self._lookup(key)
+        if result is None:
+            result = await self._selector.aselect(choices, query)
+            self._remember(key, result)
+        return result
+
+
+def create_selector(mode: str = "embedding", embed_model=None, llm=None, cache: bool = True) -> BaseSelector:
+    """
+    Returns a selector for `mode`: "keyword", "embedding" or "llm" (`LLMSingleSelector`),
+    wrapped in a `CachedSelector` unless `cache` is False.
+    """
+    if mode == "keyword":
+        selector = KeywordSelector()
+    elif mode == "embedding":
+        if embed_model is None:
+            from llama_index.core import Settings
+
+            embed_model = Settings.embed_model
+        selector = EmbeddingSelector(embed_model)
+    elif mode == "llm":
+        from llama_index.core.selectors import LLMSingleSelector
+
+        selector = LLMSingleSelector.from_defaults(llm=llm)
+    else:
+        raise ValueError(f"Unknown routing mode {mode!r}; expected 'keyword', 'embedding' or 'llm'")
+    return CachedSelector(selector) if cache else selector
+
+
+def create_router_query_engine(vector_index, summary_index, selector: Optional[BaseSelector] = None,
+                               similarity_top_k: int = 1, verbose: bool = False) -> RouterQueryEngine:
+    """
+    The notebook's summary/vector router. The default selector is a cached
+    `EmbeddingSelector` over `Settings.embed_model`, which must be the model the
+    vector index was built with.
+    """
+    summary_tool = QueryEngineTool.from_defaults(
+        query_engine=summary_index.as_query_engine(response_mode="tree_summarize", use_async=True),
+        name=SUMMARY_TOOL,
+        description=TOOL_DESCRIPTIONS[SUMMARY_TOOL],
+    )
+    vector_tool = QueryEngineTool.from_defaults(
+        query_engine=vector_index.as_query_engine(similarity_top_k=similarity_top_k),
+        name=VECTOR_TOOL,
+        description=TOOL_DESCRIPTIONS[VECTOR_TOOL],
+    )
+    return RouterQueryEngine(
+        selector=selector or create_selector("embedding"),
+        query_engine_tools=[summary_tool, vector_tool],
+        verbose=verbose,
+    )
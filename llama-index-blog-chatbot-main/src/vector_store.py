@@ -0,0 +1,356 @@
+"""
+Memory-mapped, versioned on-disk vector store.
+
+A store is a directory:
+
+    manifest.json          model, dimension, metric, row count and version
+    vectors.npy            float32 (count, dimension), memory-mapped on open
+    texts.bin              UTF-8 chunk texts, back to back
+    texts.offsets.npy      int64 (count + 1) byte offsets into texts.bin
+    metadata.bin           one JSON object per row, back to back
+    metadata.offsets.npy   int64 (count + 1) byte offsets into metadata.bin
+
+Opening a store only reads the manifest and maps the files, so start-up does
+not depend on the corpus size and every process that opens the same store
+shares one copy of the pages in the OS page cache.
+
+The .npy files are written with a fixed-size header, so `append` writes the
+new rows at the end of each file and rewrites the header in place instead of
+rewriting the whole file. The manifest is replaced last and atomically; its
+`count` is what readers trust, so a reader never sees a half-written row.
+An append interrupted before the manifest is replaced leaves rows past `count`;
+the next append cuts every file back to `count` before writing, so the
+columns stay aligned. Only one process should write to a store at a time.
+"""
+import json
+import os
+import shutil
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+
+# magic (6) + version (2) + header length (2) + header text; a multiple of 64
+_NPY_HEADER_SIZE = 128
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def _npy_header(dtype: np.dtype, shape: tuple) -> bytes:
+    text = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape})
+    text_size = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2
+    text = text.ljust(text_size - 1) + "\n"
+    if len(text) != text_size:
+        raise ValueError(f"Shape {shape} does not fit in a {_NPY_HEADER_SIZE}-byte .npy header")
+    return _NPY_MAGIC + text_size.to_bytes(2, "little") + text.encode("latin1")
+
+
+def _write_npy(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        f.write(_npy_header(array.dtype, array.shape))
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+def _append_npy(path: str, rows: np.ndarray):
+    """Appends rows to a .npy file written by `_write_npy` and updates its shape."""
+    with open(path, "r+b") as f:
+        array = np.load(path, mmap_mode="r")
+        if array.dtype != rows.dtype or array.shape[1:] != rows.shape[1:]:
+            raise ValueError(f"Cannot append {rows.dtype}{rows.shape} rows to {array.dtype}{array.shape}")
+        shape = (array.shape[0] + rows.shape[0],) + array.shape[1:]
+        del array
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(rows).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(_npy_header(rows.dtype, shape))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _truncate_npy(path: str, rows: int):
+    """Cuts a .npy file written by `_write_npy` back to its first `rows` rows."""
+    array = np.load(path, mmap_mode="r")
+    dtype, shape = array.dtype, (rows,) + array.shape[1:]
+    size = _NPY_HEADER_SIZE + rows * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+    unchanged = array.shape == shape and os.path.getsize(path) == size
+    del array
+    if unchanged:
+        return
+    with open(path, "r+b") as f:
+        f.truncate(size)
+        f.seek(0)
+        f.write(_npy_header(dtype, shape))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _BlobColumn:
+    """Variable-length byte records: a data file plus a memory-mapped offsets array."""
+
+    def __init__(self, directory: str, name: str):
+        self.data_path = os.path.join(directory, f"{name}.bin")
+        self.offsets_path = os.path.join(directory, f"{name}.offsets.npy")
+        self._data = None
+        self._offsets = None
+
+    @classmethod
+    def create(cls, directory: str, name: str, records: Iterable[bytes]) -> "_BlobColumn":
+        column = cls(directory, name)
+        offsets = [0]
+        with open(column.data_path, "wb") as f:
+            for record in records:
+                f.write(record)
+                offsets.append(offsets[-1] + len(record))
+        _write_npy(column.offsets_path, np.asarray(offsets, dtype=np.int64))
+        return column
+
+    def truncate(self, count: int):
+        """Drops records past the first `count`."""
+        self.close()
+        _truncate_npy(self.offsets_path, count + 1)
+        end = int(np.load(self.offsets_path, mmap_mode="r")[count])
+        if os.path.getsize(self.data_path) != end:
+            with open(self.data_path, "r+b") as f:
+                f.truncate(end)
+
+    def append(self, records: Iterable[bytes]):
+        self.close()
+        last = int(np.load(self.offsets_path, mmap_mode="r")[-1])
+        offsets = []
+        with open(self.data_path, "ab") as f:
+            for record in records:
+                f.write(record)
+                last += len(record)
+                offsets.append(last)
+            f.flush()
+            os.fsync(f.fileno())
+        _append_npy(self.offsets_path, np.asarray(offsets, dtype=np.int64))
+
+    def _map(self):
+        if self._offsets is None:
+            self._offsets = np.load(self.offsets_path, mmap_mode="r")
+            # An empty file can't be memory-mapped.
+            size = os.path.getsize(self.data_path)
+            self._data = np.memmap(self.data_path, dtype=np.uint8, mode="r") if size else np.zeros(0, np.uint8)
+
+    def get(self, index: int) -> bytes:
+        self._map()
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._data[start:end].tobytes()
+
+    def close(self):
+        self._data = None
+        self._offsets = None
+
+
+class VectorStore:
+    """
+    Read/append access to a vector store directory. Use `create`, `from_arrays` or `open`.
+
+    `vectors` is a read-only float32 memory map; rows line up with `text(i)`
+    and `metadata(i)`.
+    """
+
+    def __init__(self, path: str, manifest: dict):
+        self.path = path
+        self.manifest = manifest
+        self._texts = _BlobColumn(path, "texts")
+        self._metadata = _BlobColumn(path, "metadata")
+        self._vectors = None
+        self._norms = None
+
+    # -- construction -------------------------------------------------------
+
+    @classmethod
+    def create(cls, path: str, model: str, dimension: int, metric: str = "l2", overwrite: bool = False) -> "VectorStore":
+        """Creates an empty store."""
+        return cls.from_arrays(path, np.zeros((0, dimension), dtype=np.float32), [], model=model,
+                               metric=metric, overwrite=overwrite)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        path: str,
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[dict]] = None,
+        model: str = "unknown",
+        metric: str = "l2",
+        overwrite: bool = True,
+    ) -> "VectorStore":
+        """
+        Writes a complete store. The files are built in a temporary directory
+        that replaces `path` at the end; open readers keep the old files mapped
+        until they call `reload()`.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError(f"Expected {len(texts)} vectors of shape (n, d), got {vectors.shape}")
+        if metadatas is not None and len(metadatas) != len(texts):
+            raise ValueError("metadatas must have one entry per text")
+        if os.path.exists(path) and not overwrite:
+            raise FileExistsError(path)
+
+        previous_version = 0
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            previous_version = cls.open(path).manifest["version"]
+
+        tmp_path = f"{path.rstrip(os.sep)}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        _write_npy(os.path.join(tmp_path, VECTORS_FILE), vectors)
+        _BlobColumn.create(tmp_path, "texts", (text.encode("utf-8") for text in texts))
+        _BlobColumn.create(tmp_path, "metadata", (
+            json.dumps(metadata or {}).encode("utf-8") for metadata in (metadatas or [None] * len(texts))
+        ))
+        now = time.time()
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model": model,
+            "dimension": int(vectors.shape[1]),
+            "metric": metric,
+            "dtype": "float32",
+            "count": len(texts),
+            "version": previous_version + 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        _write_json_atomic(os.path.join(tmp_path, MANIFEST_FILE), manifest)
+
+        if os.path.exists(path):
+            old_path = f"{tmp_path}.old"
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, path)
+        return cls(path, manifest)
+
+    @classmethod
+    def open(cls, path: str) -> "VectorStore":
+        """Opens an existing store; only the manifest is read eagerly."""
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format {manifest.get('format_version')} in {path}")
+        return cls(path, manifest)
+
+    # -- reading ------------------------------------------------------------
+
+    @property
+    def model(self) -> str:
+        return self.manifest["model"]
+
+    @property
+    def dimension(self) -> int:
+        return self.manifest["dimension"]
+
+    @property
+    def version(self) -> int:
+        return self.manifest["version"]
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only (count, dimension) float32 memory map."""
+        if self._vectors is None:
+            vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r")
+            self._vectors = vectors[:len(self)]
+        return self._vectors
+
+    def text(self, index: int) -> str:
+        return self._texts.get(self._check_index(index)).decode("utf-8")
+
+    def texts(self, indices: Optional[Iterable[int]] = None) -> List[str]:
+        """Returns the texts at `indices` (all texts if omitted)."""
+        indices = range(len(self)) if indices is None else indices
+        return [self.text(int(index)) for index in indices]
+
+    def metadata(self, index: int) -> dict:
+        return json.loads(self._metadata.get(self._check_index(index)))
+
+    def _check_index(self, index: int) -> int:
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Row {index} out of range for a store of {len(self)}")
+        return index % len(self)
+
+    def search(self, query: np.ndarray, k: int = 5):
+        """
+        Exact search straight over the memory map. Returns (distances, indices)
+        shaped like faiss: (n_queries, k), squared L2 or inner product by `metric`.
+        """
+        query = np.atleast_2d(np.asarray(query, dtype=np.float32))
+        k = min(k, len(self))
+        if self.manifest["metric"] == "ip":
+            scores = -(query @ self.vectors.T)
+        else:
+            if self._norms is None:
+                self._norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+            scores = np.einsum("ij,ij->i", query, query)[:, None] - 2 * query @ self.vectors.T + self._norms
+        # Partial sort: only the top k need ordering.
+        indices = np.argpartition(scores, k - 1, axis=1)[:, :k] if k < len(self) else np.tile(np.arange(k), (len(query), 1))
+        order = np.argsort(np.take_along_axis(scores, indices, axis=1), axis=1)
+        indices = np.take_along_axis(indices, order, axis=1)
+        distances = np.take_along_axis(scores, indices, axis=1)
+        return (-distances if self.manifest["metric"] == "ip" else distances), indices
+
+    def reload(self) -> bool:
+        """Picks up changes written by another process. Returns True if the store changed."""
+        with open(os.path.join(self.path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["version"] == self.version and manifest["count"] == len(self):
+            return False
+        self.manifest = manifest
+        self.close()
+        return True
+
+    def close(self):
+        self._vectors = None
+        self._norms = None
+        self._texts.close()
+        self._metadata.close()
+
+    # -- writing ------------------------------------------------------------
+
+    def append(self, vectors: np.ndarray, texts: Sequence[str], metadatas: Optional[Sequence[dict]] = None):
+        """Appends rows without rewriting existing data, then bumps the manifest version."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape}")
+        if len(vectors) != len(texts) or (metadatas is not None and len(metadatas) != len(texts)):
+            raise ValueError("vectors, texts and metadatas must have the same length")
+
+        # Start from the committed rows: drop any an interrupted append left behind.
+        self.reload()
+        self.close()
+        _truncate_npy(os.path.join(self.path, VECTORS_FILE), len(self))
+        self._texts.truncate(len(self))
+        self._metadata.truncate(len(self))
+        _append_npy(os.path.join(self.path, VECTORS_FILE), vectors)
+        self._texts.append(text.encode("utf-8") for text in texts)
+        self._metadata.append(
+            json.dumps(metadata or {}).encode("utf-8") for metadata in (metadatas or [None] * len(texts))
+        )
+        manifest = {
+            **self.manifest,
+            "count": len(self) + len(texts),
+            "version": self.version + 1,
+            "updated_at": time.time(),
+        }
+        _write_json_atomic(os.path.join(self.path, MANIFEST_FILE), manifest)
+        self.manifest = manifest
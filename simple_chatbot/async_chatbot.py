@@ -0,0 +1,104 @@
+from dotenv import load_dotenv
+import os
+from langchain_core.messages import AIMessage, AIMessageChunk, message_chunk_to_message
+from langgraph.graph import StateGraph, END, START
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from checkpointing import create_checkpointer
+from history import ChatState, HistoryManager
+from llm_router import get_chat_model
+from response_cache import get_response_cache
+import telemetry
+
+# Load environment variables
+load_dotenv()
+
+# Constants
+MODEL_NAME = os.getenv("CHATBOT_MODEL", "gpt-3.5-turbo")  # "auto" routes across providers
+SYSTEM_PROMPT = """You are a helpful assistant that provides concise and accurate answers to user queries."""
+MAX_HISTORY_TOKENS = 3000  # Token budget for conversation history sent to the model
+SUMMARIZE_HISTORY = True  # Fold older turns into a running summary instead of dropping them
+CACHE_SAMPLED_RESPONSES = os.getenv("CHATBOT_CACHE_SAMPLED", "").lower() in ("1", "true", "yes")  # Also serve cached answers at temperature > 0 (opt-in)
+
+# Create prompt template
+prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+def create_async_chatbot(model: str = MODEL_NAME, llm=None):
+    """
+    Create a chatbot graph whose model node is async, for use with `ainvoke`/`astream`.
+
+    The graph is the same START -> history -> model -> END flow as `create_chatbot`, but the
+    LLM round-trip awaits `llm.astream` instead of blocking a thread, so one event
+    loop can serve many conversations at once.
+
+    Args:
+        model (str): The name of the language model to use.
+        llm (BaseChatModel, optional): A pre-built chat model, e.g. a fake for load tests.
+    """
+    # Get the shared LLM client for this model
+    if llm is None:
+        llm = get_chat_model(
+            model=model,
+            temperature=0.7
+        )
+
+    # Keep the prompt within a token budget, summarizing older turns if enabled
+    history = HistoryManager(
+        llm=llm if SUMMARIZE_HISTORY else None,
+        max_tokens=MAX_HISTORY_TOKENS
+    )
+
+    # Shared exact/semantic cache for repeated questions
+    response_cache = get_response_cache()
+
+    # Create the workflow
+    workflow = StateGraph(state_schema=ChatState)
+
+    # Define the async model node
+    async def call_model(state: ChatState):
+        """Call the model with the current state without blocking the event loop"""
+        # Format the budgeted history (summary + recent messages) with prompt template
+        formatted_prompt = prompt.format_messages(messages=history.context(state))
+
+        # Answer from the response cache if this prompt (or a near-duplicate) was seen before
+        temperature = getattr(llm, "temperature", 0.0)
+        max_tokens = getattr(llm, "max_tokens", None)
+        cached = await response_cache.alookup(
+            formatted_prompt, model, temperature, max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES
+        )
+        if cached is not None:
+            return {"messages": AIMessage(content=cached.content)}
+
+        # Stream from the model so tokens can be forwarded as they arrive,
+        # then merge the chunks so the full reply gets checkpointed
+        response = AIMessageChunk(content="")
+        async for chunk in llm.astream(formatted_prompt):
+            response += chunk
+        response = message_chunk_to_message(response)
+
+        await response_cache.astore(
+            formatted_prompt, model, temperature, response.content, max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES, usage=response.usage_metadata
+        )
+
+        # Return the updated messages state with the new response
+        return {"messages": response}
+
+    # Add the history and model nodes
+    workflow.add_node("history", telemetry.traced("node.history", history.asummarize))
+    workflow.add_node("model", telemetry.traced("node.model", call_model))
+
+    # Add edges
+    workflow.add_edge(START, "history")
+    workflow.add_edge("history", "model")
+    workflow.add_edge("model", END)
+
+    # Compile the workflow with bounded (optionally persistent) memory
+    memory = create_checkpointer()
+    app = workflow.compile(checkpointer=memory)
+
+    return app
@@ -0,0 +1,113 @@
+"""
+Benchmark per-turn latency and retained memory of the chatbot checkpointers.
+
+Runs the same START -> model -> END graph with a zero-latency fake LLM against:
+
+- `MemorySaver` (unbounded, the previous default)
+- `BoundedMemorySaver` (latest N checkpoints per thread, LRU/TTL eviction)
+- `BoundedMemorySaver` written through to `SQLiteSaver` (durable)
+
+Usage:
+    python benchmark_checkpointer.py --threads 50 --turns 40
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, END, START
+from langgraph.graph.message import MessagesState
+
+from checkpointing import BoundedMemorySaver, SQLiteSaver
+from fake_llm import FakeChatModel
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant."),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+
+def _build_app(checkpointer):
+    llm = FakeChatModel()
+
+    def call_model(state: MessagesState):
+        return {"messages": llm.invoke(prompt.format_messages(messages=state["messages"]))}
+
+    workflow = StateGraph(state_schema=MessagesState)
+    workflow.add_node("model", call_model)
+    workflow.add_edge(START, "model")
+    workflow.add_edge("model", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def _memory_saver_bytes(saver: MemorySaver) -> int:
+    size = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for (_, checkpoint), (_, metadata), _ in checkpoints.values():
+                size += len(checkpoint) + len(metadata)
+    for writes in saver.writes.values():
+        size += sum(len(write[2][1]) for write in writes.values())
+    size += sum(len(blob[1]) for blob in saver.blobs.values())
+    return size
+
+
+def run(name: str, checkpointer, threads: int, turns: int) -> dict:
+    app = _build_app(checkpointer)
+    latencies = []
+    # Interleave threads so the LRU tier sees a realistic access pattern.
+    for turn in range(turns):
+        for thread in range(threads):
+            started = time.perf_counter()
+            app.invoke(
+                {"messages": [HumanMessage(content=f"Question {turn}")]},
+                config={"configurable": {"thread_id": f"thread-{thread}"}},
+            )
+            latencies.append(time.perf_counter() - started)
+
+    if isinstance(checkpointer, BoundedMemorySaver):
+        resident_bytes = checkpointer.stats()["resident_bytes"]
+    else:
+        resident_bytes = _memory_saver_bytes(checkpointer)
+    latencies.sort()
+    return {
+        "name": name,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "last_turn_ms": statistics.mean(latencies[-threads:]) * 1000,
+        "resident_kb": resident_bytes / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50, help="Number of conversation threads")
+    parser.add_argument("--turns", type=int, default=40, help="Turns per thread")
+    parser.add_argument("--max-threads", type=int, default=20, help="Resident thread cap for the bounded tier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_saver = SQLiteSaver(os.path.join(tmp, "checkpoints.db"))
+        candidates = [
+            ("MemorySaver", MemorySaver()),
+            ("BoundedMemorySaver", BoundedMemorySaver(max_threads=args.max_threads)),
+            ("Bounded + SQLite", BoundedMemorySaver(max_threads=args.max_threads, backing=sqlite_saver)),
+        ]
+        print(f"{args.threads} threads x {args.turns} turns")
+        print(f"{'checkpointer':<20} {'mean':>8} {'p95':>8} {'last turn':>10} {'resident':>10}")
+        for name, checkpointer in candidates:
+            result = run(name, checkpointer, args.threads, args.turns)
+            print(
+                f"{result['name']:<20} {result['mean_ms']:>6.2f}ms {result['p95_ms']:>6.2f}ms "
+                f"{result['last_turn_ms']:>8.2f}ms {result['resident_kb']:>8.0f}KB"
+            )
+        print(f"SQLite store: {sqlite_saver.stats()}")
+        sqlite_saver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark prompt size and per-turn latency over a long conversation.
+
+Compares three ways of building the prompt for a 200-turn conversation:
+
+- full history (the previous behaviour)
+- token-budgeted trimming (`HistoryManager` without an LLM)
+- trimming plus rolling summarization (`HistoryManager` with an LLM)
+
+The fake LLM adds a delay proportional to the prompt length to simulate
+prefill cost, so latency tracks prompt size the way a real model's does.
+
+Usage:
+    python benchmark_history.py --turns 200 --max-tokens 1500
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langgraph.graph import StateGraph, END, START
+
+from checkpointing import create_checkpointer
+from fake_llm import FakeChatModel
+from history import ChatState, HistoryManager, TokenCounter
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant."),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+USER_MESSAGE = "Here is another detail about my project that I would like you to remember for later, number {turn}."
+REPLY = " ".join(["Thanks, noted."] + ["This is part of a longer assistant answer."] * 6)
+
+
+def _build_app(mode: str, max_tokens: int, prompt_sizes: list):
+    llm = FakeChatModel(reply=REPLY, prompt_token_delay=2e-5)
+    counter = TokenCounter()
+    history = HistoryManager(
+        llm=llm if mode == "summarize" else None,
+        max_tokens=max_tokens,
+        counter=counter,
+    )
+
+    def call_model(state: ChatState):
+        messages = state["messages"] if mode == "full" else history.context(state)
+        formatted_prompt = prompt.format_messages(messages=messages)
+        prompt_sizes.append(sum(counter.count(m) for m in formatted_prompt))
+        return {"messages": llm.invoke(formatted_prompt)}
+
+    workflow = StateGraph(state_schema=ChatState)
+    workflow.add_node("history", history.summarize)
+    workflow.add_node("model", call_model)
+    workflow.add_edge(START, "history")
+    workflow.add_edge("history", "model")
+    workflow.add_edge("model", END)
+    return workflow.compile(checkpointer=create_checkpointer(db_path=""))
+
+
+def run(mode: str, turns: int, max_tokens: int) -> dict:
+    prompt_sizes, latencies = [], []
+    app = _build_app(mode, max_tokens, prompt_sizes)
+    config = {"configurable": {"thread_id": f"benchmark-{mode}"}}
+    for turn in range(turns):
+        started = time.perf_counter()
+        app.invoke({"messages": [HumanMessage(content=USER_MESSAGE.format(turn=turn))]}, config)
+        latencies.append(time.perf_counter() - started)
+
+    tail = max(1, turns // 10)
+    return {
+        "mode": mode,
+        "first_prompt": prompt_sizes[0],
+        "last_prompt": prompt_sizes[-1],
+        "max_prompt": max(prompt_sizes),
+        "first_ms": statistics.mean(latencies[:tail]) * 1000,
+        "last_ms": statistics.mean(latencies[-tail:]) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="Conversation length")
+    parser.add_argument("--max-tokens", type=int, default=1500, help="History token budget")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, history budget {args.max_tokens} tokens")
+    print(f"{'mode':<10} {'prompt first':>13} {'prompt last':>12} {'prompt max':>11} "
+          f"{'first 10% ms':>13} {'last 10% ms':>12}")
+    for mode in ("full", "trim", "summarize"):
+        result = run(mode, args.turns, args.max_tokens)
+        print(
+            f"{result['mode']:<10} {result['first_prompt']:>13} {result['last_prompt']:>12} "
+            f"{result['max_prompt']:>11} {result['first_ms']:>13.1f} {result['last_ms']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Rerun cost of the Streamlit app versus conversation length.
+
+Streamlit reruns `streamlit-chatbot.py` from the top on every interaction,
+including clicks that have nothing to do with the conversation, so whatever
+the script does per message is paid on every click once a conversation is long.
+This drives the real script headlessly with Streamlit's `AppTest`, against
+`MockLLMServer` (in a child process), and at each conversation length reports:
+
+- rerun:    median time of a rerun without a new message (e.g. a button click)
+- elements: chat bubbles the rerun sends to the browser, which the browser
+            then lays out and renders again (not included in the time)
+- session:  pickled size of the session's `st.session_state`
+
+To compare with an older version of the app, write it next to the current one
+(so its `simple_chatbot` imports resolve) and pass it with `--script`:
+
+    git show HEAD~1:streamlit-chatbot.py > ../streamlit-chatbot-before.py
+    python benchmark_history_render.py --script ../streamlit-chatbot-before.py
+
+Usage:
+    python benchmark_history_render.py --lengths 10,50,100,200 --reruns 20
+"""
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+
+from benchmark_suite import MockProcess
+from mock_llm_server import MockBehavior
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STREAMLIT_SCRIPT = os.path.join(HERE, "..", "streamlit-chatbot.py")
+
+
+def _session_bytes(at) -> int:
+    """Pickled size of the session state; unpicklable values (the shared app) are skipped."""
+    size = 0
+    for key in list(at.session_state):
+        try:
+            size += len(pickle.dumps(at.session_state[key]))
+        except Exception:
+            pass
+    return size
+
+
+def _rerun_ms(at, reruns: int) -> float:
+    times = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default=STREAMLIT_SCRIPT, help="Streamlit script to drive")
+    parser.add_argument("--lengths", default="10,50,100,200", help="Conversation lengths (messages) to measure at")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns timed per length")
+    parser.add_argument("--reply-tokens", type=int, default=80, help="Words per mock reply")
+    args = parser.parse_args()
+    lengths = sorted(int(length) for length in args.lengths.split(","))
+
+    from streamlit.testing.v1 import AppTest
+
+    server = MockProcess(openai=MockBehavior(latency=0.0, reply_tokens=args.reply_tokens))
+    for name in [name for name in os.environ if name.startswith("CHATBOT_")]:
+        del os.environ[name]
+    os.environ.update(OPENAI_API_KEY="mock", OPENAI_API_BASE=server.openai_base, CHATBOT_MODEL="gpt-3.5-turbo",
+                      CHATBOT_BLOG_INDEX_DIR=os.path.join(HERE, "no-blog-index"))
+
+    at = AppTest.from_file(os.path.abspath(args.script), default_timeout=120)
+    at.run()
+    print(f"{os.path.basename(args.script)} ({args.reruns} reruns per length, {args.reply_tokens}-word replies):")
+    print(f"  {'messages':>8} {'rerun':>10} {'elements':>9} {'session':>10}")
+    turn = 0
+    for length in lengths:
+        while turn * 2 < length:
+            turn += 1
+            at.chat_input[0].set_value(f"Question {turn}: tell me something about topic {turn}.").run()
+            if at.exception:
+                raise SystemExit(f"The app raised: {at.exception[0].message}")
+        rerun_ms = _rerun_ms(at, args.reruns)
+        print(f"  {turn * 2:8d} {rerun_ms:8.1f}ms {len(at.chat_message):9d} {_session_bytes(at) / 1024:8.1f}KB")
+    server.stop()
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
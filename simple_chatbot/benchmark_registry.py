@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of per-request and per-session setup overhead.
+
+Before: every helper call built a new `ChatLiteLLM`, and every Streamlit
+session (and every "clear") compiled its own graph with its own checkpointer.
+After: clients and the compiled graph come from the process-wide registry.
+
+No network calls are made; this only measures the construction overhead that
+the registry removes from the request path.
+
+Usage:
+    python benchmark_registry.py --iterations 500
+"""
+import argparse
+import gc
+import time
+
+from langchain_litellm import ChatLiteLLM
+
+import langchain_litellm_openai_chatbot_example as chatbot_example
+from llm_registry import clear_registry, get_graph, get_llm, registry_stats
+
+MODEL_NAME = "gpt-3.5-turbo"
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    # Warm up (first registry lookups build the client and HTTP pool), and don't
+    # bill garbage left over from the previous measurement to this one.
+    fn()
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    clear_registry()
+    results = [
+        (
+            "LLM client: new ChatLiteLLM per call",
+            _per_call_us(lambda: ChatLiteLLM(model=MODEL_NAME, temperature=0.7, max_tokens=500), args.iterations),
+        ),
+        (
+            "LLM client: get_llm() registry lookup",
+            _per_call_us(lambda: get_llm(MODEL_NAME, temperature=0.7, max_tokens=500), args.iterations),
+        ),
+        (
+            "Graph: compile per session",
+            _per_call_us(chatbot_example.create_chatbot, max(1, args.iterations // 10)),
+        ),
+        (
+            "Graph: shared via get_graph()",
+            _per_call_us(lambda: get_graph(("chatbot", MODEL_NAME), chatbot_example.create_chatbot), args.iterations),
+        ),
+    ]
+
+    for name, micros in results:
+        print(f"{name:<40} {micros:>10.1f} us")
+    print(f"Registry: {registry_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Cold-start benchmark: import time and time to the first reply.
+
+Every measurement runs in a fresh interpreter, since imports are only slow once.
+
+1. Imports: what the Streamlit script and the CLI example import at module
+   level (i.e. before the first page render or prompt), against the full LLM
+   stack that both imported eagerly before `warmup.py`.
+2. First turn, through the CLI example's graph against `MockLLMServer`:
+   - eager:   build the chatbot before showing the prompt (the old behaviour)
+   - lazy:    show the prompt at once, build when the first message arrives
+              (CHATBOT_WARMUP=0)
+   - warm-up: show the prompt at once and build on the `Warmup` thread while
+              the user types for `--think` seconds
+   "ready" is the time until the prompt shows, "first token" the wait from
+   sending the first message to its first streamed token.
+
+`--max-import` and `--max-ready` make the run fail if the entry points got
+slower than that, so a heavy module-level import is caught.
+
+Usage:
+    python benchmark_startup.py --runs 3 --think 3 --max-import 1.0
+"""
+import time
+
+_process_started = time.perf_counter()
+
+import argparse  # noqa: E402
+import ast  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STREAMLIT_SCRIPT = os.path.join(HERE, "..", "streamlit-chatbot.py")
+# What the Streamlit script and the CLI imported at module level before the warm-up.
+EAGER_STACK = ["langchain_core.prompts", "langgraph.graph", "blog_retrieval", "checkpointing", "history",
+               "llm_router", "response_cache", "chat_streaming", "telemetry"]
+
+
+def _module_imports(path: str) -> list:
+    """The module-level import statements of a script, as source lines."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+# --- Child process: one measurement, printed as JSON ---
+
+def _child_imports(target: str) -> dict:
+    skipped = []
+    if target == "streamlit":
+        for statement in _module_imports(STREAMLIT_SCRIPT):
+            if statement.split()[1].split(".")[0] == "streamlit":
+                # Not a cost of this repo's code, and not installed everywhere.
+                skipped.append(statement)
+                continue
+            exec(statement, {})
+    elif target == "cli":
+        import langchain_litellm_openai_chatbot_example  # noqa: F401
+    else:
+        for module in EAGER_STACK:
+            __import__(module)
+    return {"import_s": time.perf_counter() - _process_started, "modules": len(sys.modules), "skipped": skipped}
+
+
+def _child_first_turn(mode: str, think: float) -> dict:
+    import langchain_litellm_openai_chatbot_example as cli
+    from langchain_core.messages import HumanMessage
+    from chat_streaming import stream_reply
+    from warmup import Warmup
+
+    warmup = Warmup(cli.create_chatbot, model=cli.MODEL_NAME)
+    if mode == "eager":
+        warmup.result()
+    elif mode == "warm-up":
+        warmup.start()
+    ready = time.perf_counter() - _process_started
+
+    time.sleep(think)  # the user reads the banner and types
+    sent = time.perf_counter()
+    app = warmup.result()
+    first_token = None
+    for _ in stream_reply(app, [HumanMessage(content="Hello, what can you do?")], "benchmark"):
+        if first_token is None:
+            first_token = time.perf_counter() - sent
+    return {"ready_s": ready, "first_token_s": first_token, "warmup": warmup.timings}
+
+
+# --- Parent process ---
+
+def _run_child(args: list, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", *args],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _median(results: list, key: str) -> float:
+    return statistics.median(result[key] for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--think", type=float, default=3.0, help="Seconds the user takes to type the first message")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock provider latency (s)")
+    parser.add_argument("--max-import", type=float, default=None,
+                        help="Fail if the Streamlit or CLI module-level imports take longer (s)")
+    parser.add_argument("--max-ready", type=float, default=None,
+                        help="Fail if the CLI with warm-up takes longer to show its prompt (s)")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, target = args.child[0], args.child[1]
+        result = _child_imports(target) if kind == "imports" else _child_first_turn(target, float(args.child[2]))
+        print(json.dumps(result))
+        return
+
+    from mock_llm_server import MockBehavior, MockLLMServer
+
+    server = MockLLMServer(openai=MockBehavior(latency=args.latency)).start()
+    env = {key: value for key, value in os.environ.items() if not key.startswith("CHATBOT_")}
+    env.update(OPENAI_API_KEY="mock", OPENAI_API_BASE=server.openai_base, CHATBOT_MODEL="gpt-3.5-turbo")
+
+    failures = []
+    print(f"Module-level imports (median of {args.runs} fresh processes):")
+    for target, label in (("stack", "full LLM stack (before)"), ("streamlit", "streamlit-chatbot.py"),
+                          ("cli", "CLI example")):
+        results = [_run_child(["imports", target], env) for _ in range(args.runs)]
+        seconds = _median(results, "import_s")
+        note = f"  (skipped: {'; '.join(results[0]['skipped'])})" if results[0]["skipped"] else ""
+        print(f"  {label:<26} {seconds:6.2f}s  {results[0]['modules']:5d} modules{note}")
+        if args.max_import is not None and target != "stack" and seconds > args.max_import:
+            failures.append(f"{label} imports take {seconds:.2f}s > {args.max_import:.2f}s")
+
+    print(f"\nFirst turn ({args.think:.0f}s to type the first message, mock latency {args.latency:.2f}s):")
+    print(f"  {'mode':<10} {'ready':>7} {'first token':>12}")
+    for mode in ("eager", "lazy", "warm-up"):
+        results = [_run_child(["first-turn", mode, str(args.think)], env) for _ in range(args.runs)]
+        ready, first_token = _median(results, "ready_s"), _median(results, "first_token_s")
+        print(f"  {mode:<10} {ready:6.2f}s {first_token:11.2f}s")
+        if mode == "warm-up":
+            timings = " · ".join(f"{step} {seconds:.2f}s" for step, seconds in results[-1]["warmup"].items())
+            print(f"  warm-up thread: {timings}")
+            if args.max_ready is not None and ready > args.max_ready:
+                failures.append(f"CLI ready after {ready:.2f}s > {args.max_ready:.2f}s")
+    server.stop()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Offline end-to-end benchmarks against `MockLLMServer`, with JSON results.
+
+The mock plays OpenAI chat and embeddings (latency, token rate, reply length
+and error injection set by the flags below), so every entry point runs its real
+code path, LiteLLM and the OpenAI SDK included, without API keys or network:
+
+    single_turn          `get_single_llm_response` (invoke) and one streamed turn
+                         of the CLI chatbot graph (`create_chatbot`) per thread
+    history_growth       one long conversation: prompt tokens and latency per turn
+                         as the history (and its summary) grows
+    concurrent_sessions  `--sessions` threads chatting through one shared graph,
+                         as Streamlit sessions do
+    ingestion            synthetic blog posts -> `Chunker` -> `BatchEmbedder`
+                         (OpenAI backend) -> `VectorStore` -> faiss + BM25 indexes
+    retrieval            hybrid `RAGPipeline.retrieve_batch` over that index: one
+                         question at a time, concurrent, and batched
+
+Metric names end in `_s` (seconds, lower is better) or `_per_s` (throughput,
+higher is better); other metrics are counts. `--output` writes the results with
+the git commit and settings; `--compare` prints the change against an earlier
+file and `--max-regression` fails the run if a timed metric got worse by more
+than that many percent.
+
+CHATBOT_* variables are ignored, so the run doesn't pick up a persistent
+checkpointer, response cache or telemetry from the environment.
+
+Usage:
+    python benchmark_suite.py --output before.json
+    python benchmark_suite.py --output after.json --compare before.json --max-regression 15
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_llm_server import MockBehavior, MockLLMServer
+
+SCENARIOS = ("single_turn", "history_growth", "concurrent_sessions", "ingestion", "retrieval")
+EMBEDDING_MODEL = "text-embedding-3-small"
+TOPICS = ["agents", "rerankers", "evaluation", "embeddings", "retrieval", "observability", "indexing", "routing",
+          "workflows", "memory", "parsing", "multimodal"]
+WORDS = ["the", "index", "query", "engine", "returns", "nodes", "with", "scores", "and", "metadata", "from",
+         "a", "vector", "store", "while", "an", "llm", "writes", "answers", "using", "context", "windows"]
+
+
+class MockProcess:
+    """
+    Runs `MockLLMServer` in a child process, so its request handling doesn't
+    compete with the benchmarked client for the GIL.
+    """
+
+    def __init__(self, **server_kwargs):
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=self._serve, args=(child, server_kwargs), daemon=True)
+        self._process.start()
+        self.openai_base = self._conn.recv()
+        self.responses = {}
+
+    @staticmethod
+    def _serve(conn, server_kwargs):
+        server = MockLLMServer(**server_kwargs).start()
+        conn.send(server.openai_base)
+        conn.recv()
+        conn.send({f"{provider} {status}": count for (provider, status), count in server.responses.items()})
+        server.stop()
+
+    def stop(self):
+        """Stops the server and collects its response counts."""
+        self._conn.send("stop")
+        self.responses = self._conn.recv()
+        self._process.join()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def _stream_turn(app, question: str, thread_id: str):
+    """One streamed turn; returns (ttft, total) in seconds."""
+    from langchain_core.messages import HumanMessage
+    from chat_streaming import StreamStats, stream_reply
+
+    stats = StreamStats()
+    for _ in stream_reply(app, [HumanMessage(content=question)], thread_id, stats):
+        pass
+    return stats.ttft, stats.total_time
+
+
+# --- Scenarios ---
+
+def single_turn(args) -> dict:
+    import langchain_litellm_openai_chatbot_example as chatbot_example
+    from langchain_litellm_openai_chat_simple_example import get_single_llm_response
+
+    # The simple example prints the full request and response.
+    with contextlib.redirect_stdout(io.StringIO()):
+        first_s, _ = _timed(get_single_llm_response, "Warm-up question about llama-index")
+        invoke = [_timed(get_single_llm_response, f"Question {i} about {TOPICS[i % len(TOPICS)]}")[0]
+                  for i in range(args.turns)]
+
+    app = chatbot_example.create_chatbot()
+    cpu_started = time.process_time()
+    streamed = [_stream_turn(app, f"Streamed question {i} about {TOPICS[i % len(TOPICS)]}", str(uuid.uuid4()))
+                for i in range(args.turns)]
+    cpu_s = (time.process_time() - cpu_started) / args.turns
+    ttft, total = [s[0] for s in streamed], [s[1] for s in streamed]
+    return {
+        "first_invoke_s": first_s,
+        "invoke_p50_s": statistics.median(invoke),
+        "invoke_p95_s": _percentile(invoke, 95),
+        "stream_ttft_p50_s": statistics.median(ttft),
+        "stream_ttft_p95_s": _percentile(ttft, 95),
+        "stream_total_p50_s": statistics.median(total),
+        "stream_total_p95_s": _percentile(total, 95),
+        # Client CPU per streamed turn; it bounds turns/s per process under the GIL.
+        "stream_cpu_per_turn_s": cpu_s,
+    }
+
+
+def history_growth(args) -> dict:
+    import langchain_litellm_openai_chatbot_example as chatbot_example
+    import telemetry
+
+    app = chatbot_example.create_chatbot()
+    thread_id = str(uuid.uuid4())
+    prompt_tokens, latencies, summaries = [], [], 0
+    for i in range(args.history_turns):
+        with telemetry.collect() as spans:
+            _, total = _stream_turn(app, f"Turn {i}: tell me more about {TOPICS[i % len(TOPICS)]}", thread_id)
+        calls = [span for span in spans if span.name == "llm.call"]
+        # The model node's call comes last; any earlier one folded history into the summary.
+        summaries += len(calls) - 1
+        prompt_tokens.append(calls[-1].attributes.get("prompt_tokens") or 0)
+        latencies.append(total)
+    tail = max(1, args.history_turns // 4)
+    return {
+        "turns": args.history_turns,
+        "summaries": summaries,
+        "prompt_tokens_first": prompt_tokens[0],
+        "prompt_tokens_max": max(prompt_tokens),
+        "prompt_tokens_last": prompt_tokens[-1],
+        "first_turns_p50_s": statistics.median(latencies[:tail]),
+        "last_turns_p50_s": statistics.median(latencies[-tail:]),
+    }
+
+
+def concurrent_sessions(args) -> dict:
+    import langchain_litellm_openai_chatbot_example as chatbot_example
+
+    app = chatbot_example.create_chatbot()
+    ttfts, totals, errors = [], [], []
+    lock = threading.Lock()
+
+    def session(index: int):
+        thread_id = str(uuid.uuid4())
+        for turn in range(args.session_turns):
+            try:
+                ttft, total = _stream_turn(app, f"Session {index} turn {turn} about {TOPICS[turn % len(TOPICS)]}",
+                                           thread_id)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            with lock:
+                ttfts.append(ttft)
+                totals.append(total)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "sessions": args.sessions,
+        "turns": len(totals),
+        "errors": len(errors),
+        "turns_per_s": len(totals) / elapsed,
+        "ttft_p50_s": statistics.median(ttfts),
+        "ttft_p95_s": _percentile(ttfts, 95),
+        "turn_p50_s": statistics.median(totals),
+        "turn_p95_s": _percentile(totals, 95),
+    }
+
+
+def _blog_modules():
+    from blog_retrieval import DEFAULT_INDEX_DIR
+
+    if DEFAULT_INDEX_DIR not in sys.path:
+        sys.path.insert(0, DEFAULT_INDEX_DIR)
+
+
+def _synthetic_post(rng: random.Random, index: int, sections: int = 4, paragraphs: int = 5) -> str:
+    """A blog post page in the markup `Chunker.chunk_html` expects."""
+    from chunker import POST_CONTENT_CLASS
+
+    body = []
+    for section in range(sections):
+        topic = rng.choice(TOPICS)
+        body.append(f"<h2>{topic.title()} in practice, part {section + 1}</h2>")
+        for _ in range(paragraphs):
+            sentences = [
+                " ".join([topic.title()] + rng.choices(WORDS, k=rng.randint(8, 20))) + "."
+                for _ in range(rng.randint(2, 5))
+            ]
+            body.append(f"<p>{' '.join(sentences)}</p>")
+    return (f"<html><body><h1>Post {index}: {rng.choice(TOPICS)} with llama-index</h1>"
+            f"<div class=\"{POST_CONTENT_CLASS}\">{''.join(body)}</div></body></html>")
+
+
+def _embedder(server):
+    import openai
+    from embeddings import BatchEmbedder, OpenAIEmbeddingBackend
+
+    client = openai.OpenAI(base_url=server.openai_base, api_key="mock")
+    return BatchEmbedder(OpenAIEmbeddingBackend(client, model=EMBEDDING_MODEL))
+
+
+def ingestion(args, server, directory: str) -> dict:
+    _blog_modules()
+    from bm25 import BM25Index
+    from chunker import Chunker
+    from retriever import Retriever
+    from vector_store import VectorStore
+
+    rng = random.Random(0)
+    pages = [_synthetic_post(rng, i) for i in range(args.posts)]
+    chunker = Chunker()
+    timings = {}
+
+    chunk_s, chunks = _timed(lambda: [chunk for page in pages for chunk in chunker.chunk_html(page)])
+    embedder = _embedder(server)
+    embed_s, vectors = _timed(embedder.embed, [chunk.to_text() for chunk in chunks])
+    store_s, store = _timed(lambda: VectorStore.from_arrays(
+        os.path.join(directory, "vector_store"), vectors, [chunk.to_text() for chunk in chunks],
+        [chunk.metadata() for chunk in chunks], model=embedder.model))
+    faiss_s, _ = _timed(lambda: Retriever.build(store).save(os.path.join(directory, "vector_index")))
+    bm25_s, _ = _timed(lambda: BM25Index.from_store(store).save(os.path.join(directory, "bm25_index")))
+    timings.update(chunk_s=chunk_s, embed_s=embed_s, store_s=store_s, faiss_s=faiss_s, bm25_s=bm25_s)
+    total = sum(timings.values())
+    return {
+        "posts": args.posts,
+        "chunks": len(chunks),
+        "embedding_requests": embedder.stats["requests"],
+        **timings,
+        "total_s": total,
+        "chunks_per_s": len(chunks) / total,
+    }
+
+
+def retrieval(args, server, directory: str) -> dict:
+    _blog_modules()
+    from bm25 import BM25Index
+    from rag import RAGPipeline
+    from retriever import Retriever
+    from vector_store import VectorStore
+
+    store = VectorStore.open(os.path.join(directory, "vector_store"))
+    pipeline = RAGPipeline(
+        Retriever.load(store, os.path.join(directory, "vector_index")),
+        # Without the embedder's request-rate limit (sized for ingestion), which
+        # would otherwise be all that one-question retrieval measures.
+        _embedder(server),
+        lexical=BM25Index.load(os.path.join(directory, "bm25_index")),
+    )
+    rng = random.Random(1)
+    questions = [f"How do {rng.choice(TOPICS)} and {rng.choice(TOPICS)} work with the {rng.choice(WORDS)} {i}?"
+                 for i in range(args.questions)]
+    pipeline.retrieve_batch(questions[:1], args.k)  # first connection
+
+    single = [_timed(pipeline.retrieve_batch, [question], args.k)[0] for question in questions]
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        concurrent_s, _ = _timed(lambda: list(executor.map(lambda q: pipeline.retrieve_batch([q], args.k), questions)))
+    batch_s, _ = _timed(pipeline.retrieve_batch, questions, args.k)
+    return {
+        "questions": len(questions),
+        "single_p50_s": statistics.median(single),
+        "single_p95_s": _percentile(single, 95),
+        "single_per_s": len(questions) / sum(single),
+        "concurrent_per_s": len(questions) / concurrent_s,
+        "batch_per_s": len(questions) / batch_s,
+    }
+
+
+# --- Results ---
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results: dict):
+    for scenario, metrics in results.items():
+        print(f"\n{scenario}")
+        for name, value in metrics.items():
+            print(f"  {name:<22} {value:10.4f}" if isinstance(value, float) else f"  {name:<22} {value:10}")
+
+
+def compare(baseline: dict, results: dict, max_regression=None) -> list:
+    """Prints the change of every shared metric; returns the timed metrics that regressed past the limit."""
+    print(f"\nChange vs {baseline.get('commit') or 'baseline'}:")
+    regressions = []
+    for scenario, metrics in results.items():
+        for name, value in metrics.items():
+            before = baseline.get("results", {}).get(scenario, {}).get(name)
+            if not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / before
+            # Lower is better for durations, higher for throughput.
+            worse = change if name.endswith("_s") and not name.endswith("_per_s") else -change
+            timed = name.endswith("_s")
+            flag = ""
+            if timed and max_regression is not None and worse * 100 > max_regression:
+                regressions.append(f"{scenario}.{name} {change:+.1%}")
+                flag = "  REGRESSION"
+            print(f"  {scenario + '.' + name:<42} {before:10.4g} -> {value:10.4g}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset to run")
+    parser.add_argument("--turns", type=int, default=20, help="single_turn: calls per measurement")
+    parser.add_argument("--history-turns", type=int, default=40, help="history_growth: turns in the conversation")
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent_sessions: concurrent sessions")
+    parser.add_argument("--session-turns", type=int, default=5, help="concurrent_sessions: turns per session")
+    parser.add_argument("--posts", type=int, default=200, help="ingestion: synthetic blog posts")
+    parser.add_argument("--questions", type=int, default=200, help="retrieval: questions")
+    parser.add_argument("-k", type=int, default=3, help="retrieval: chunks per question")
+    parser.add_argument("--workers", type=int, default=8, help="retrieval: concurrent questions")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock chat latency before the first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Mock streaming rate")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="Mock reply length in words")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Mock embeddings latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock fraction of 500s (retried)")
+    parser.add_argument("--seed", type=int, default=0, help="Mock seed for the error dice")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Fail if a timed metric is worse than --compare by more than this many percent")
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    chat = MockBehavior(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        reply_tokens=args.reply_tokens, error_rate=args.error_rate)
+    embeddings = MockBehavior(latency=args.embedding_latency, error_rate=args.error_rate)
+    server = MockProcess(openai=chat, embeddings=embeddings, seed=args.seed)
+    for name in [name for name in os.environ if name.startswith("CHATBOT_")]:
+        del os.environ[name]
+    os.environ.update(OPENAI_API_KEY="mock", OPENAI_API_BASE=server.openai_base, CHATBOT_MODEL="gpt-3.5-turbo")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for scenario in SCENARIOS:
+            if scenario not in scenarios:
+                continue
+            if scenario == "retrieval" and "ingestion" not in results:
+                ingestion(args, server, directory)  # builds the index to search
+            print(f"Running {scenario}...", file=sys.stderr)
+            if scenario in ("ingestion", "retrieval"):
+                results[scenario] = globals()[scenario](args, server, directory)
+            else:
+                results[scenario] = globals()[scenario](args)
+    server.stop()
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "config": {name: value for name, value in vars(args).items() if name not in ("output", "compare")},
+        "mock_responses": server.responses,
+        "results": results,
+    }
+    _print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.max_regression)
+        if regressions:
+            print(f"\nFAIL: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
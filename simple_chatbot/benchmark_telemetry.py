@@ -0,0 +1,154 @@
+"""
+Overhead of the telemetry layer, disabled and enabled.
+
+1. Per span: a `with span(...)` block and an `annotate(...)` call while the
+   layer is off (the default), on without exporters, and on with the
+   Prometheus exporter.
+2. Per turn: the chatbot graph (history -> model, streamed through
+   `stream_reply`) with the real `ChatLiteLLM` -> `LLMController` path and the
+   bounded checkpointer. LiteLLM's `mock_response` stands in for the provider,
+   so no network is used and the turn is far shorter than a real one, which
+   makes the overhead look larger than it is.
+
+The disabled cost per turn is estimated as spans per turn x the cost of a
+disabled span, since the instrumented code paths can't be switched out.
+
+Usage:
+    python benchmark_telemetry.py --turns 300
+"""
+import argparse
+import gc
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_litellm import ChatLiteLLM
+from langgraph.graph import StateGraph, END, START
+
+import telemetry
+from chat_streaming import stream_reply
+from checkpointing import create_checkpointer
+from history import ChatState, HistoryManager
+from llm_control import ControlledLiteLLMClient, get_controller
+
+MODEL_NAME = "gpt-3.5-turbo"
+REPLY = "This is a canned reply from LiteLLM's mock response, used to time the graph without a provider."
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant."),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+
+def _build_app():
+    llm = ChatLiteLLM(model=MODEL_NAME, api_key="mock", model_kwargs={"mock_response": REPLY})
+    llm.client = ControlledLiteLLMClient(get_controller("openai"))
+    history = HistoryManager(max_tokens=3000)
+
+    def call_model(state: ChatState):
+        response = None
+        for chunk in llm.stream(prompt.format_messages(messages=history.context(state))):
+            response = chunk if response is None else response + chunk
+        return {"messages": response}
+
+    workflow = StateGraph(state_schema=ChatState)
+    workflow.add_node("history", telemetry.traced("node.history", history.summarize))
+    workflow.add_node("model", telemetry.traced("node.model", call_model))
+    workflow.add_edge(START, "history")
+    workflow.add_edge("history", "model")
+    workflow.add_edge("model", END)
+    return workflow.compile(checkpointer=create_checkpointer())
+
+
+def _per_op_ns(fn, iterations: int) -> float:
+    fn()
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def _span_block():
+    with telemetry.span("benchmark", key="value"):
+        pass
+
+
+def _annotate():
+    telemetry.annotate(key="value")
+
+
+def _turn_ms(app, turns: int) -> list:
+    thread_id = str(uuid.uuid4())
+    times = []
+    for i in range(turns):
+        # A new thread every 10 turns keeps the history (and prompt) short.
+        if i % 10 == 0:
+            thread_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        for _ in stream_reply(app, [HumanMessage(content=f"Question {i}")], thread_id):
+            pass
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000, help="Iterations per span measurement")
+    parser.add_argument("--turns", type=int, default=300, help="Graph turns per mode")
+    args = parser.parse_args()
+
+    print("Per operation:")
+    baseline = _per_op_ns(lambda: None, args.iterations)
+    span_ns = {}
+    for mode, exporters in (("disabled", None), ("enabled", []), ("enabled + Prometheus", [telemetry.PrometheusExporter()])):
+        if exporters is None:
+            telemetry.configure(enabled=False)
+        else:
+            telemetry.configure(enabled=True, exporters=exporters)
+        span_ns[mode] = _per_op_ns(_span_block, args.iterations) - baseline
+        annotate_ns = _per_op_ns(_annotate, args.iterations) - baseline
+        print(f"  {mode:<22} span {span_ns[mode]:8.0f} ns   annotate {annotate_ns:6.0f} ns")
+    telemetry.configure(enabled=False)
+
+    app = _build_app()
+    _turn_ms(app, 20)  # warm up LiteLLM and the graph
+    with telemetry.collect() as spans:
+        _turn_ms(app, 1)
+    spans_per_turn = len(spans)
+
+    print(f"\nPer turn ({args.turns} turns per mode, {spans_per_turn} spans per turn):")
+    modes = {
+        "disabled": lambda: telemetry.configure(enabled=False),
+        "enabled": lambda: telemetry.configure(enabled=True),
+        "enabled + Prometheus": lambda: telemetry.configure(enabled=True, exporters=[prometheus]),
+        "collect() (debug panel)": lambda: telemetry.configure(enabled=False),
+    }
+    prometheus = telemetry.PrometheusExporter()
+    times = {mode: [] for mode in modes}
+    # Alternate the modes in short rounds so drift in LiteLLM or the machine hits them equally.
+    rounds = max(1, args.turns // 10)
+    for _ in range(rounds):
+        for mode, setup in modes.items():
+            setup()
+            if mode.startswith("collect"):
+                with telemetry.collect():
+                    times[mode] += _turn_ms(app, args.turns // rounds)
+            else:
+                times[mode] += _turn_ms(app, args.turns // rounds)
+    telemetry.configure(enabled=False)
+    results = {mode: statistics.median(values) for mode, values in times.items()}
+
+    disabled = results["disabled"]
+    for mode, median_ms in results.items():
+        overhead = "" if mode == "disabled" else f"  ({(median_ms - disabled) / disabled:+.1%} vs disabled)"
+        print(f"  {mode:<24} median {median_ms:7.3f} ms{overhead}")
+    disabled_cost_ms = spans_per_turn * span_ns["disabled"] / 1e6
+    print(f"\nDisabled layer: ~{disabled_cost_ms * 1000:.1f} us per turn "
+          f"({disabled_cost_ms / disabled:.3%} of a turn against the mock provider)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Retrieval over the LlamaIndex blog index for the chatbot graphs.
+
+The blog RAG index (vector store, faiss index and BM25 index built by
+`llama-index-blog-chatbot-main/src/crawl_data_and_build_from_scratch.ipynb`)
+is loaded once per process by `BackgroundRetriever`, on a daemon thread, so
+the app is usable straight away. Until the index is ready (or if it cannot be
+loaded) turns are answered without blog context.
+
+- `RAGChatState` extends `ChatState` with the turn's retrieved `context` and
+  per-stage `timings` (milliseconds).
+- `make_retrieve_node(retriever, k)` returns the `retrieve` graph node, which
+  searches with the latest user message.
+- `context_message(context)` renders the retrieved chunks for the model.
+- `source_refs(context)` keeps what the chat UI lists under a reply (label,
+  URL, score), small enough to store on the reply message.
+
+Configured from the environment:
+    CHATBOT_BLOG_INDEX_DIR: Directory holding `vector_store/`, `vector_index/`
+        and `bm25_index/` (default: the blog project's `src/`).
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from history import ChatState
+import telemetry
+
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llama-index-blog-chatbot-main", "src"
+)
+DEFAULT_TOP_K = 3
+MAX_SOURCE_CHARS = 2000
+
+CONTEXT_PROMPT = """Excerpts from the LlamaIndex blog that may help with the user's latest message are below.
+Use them when they are relevant and cite the post titles you used; ignore them otherwise.
+---------------------
+{context}
+---------------------"""
+
+
+class RAGChatState(ChatState):
+    """ChatState plus the blog chunks retrieved for the current turn and the turn's timings."""
+
+    context: List[dict]
+    timings: dict
+
+
+def load_blog_pipeline(index_dir: str = DEFAULT_INDEX_DIR):
+    """
+    Opens the persisted blog index in `index_dir` and returns a retrieval-only `RAGPipeline`.
+
+    The faiss and BM25 indexes are loaded if they match the vector store and
+    rebuilt (and saved) otherwise. Raises if the vector store does not exist.
+    """
+    if index_dir not in sys.path:
+        sys.path.insert(0, index_dir)
+    from bm25 import BM25Index
+    from embeddings import BatchEmbedder, OpenAIEmbeddingBackend
+    from hybrid import LatencyBudget
+    from rag import RAGPipeline
+    from retriever import Retriever
+    from vector_store import VectorStore
+
+    store = VectorStore.open(os.path.join(index_dir, "vector_store"))
+    retriever = Retriever.load_or_build(store, os.path.join(index_dir, "vector_index"))
+    lexical = BM25Index.load_or_build(store, os.path.join(index_dir, "bm25_index"))
+    embedder = BatchEmbedder(OpenAIEmbeddingBackend(model=store.model))
+    return RAGPipeline(retriever, embedder, lexical=lexical, budget=TracedBudget(LatencyBudget()))
+
+
+class TracedBudget:
+    """
+    Wraps the pipeline's `LatencyBudget` so each retrieval stage is also a
+    telemetry span (query embedding, faiss search, BM25 search, fusion).
+    """
+
+    SPANS = {"embed": "embedding", "dense": "index.search", "lexical": "bm25.search", "fuse": "retrieval.fuse"}
+
+    def __init__(self, budget):
+        self._budget = budget
+
+    @contextmanager
+    def stage(self, stage: str):
+        with telemetry.span(self.SPANS.get(stage, f"retrieval.{stage}")), self._budget.stage(stage):
+            yield
+
+    def __getattr__(self, name: str):
+        return getattr(self._budget, name)
+
+
+class BackgroundRetriever:
+    """
+    Loads a retrieval pipeline on a background thread and serves it once ready.
+
+    Args:
+        loader (callable): Returns an object with `retrieve_batch(questions, k)`,
+            e.g. `load_blog_pipeline`.
+    """
+
+    def __init__(self, loader: Callable[[], object]):
+        self._loader = loader
+        self._pipeline = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+
+    def start(self) -> "BackgroundRetriever":
+        """Starts loading if it hasn't started yet; returns immediately."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="blog-index-loader", daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self._pipeline = self._loader()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.load_time = time.perf_counter() - started
+            self._ready.set()
+
+    @property
+    def status(self) -> str:
+        """One of "not started", "loading", "ready" or "failed"."""
+        if self._thread is None:
+            return "not started"
+        if not self._ready.is_set():
+            return "loading"
+        return "ready" if self._pipeline is not None else "failed"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Starts loading and waits up to `timeout` seconds. Returns True once ready."""
+        self.start()
+        self._ready.wait(timeout)
+        return self._pipeline is not None
+
+    def retrieve(self, question: str, k: int = DEFAULT_TOP_K) -> List[dict]:
+        """
+        Returns the top-k chunks for `question` as source dicts (text, score and
+        the chunk metadata), or an empty list while the index is not ready.
+        """
+        if not self.wait(timeout=0):
+            return []
+        return [
+            {**chunk.metadata, "text": chunk.text, "score": float(chunk.score)}
+            for chunk in self._pipeline.retrieve_batch([question], k)[0]
+        ]
+
+
+_shared_retriever = None
+_shared_lock = threading.Lock()
+
+
+def get_blog_retriever() -> BackgroundRetriever:
+    """
+    Returns the process-wide blog retriever, starting its background load on first use.
+
+    Every graph and browser session shares it, so the index is loaded once per process.
+    """
+    global _shared_retriever
+    with _shared_lock:
+        if _shared_retriever is None:
+            index_dir = os.getenv("CHATBOT_BLOG_INDEX_DIR", DEFAULT_INDEX_DIR)
+            _shared_retriever = BackgroundRetriever(lambda: load_blog_pipeline(index_dir)).start()
+        return _shared_retriever
+
+
+def _latest_question(state: ChatState) -> Optional[str]:
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            return message.content if isinstance(message.content, str) else None
+    return None
+
+
+def make_retrieve_node(retriever: BackgroundRetriever, k: int = DEFAULT_TOP_K):
+    """
+    Returns the graph node that retrieves blog context for the latest user message.
+
+    The node never blocks on the index load and never fails the turn: while the
+    index is loading, or if it failed to load or retrieval raises, the turn gets
+    no context. The error is recorded on the span and as the turn's
+    `retrieval_error` timing, so the UI can say why a reply has no sources.
+    """
+
+    def retrieve(state: RAGChatState):
+        started = time.perf_counter()
+        question = _latest_question(state)
+        context, error = [], None
+        if question:
+            try:
+                context = retriever.retrieve(question, k)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        status = retriever.status
+        if error is None and status == "failed":
+            error = retriever.error
+        telemetry.annotate(index=status, chunks=len(context), **({"error": error} if error else {}))
+        timings = {"retrieval_ms": (time.perf_counter() - started) * 1000, "index": status}
+        if error:
+            timings["retrieval_error"] = error
+        return {"context": context, "timings": timings}
+
+    return retrieve
+
+
+def context_message(context: List[dict]) -> Optional[SystemMessage]:
+    """Renders retrieved chunks as a system message, or None if there are none."""
+    if not context:
+        return None
+    excerpts = "\n\n".join(source["text"][:MAX_SOURCE_CHARS] for source in context)
+    return SystemMessage(content=CONTEXT_PROMPT.format(context=excerpts))
+
+
+def source_label(source: dict) -> str:
+    """Short label for a retrieved chunk: its post title and section, or its first line."""
+    title = source.get("title") or source["text"].split("\n", 1)[0].removeprefix("Title:").strip()
+    section = source.get("section")
+    return f"{title} — {section}" if section else title
+
+
+def source_refs(context: List[dict]) -> List[dict]:
+    """The label, URL and score of each retrieved chunk, without its text."""
+    return [{"label": source_label(source), "url": source.get("url"), "score": source["score"]}
+            for source in context or []]
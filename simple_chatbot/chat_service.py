@@ -0,0 +1,177 @@
+"""
+A small ASGI chat service built on the async chatbot graph.
+
+Routes:
+    POST /threads/{thread_id}/messages   body: {"content": "..."}
+        Streams the reply as Server-Sent Events:
+            event: token  data: {"content": "..."}
+            event: done   data: {"ttft": ..., "total_time": ..., "chunks": ...}
+            event: error  data: {"detail": "..."}
+        A second message for a thread whose reply is still streaming gets a 409.
+    GET /healthz
+
+The service is a plain ASGI callable with no framework dependency. Run it with
+any ASGI server, for example:
+
+    uvicorn chat_service:create_chat_service --factory --port 8000
+"""
+import json
+import re
+
+from langchain_core.messages import HumanMessage
+
+from async_chatbot import create_async_chatbot
+from chat_streaming import StreamStats, astream_reply
+
+THREAD_MESSAGES_ROUTE = re.compile(r"/threads/(?P<thread_id>[A-Za-z0-9_.:-]{1,128})/messages")
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ClientDisconnected(Exception):
+    """The client went away while its reply was streaming."""
+
+
+def _sse_event(event: str, data: dict) -> bytes:
+    """Encodes one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def _send_json(send, status: int, data: dict):
+    """Sends a complete JSON response."""
+    body = json.dumps(data).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_sse(send, message: dict):
+    """Sends part of an event-stream response, raising ClientDisconnected if the client is gone."""
+    try:
+        await send(message)
+    except OSError as e:
+        # ASGI servers raise an OSError subclass from `send` on a closed connection.
+        raise ClientDisconnected() from e
+
+
+async def _read_body(receive) -> bytes:
+    """Reads the full request body, raising ValueError if it is too large."""
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("Client disconnected before sending the body")
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if not message.get("more_body", False):
+            return body
+
+
+def create_chat_service(chatbot=None):
+    """
+    Creates the ASGI chat application.
+
+    Args:
+        chatbot: A compiled async LangGraph app. Defaults to `create_async_chatbot()`.
+                 One graph serves every thread; conversations are isolated by thread_id.
+
+    Returns:
+        An ASGI callable.
+    """
+    if chatbot is None:
+        chatbot = create_async_chatbot()
+    # Threads with a reply in progress; concurrent turns would race on the checkpoint.
+    active_threads = set()
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+
+        if path == "/healthz":
+            await _send_json(send, 200, {"status": "ok"})
+            return
+
+        match = THREAD_MESSAGES_ROUTE.fullmatch(path)
+        if not match:
+            await _send_json(send, 404, {"detail": "Not found"})
+            return
+        if method != "POST":
+            await _send_json(send, 405, {"detail": "Method not allowed"})
+            return
+
+        try:
+            payload = json.loads(await _read_body(receive))
+            content = payload["content"]
+            if not isinstance(content, str) or not content.strip():
+                raise ValueError("'content' must be a non-empty string")
+        except ConnectionError:
+            return
+        except (ValueError, KeyError, TypeError) as e:
+            await _send_json(send, 400, {"detail": f"Invalid request: {e}"})
+            return
+
+        thread_id = match["thread_id"]
+        if thread_id in active_threads:
+            await _send_json(send, 409, {"detail": "A reply is already streaming on this thread"})
+            return
+        active_threads.add(thread_id)
+        try:
+            await _stream_reply(send, content, thread_id)
+        except ClientDisconnected:
+            # Nobody is left to answer; `_stream_reply` already closed the reply
+            # stream, which cancels the LLM call.
+            pass
+        finally:
+            active_threads.discard(thread_id)
+
+    async def _stream_reply(send, content: str, thread_id: str):
+        await _send_sse(send, {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+            ],
+        })
+
+        stats = StreamStats()
+        reply = astream_reply(chatbot, [HumanMessage(content=content)], thread_id, stats)
+        try:
+            async for token in reply:
+                await _send_sse(send, {
+                    "type": "http.response.body",
+                    "body": _sse_event("token", {"content": token}),
+                    "more_body": True,
+                })
+            event = _sse_event("done", {
+                "ttft": stats.ttft,
+                "total_time": stats.total_time,
+                "chunks": stats.chunks,
+            })
+        except ClientDisconnected:
+            raise
+        except Exception as e:
+            event = _sse_event("error", {"detail": str(e)})
+        finally:
+            await reply.aclose()
+
+        await _send_sse(send, {"type": "http.response.body", "body": event, "more_body": False})
+
+    return app
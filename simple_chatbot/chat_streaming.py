@@ -0,0 +1,165 @@
+"""
+Helpers for streaming replies out of a compiled LangGraph chatbot.
+
+The chatbots in this repo compile a graph whose `model` node calls the LLM.
+Instead of waiting for `app.invoke(...)` to return the whole completion, the
+helpers below consume the graph with `stream_mode="messages"` so tokens can be
+rendered as soon as they arrive. The complete reply is still returned by the
+node, so the checkpointer stores the full message at the end of the turn.
+
+Each turn is a `chat.turn` telemetry span (see `telemetry.py`).
+"""
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+import telemetry
+
+
+@dataclass
+class StreamStats:
+    """
+    Timing information collected while streaming a single reply.
+
+    Attributes:
+        started_at (float): `time.perf_counter()` value when the turn was submitted.
+        first_token_at (float | None): When the first non-empty token arrived.
+        finished_at (float | None): When the stream was exhausted.
+        chunks (int): Number of non-empty token chunks received.
+    """
+
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks: int = 0
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Time to first token in seconds, or None if no token arrived."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        """Total time for the turn in seconds, or None if still streaming."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def summary(self) -> str:
+        """Returns a short human-readable summary, e.g. for a caption."""
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        total = f"{self.total_time:.2f}s" if self.total_time is not None else "n/a"
+        return f"Time to first token: {ttft} · Total: {total}"
+
+
+def _token_text(chunk, metadata: dict, node: str) -> Optional[str]:
+    """Returns the text of a streamed token, or None if it should be skipped."""
+    # Token chunks come from a streaming LLM; a whole AIMessage is only emitted
+    # when the node returned a reply that was not streamed (e.g. a cache hit).
+    if not isinstance(chunk, (AIMessageChunk, AIMessage)):
+        return None
+    if metadata.get("langgraph_node") != node:
+        return None
+    if not isinstance(chunk.content, str) or not chunk.content:
+        return None
+    return chunk.content
+
+
+def stream_reply(
+    app,
+    input_messages: List[BaseMessage],
+    thread_id: str,
+    stats: Optional[StreamStats] = None,
+    node: str = "model",
+) -> Iterator[str]:
+    """
+    Runs one chatbot turn and yields the reply text token by token.
+
+    Args:
+        app: A compiled LangGraph application (see `create_chatbot_app`).
+        input_messages (list): The new messages for this turn.
+        thread_id (str): The conversation thread used by the checkpointer.
+        stats (StreamStats, optional): Filled in with TTFT and total time.
+        node (str): Only tokens emitted by this graph node are yielded.
+
+    Yields:
+        str: Pieces of the assistant's reply, in order.
+    """
+    if stats is None:
+        stats = StreamStats()
+    stats.started_at = time.perf_counter()
+    stats.first_token_at = stats.finished_at = None
+    stats.chunks = 0
+
+    with telemetry.span("chat.turn", thread_id=thread_id) as turn:
+        try:
+            for chunk, metadata in app.stream(
+                {"messages": input_messages},
+                config={"configurable": {"thread_id": thread_id}},
+                stream_mode="messages",
+            ):
+                text = _token_text(chunk, metadata, node)
+                if text is None:
+                    continue
+
+                if stats.first_token_at is None:
+                    stats.first_token_at = time.perf_counter()
+                stats.chunks += 1
+                yield text
+        finally:
+            stats.finished_at = time.perf_counter()
+            turn.set(ttft_s=stats.ttft, chunks=stats.chunks)
+
+
+async def astream_reply(
+    app,
+    input_messages: List[BaseMessage],
+    thread_id: str,
+    stats: Optional[StreamStats] = None,
+    node: str = "model",
+) -> AsyncIterator[str]:
+    """
+    Async counterpart of `stream_reply` for graphs with async nodes.
+
+    Args:
+        app: A compiled LangGraph application (see `create_async_chatbot`).
+        input_messages (list): The new messages for this turn.
+        thread_id (str): The conversation thread used by the checkpointer.
+        stats (StreamStats, optional): Filled in with TTFT and total time.
+        node (str): Only tokens emitted by this graph node are yielded.
+
+    Yields:
+        str: Pieces of the assistant's reply, in order.
+    """
+    if stats is None:
+        stats = StreamStats()
+    stats.started_at = time.perf_counter()
+    stats.first_token_at = stats.finished_at = None
+    stats.chunks = 0
+
+    with telemetry.span("chat.turn", thread_id=thread_id) as turn:
+        try:
+            # Closing this generator (e.g. the client went away) closes the graph
+            # stream too, which cancels the model call instead of finishing it unread.
+            async with aclosing(app.astream(
+                {"messages": input_messages},
+                config={"configurable": {"thread_id": thread_id}},
+                stream_mode="messages",
+            )) as stream:
+                async for chunk, metadata in stream:
+                    text = _token_text(chunk, metadata, node)
+                    if text is None:
+                        continue
+
+                    if stats.first_token_at is None:
+                        stats.first_token_at = time.perf_counter()
+                    stats.chunks += 1
+                    yield text
+        finally:
+            stats.finished_at = time.perf_counter()
+            turn.set(ttft_s=stats.ttft, chunks=stats.chunks)
@@ -0,0 +1,752 @@
+"""
+Bounded and persistent checkpointers for the LangGraph chatbots.
+
+`MemorySaver` keeps every checkpoint of every thread in process memory forever.
+This module provides two drop-in replacements:
+
+- `SQLiteSaver`: a durable store backed by SQLite in WAL mode that keeps only the
+  latest N checkpoints per thread.
+- `BoundedMemorySaver`: an in-memory tier that keeps only the latest N
+  checkpoints per thread, expires idle threads after a TTL and evicts the least
+  recently used threads once a thread-count or byte cap is reached. When given
+  a `backing` store it writes through to it and reloads evicted threads on demand.
+
+Use `create_checkpointer()` to get the configuration the chatbots use.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.types import TASKS
+
+import telemetry
+
+DEFAULT_MAX_THREADS = 1000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_CHECKPOINTS_PER_THREAD = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def _check_max_checkpoints(max_checkpoints_per_thread: int):
+    # The parent checkpoint is needed to restore pending sends, so keep at least two.
+    if max_checkpoints_per_thread < 2:
+        raise ValueError("max_checkpoints_per_thread must be at least 2")
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """
+    A checkpointer that persists conversations to a SQLite database in WAL mode.
+
+    Only the latest `max_checkpoints_per_thread` checkpoints of each thread (and
+    namespace) are kept, so the database grows with the number of threads rather
+    than with the number of turns.
+
+    Args:
+        path (str): Path of the SQLite database file (":memory:" for tests).
+        max_checkpoints_per_thread (int): How many checkpoints to keep per thread.
+        serde: Optional serializer, defaults to LangGraph's JSON+msgpack serializer.
+    """
+
+    # Keep the same version format as InMemorySaver so both can share checkpoints.
+    get_next_version = InMemorySaver.get_next_version
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_checkpoints_per_thread: int = DEFAULT_MAX_CHECKPOINTS_PER_THREAD,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        _check_max_checkpoints(max_checkpoints_per_thread)
+        self.path = path
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.pruned_checkpoints = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements, prune: Optional[tuple[str, str]] = None):
+        """
+        Runs `(sql, params)` pairs in one transaction. Caller holds the lock.
+
+        If `prune` is a `(thread_id, checkpoint_ns)` pair, checkpoints of that thread
+        beyond the per-thread limit are deleted in the same transaction.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+            if prune is not None:
+                self._prune(*prune)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Drops checkpoints beyond the per-thread limit. Caller holds the lock."""
+        stale = self._conn.execute(
+            """
+            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?
+            """,
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        ).fetchall()
+        for (checkpoint_id,) in stale:
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                key,
+            )
+            self._conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                key,
+            )
+        self.pruned_checkpoints += len(stale)
+
+    def _load_tuple(self, row) -> CheckpointTuple:
+        """Builds a CheckpointTuple from a `checkpoints` row. Caller holds the lock."""
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            """
+            SELECT task_id, channel, type, value FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_id, idx
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        sends = []
+        if parent_checkpoint_id:
+            sends = self._conn.execute(
+                """
+                SELECT type, value FROM writes
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ?
+                ORDER BY task_path, task_id, idx
+                """,
+                (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+            ).fetchall()
+
+        checkpoint_: Checkpoint = self.serde.loads_typed((type_, checkpoint))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint_,
+                "pending_sends": [self.serde.loads_typed(send) for send in sends],
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    @telemetry.traced("checkpoint.sqlite.load")
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Returns the requested checkpoint, or the latest one of the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"""
+                    SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    ORDER BY checkpoint_id DESC LIMIT 1
+                    """,
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Lists checkpoints matching the config, newest first."""
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                       type, checkpoint, metadata_type, metadata
+                FROM checkpoints {where} ORDER BY checkpoint_id DESC
+                """,
+                params,
+            ).fetchall()
+
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            with self._lock:
+                checkpoint_tuple = self._load_tuple(row)
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    @telemetry.traced("checkpoint.sqlite.save")
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Stores a checkpoint and prunes older checkpoints of the same thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)  # type: ignore[misc]
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._write(
+                [(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        serialized,
+                        metadata_type,
+                        serialized_metadata,
+                    ),
+                )],
+                prune=(thread_id, checkpoint_ns),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    @telemetry.traced("checkpoint.sqlite.save_writes")
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Stores intermediate writes linked to a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        statements = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            # Regular writes are idempotent; special channels (negative idx) are overwritten.
+            verb = "INSERT OR IGNORE" if write_idx >= 0 else "INSERT OR REPLACE"
+            value_type, serialized = self.serde.dumps_typed(value)
+            statements.append((
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, value_type, serialized, task_path),
+            ))
+        with self._lock:
+            self._write(statements)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Deletes all checkpoints and writes of a thread."""
+        with self._lock:
+            self._write([
+                ("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)),
+                ("DELETE FROM writes WHERE thread_id = ?", (thread_id,)),
+            ])
+
+    def stats(self) -> dict:
+        """Returns storage metrics for monitoring."""
+        with self._lock:
+            threads, checkpoints, checkpoint_bytes = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*), "
+                "COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+            ).fetchone()
+            write_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+            ).fetchone()[0]
+        return {
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "bytes": checkpoint_bytes + write_bytes,
+            "pruned_checkpoints": self.pruned_checkpoints,
+        }
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    An in-memory checkpointer with bounded size.
+
+    - Keeps only the latest `max_checkpoints_per_thread` checkpoints per thread.
+    - Threads idle for longer than `ttl_seconds` are dropped.
+    - Once more than `max_threads` threads or `max_bytes` serialized bytes are
+      resident, the least recently used threads are evicted.
+
+    If `backing` is given, every write also goes to that store, and threads that
+    were evicted (or written by a previous process) are reloaded from it on first
+    access. Without a backing store, evicted conversations are gone.
+
+    Args:
+        max_threads (int): Maximum number of resident threads.
+        max_bytes (int): Maximum serialized bytes across resident threads.
+        ttl_seconds (float | None): Idle time after which a thread is dropped.
+        max_checkpoints_per_thread (int): How many checkpoints to keep per thread.
+        backing (BaseCheckpointSaver, optional): A durable store such as `SQLiteSaver`.
+        serde: Optional serializer.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = DEFAULT_MAX_THREADS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_checkpoints_per_thread: int = DEFAULT_MAX_CHECKPOINTS_PER_THREAD,
+        backing: Optional[BaseCheckpointSaver] = None,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        _check_max_checkpoints(max_checkpoints_per_thread)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.backing = backing
+
+        self.evictions = 0
+        self.expirations = 0
+        self.pruned_checkpoints = 0
+        self.hydrations = 0
+
+        self._lock = threading.RLock()
+        # thread ID -> last access time, least recently used first
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        self._thread_bytes: dict[str, int] = {}
+        self._total_bytes = 0
+        # Per-thread indexes so a thread can be dropped without scanning everything
+        self._checkpoint_versions: dict[tuple[str, str, str], dict] = {}
+        self._blob_keys: defaultdict[str, set] = defaultdict(set)
+        self._write_keys: defaultdict[str, set] = defaultdict(set)
+
+    # --- Bookkeeping ---
+
+    def _put_local(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        next_config = InMemorySaver.put(self, config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        self._checkpoint_versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(
+            checkpoint["channel_versions"]
+        )
+        for channel, version in new_versions.items():
+            self._blob_keys[thread_id].add((thread_id, checkpoint_ns, channel, version))
+        return next_config
+
+    def _put_writes_local(self, config, writes, task_id, task_path=""):
+        InMemorySaver.put_writes(self, config, writes, task_id, task_path)
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        self._write_keys[thread_id].add(
+            (thread_id, configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        )
+
+    def _hydrate(self, thread_id: str) -> bool:
+        """Loads a thread from the backing store. Returns False if it is unknown."""
+        if self.backing is None:
+            return False
+        tuples = list(self.backing.list({"configurable": {"thread_id": thread_id}}))
+        if not tuples:
+            return False
+        for checkpoint_tuple in sorted(tuples, key=lambda t: t.config["configurable"]["checkpoint_id"]):
+            configurable = checkpoint_tuple.config["configurable"]
+            parent_config = {
+                "configurable": {"thread_id": thread_id, "checkpoint_ns": configurable["checkpoint_ns"]}
+            }
+            if checkpoint_tuple.parent_config:
+                parent_config["configurable"]["checkpoint_id"] = (
+                    checkpoint_tuple.parent_config["configurable"]["checkpoint_id"]
+                )
+            checkpoint = checkpoint_tuple.checkpoint
+            self._put_local(parent_config, checkpoint, checkpoint_tuple.metadata, checkpoint["channel_versions"])
+
+            writes_by_task = defaultdict(list)
+            for task_id, channel, value in checkpoint_tuple.pending_writes or ():
+                writes_by_task[task_id].append((channel, value))
+            for task_id, writes in writes_by_task.items():
+                self._put_writes_local(checkpoint_tuple.config, writes, task_id)
+
+        self.hydrations += 1
+        self._account(thread_id)
+        return True
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Drops checkpoints beyond the per-thread limit and blobs no longer referenced."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints_per_thread:
+            return
+        for checkpoint_id in sorted(checkpoints)[: -self.max_checkpoints_per_thread]:
+            del checkpoints[checkpoint_id]
+            self._checkpoint_versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(write_key, None)
+            self._write_keys[thread_id].discard(write_key)
+            self.pruned_checkpoints += 1
+
+        referenced = {
+            (channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._checkpoint_versions.get(
+                (thread_id, checkpoint_ns, checkpoint_id), {}
+            ).items()
+        }
+        for key in [k for k in self._blob_keys[thread_id] if k[1] == checkpoint_ns]:
+            if (key[2], key[3]) not in referenced:
+                self.blobs.pop(key, None)
+                self._blob_keys[thread_id].discard(key)
+
+    def _thread_size(self, thread_id: str) -> int:
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for (_, checkpoint), (_, metadata), _ in checkpoints.values():
+                size += len(checkpoint) + len(metadata)
+        for key in self._write_keys.get(thread_id, ()):
+            for write in self.writes.get(key, {}).values():
+                size += len(write[2][1])
+        for key in self._blob_keys.get(thread_id, ()):
+            if key in self.blobs:
+                size += len(self.blobs[key][1])
+        return size
+
+    def _account(self, thread_id: str):
+        """Marks a thread as used, updates its size and enforces the limits."""
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+        size = self._thread_size(thread_id)
+        self._total_bytes += size - self._thread_bytes.get(thread_id, 0)
+        self._thread_bytes[thread_id] = size
+
+        while len(self._last_access) > self.max_threads or self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._last_access))
+            if oldest == thread_id:
+                break  # Never evict the thread that is being written
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _expire(self):
+        if self.ttl_seconds is None:
+            return
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            if last_access > deadline:
+                break
+            self._drop(thread_id)
+            self.expirations += 1
+
+    def _drop(self, thread_id: str):
+        """Removes a thread from memory only; the backing store is untouched."""
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self._checkpoint_versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._last_access.pop(thread_id, None)
+
+    def _ensure_resident(self, thread_id: str) -> bool:
+        self._expire()
+        if thread_id in self.storage:
+            return True
+        return self._hydrate(thread_id)
+
+    # --- BaseCheckpointSaver API ---
+
+    @telemetry.traced("checkpoint.load")
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            # Don't let lookups of unknown threads create empty entries.
+            if not self._ensure_resident(thread_id):
+                return None
+            self._last_access[thread_id] = time.monotonic()
+            self._last_access.move_to_end(thread_id)
+            return super().get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            if config is not None and not self._ensure_resident(config["configurable"]["thread_id"]):
+                return
+            tuples = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from tuples
+
+    @telemetry.traced("checkpoint.save")
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._ensure_resident(thread_id)
+            next_config = self._put_local(config, checkpoint, metadata, new_versions)
+            if self.backing is not None:
+                self.backing.put(config, checkpoint, metadata, new_versions)
+            self._prune(thread_id, config["configurable"]["checkpoint_ns"])
+            self._account(thread_id)
+        return next_config
+
+    @telemetry.traced("checkpoint.save_writes")
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._ensure_resident(thread_id)
+            self._put_writes_local(config, writes, task_id, task_path)
+            if self.backing is not None:
+                self.backing.put_writes(config, writes, task_id, task_path)
+            self._account(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+            if self.backing is not None:
+                self.backing.delete_thread(thread_id)
+
+    # The async methods run the sync ones. Those only touch the backing store on
+    # hydration and write-through, but that is blocking I/O, so with a backing
+    # store they run on a worker thread instead of the event loop.
+
+    async def _call(self, fn, *args, **kwargs):
+        if self.backing is None:
+            return fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._call(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await self._call(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._call(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._call(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._call(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        """Returns memory-tier metrics for monitoring."""
+        with self._lock:
+            return {
+                "resident_threads": len(self._last_access),
+                "resident_bytes": self._total_bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "pruned_checkpoints": self.pruned_checkpoints,
+                "hydrations": self.hydrations,
+            }
+
+
+def create_checkpointer(db_path: Optional[str] = None, **kwargs) -> BoundedMemorySaver:
+    """
+    Creates the checkpointer used by the chatbots.
+
+    Args:
+        db_path (str, optional): SQLite file for durable history. Defaults to the
+            `CHATBOT_CHECKPOINT_DB` environment variable; if neither is set,
+            history is kept in memory only.
+        **kwargs: Limits forwarded to `BoundedMemorySaver`.
+
+    Returns:
+        BoundedMemorySaver: A bounded in-memory tier, written through to SQLite if configured.
+    """
+    if db_path is None:
+        db_path = os.getenv("CHATBOT_CHECKPOINT_DB")
+    backing = None
+    if db_path:
+        backing = SQLiteSaver(
+            db_path,
+            max_checkpoints_per_thread=kwargs.get(
+                "max_checkpoints_per_thread", DEFAULT_MAX_CHECKPOINTS_PER_THREAD
+            ),
+        )
+    return BoundedMemorySaver(backing=backing, **kwargs)
@@ -0,0 +1,98 @@
+"""
+A local stand-in for `ChatLiteLLM` used by the load tests and benchmarks.
+
+It never touches the network: replies are generated locally and streamed word
+by word with a configurable delay, so latency-sensitive code paths can be
+exercised without an API key.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_REPLY = "This is a canned reply from the fake LLM used for local testing."
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that streams a canned reply with simulated latency.
+
+    Attributes:
+        reply (str): The text returned for every request.
+        first_token_delay (float): Seconds to wait before the first token.
+        token_delay (float): Seconds to wait between tokens.
+        prompt_token_delay (float): Extra seconds before the first token per
+            (approximate) prompt token, to simulate prefill cost.
+    """
+
+    reply: str = DEFAULT_REPLY
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+    prompt_token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self) -> List[str]:
+        words = self.reply.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _prefill_delay(self, messages: List[BaseMessage]) -> float:
+        if not self.prompt_token_delay:
+            return self.first_token_delay
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        return self.first_token_delay + self.prompt_token_delay * prompt_chars / 4
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._prefill_delay(messages) + self.token_delay * (len(self._tokens()) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._prefill_delay(messages) + self.token_delay * (len(self._tokens()) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._prefill_delay(messages))
+        for i, token in enumerate(self._tokens()):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._prefill_delay(messages))
+        for i, token in enumerate(self._tokens()):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,211 @@
+"""
+Context-window management for the LangGraph chatbots.
+
+Sending the whole thread history on every turn makes prompt tokens, cost and
+latency grow linearly until the model's context limit is hit. `HistoryManager`
+keeps the prompt within a token budget:
+
+- `context(state)` picks the most recent messages that fit the budget, prefixed
+  with a running summary of everything older.
+- `summarize(state)` / `asummarize(state)` is a graph node that runs before
+  `model`. Once the unsummarized history exceeds the budget it asks the LLM to
+  fold the oldest turns into the running summary stored in the graph state.
+
+The full transcript stays in the checkpointed state; only the prompt is trimmed.
+Token counts are cached per message ID so old messages are never re-tokenized.
+"""
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langgraph.graph.message import MessagesState
+
+DEFAULT_MAX_HISTORY_TOKENS = 3000
+DEFAULT_ENCODING = "cl100k_base"
+# Approximate per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """Summarize the conversation so far for your own future reference.
+Keep names, facts the user shared, decisions and open questions. Be concise.
+
+Existing summary:
+{summary}
+
+New messages to fold into the summary:
+{transcript}"""
+
+
+class ChatState(MessagesState):
+    """Graph state: the message history plus a running summary of older turns."""
+
+    summary: str
+    # ID of the last message that has been folded into `summary`
+    summarized_through: Optional[str]
+
+
+class TokenCounter:
+    """
+    Counts tokens per message, caching results by message ID.
+
+    Uses tiktoken when available and falls back to a characters/4 estimate
+    otherwise (e.g. offline, where the encoding file cannot be downloaded).
+
+    Args:
+        encoding_name (str): The tiktoken encoding to use.
+        max_entries (int): Maximum number of cached message counts.
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING, max_entries: int = 100_000):
+        self.encoding_name = encoding_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._encoding = None
+        self._encoding_loaded = False
+        self._cache: OrderedDict[tuple, int] = OrderedDict()
+
+    def _encode_len(self, text: str) -> int:
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception:
+                self._encoding = None
+        if self._encoding is None:
+            return max(1, len(text) // 4)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_text(self, text: str) -> int:
+        """Counts tokens in a plain string (not cached)."""
+        return self._encode_len(text) if text else 0
+
+    def count(self, message: BaseMessage) -> int:
+        """Counts tokens in a message, including the chat-format overhead."""
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if message.id is None:
+            return self.count_text(content) + MESSAGE_OVERHEAD_TOKENS
+
+        key = (message.id, len(content))
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        tokens = self.count_text(content) + MESSAGE_OVERHEAD_TOKENS
+        self._cache[key] = tokens
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return tokens
+
+
+# Shared by all chatbots in the process so cached counts are reused across graphs.
+token_counter = TokenCounter()
+
+
+class HistoryManager:
+    """
+    Keeps the prompt history within a token budget.
+
+    Args:
+        llm (BaseChatModel, optional): Model used to write the running summary.
+            If None, older messages are simply left out of the prompt.
+        max_tokens (int): Token budget for summary plus history in the prompt.
+        summary_target_tokens (int, optional): After summarizing, the unsummarized
+            history is reduced to about this many tokens. Defaults to half the budget.
+        counter (TokenCounter, optional): Token counter, defaults to the shared one.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        max_tokens: int = DEFAULT_MAX_HISTORY_TOKENS,
+        summary_target_tokens: Optional[int] = None,
+        counter: Optional[TokenCounter] = None,
+    ):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.summary_target_tokens = summary_target_tokens or max_tokens // 2
+        self.counter = counter or token_counter
+
+    def _unsummarized(self, state: ChatState) -> List[BaseMessage]:
+        messages = state["messages"]
+        summarized_through = state.get("summarized_through")
+        if not summarized_through:
+            return messages
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == summarized_through:
+                return messages[i + 1:]
+        return messages
+
+    def _plan_fold(self, state: ChatState) -> List[BaseMessage]:
+        """Returns the oldest messages to fold into the summary (empty if none)."""
+        messages = self._unsummarized(state)
+        counts = [self.counter.count(m) for m in messages]
+        total = sum(counts)
+        if total <= self.max_tokens:
+            return []
+
+        # Fold from the front until the rest fits the target, never folding the latest message.
+        cut = 0
+        while cut < len(messages) - 1 and total > self.summary_target_tokens:
+            total -= counts[cut]
+            cut += 1
+        # Start the remaining window on a user turn where possible.
+        while cut < len(messages) - 1 and not isinstance(messages[cut], HumanMessage):
+            cut += 1
+        return messages[:cut]
+
+    def _summary_request(self, state: ChatState, to_fold: List[BaseMessage]) -> List[BaseMessage]:
+        transcript = "\n".join(f"{m.type}: {m.content}" for m in to_fold)
+        return [HumanMessage(content=SUMMARY_PROMPT.format(
+            summary=state.get("summary") or "(none)",
+            transcript=transcript,
+        ))]
+
+    def summarize(self, state: ChatState) -> dict:
+        """Graph node: folds the oldest turns into the running summary if over budget."""
+        if self.llm is None:
+            return {}
+        to_fold = self._plan_fold(state)
+        if not to_fold:
+            return {}
+        response = self.llm.invoke(self._summary_request(state, to_fold))
+        return {"summary": response.content, "summarized_through": to_fold[-1].id}
+
+    async def asummarize(self, state: ChatState) -> dict:
+        """Async version of `summarize` for graphs served with `ainvoke`/`astream`."""
+        if self.llm is None:
+            return {}
+        to_fold = self._plan_fold(state)
+        if not to_fold:
+            return {}
+        response = await self.llm.ainvoke(self._summary_request(state, to_fold))
+        return {"summary": response.content, "summarized_through": to_fold[-1].id}
+
+    def context(self, state: ChatState) -> List[BaseMessage]:
+        """
+        Returns the messages to send to the model: the running summary (if any)
+        followed by the most recent messages that fit the token budget.
+        """
+        messages = self._unsummarized(state)
+        prefix = []
+        budget = self.max_tokens
+        if state.get("summary"):
+            prefix = [SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}")]
+            budget -= self.counter.count_text(prefix[0].content) + MESSAGE_OVERHEAD_TOKENS
+
+        # Walk back from the newest message; only the window is tokenized.
+        start = len(messages)
+        while start > 0:
+            tokens = self.counter.count(messages[start - 1])
+            if tokens > budget and start < len(messages):
+                break
+            budget -= tokens
+            start -= 1
+        window = messages[start:]
+        # Don't open the window with a dangling assistant reply.
+        while len(window) > 1 and not isinstance(window[0], HumanMessage):
+            window = window[1:]
+        return prefix + window
@@ -1,15 +1,15 @@
 from dotenv import load_dotenv
 import os
-from langchain_litellm import ChatLiteLLM
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langgraph.graph import StateGraph, END, START
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.message import MessagesState
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, AIMessageChunk, message_chunk_to_message
 import uuid
 
+from chat_streaming import StreamStats, stream_reply
+import telemetry
+from warmup import Warmup
+
 ### Extra beauty fancy stuff that you won't need for your project but I like to have
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.text import Text
@@ -21,55 +21,101 @@ console = Console()
 load_dotenv()
 
 # Constants
-MODEL_NAME = "gpt-3.5-turbo"
+MODEL_NAME = os.getenv("CHATBOT_MODEL", "gpt-3.5-turbo")  # "auto" routes across providers
 SYSTEM_PROMPT = """You are a helpful assistant that provides concise and accurate answers to user queries."""
+STREAM_RESPONSES = True  # Render tokens as they arrive instead of waiting for the full reply
+MAX_HISTORY_TOKENS = 3000  # Token budget for conversation history sent to the model
+SUMMARIZE_HISTORY = True  # Fold older turns into a running summary instead of dropping them
+CACHE_SAMPLED_RESPONSES = os.getenv("CHATBOT_CACHE_SAMPLED", "").lower() in ("1", "true", "yes")  # Also serve cached answers at temperature > 0 (opt-in)
 
-# Create prompt template
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    MessagesPlaceholder(variable_name="messages"),
-])
-
-def create_chatbot(model: str = MODEL_NAME):
+def create_chatbot(model: str = MODEL_NAME, streaming: bool = STREAM_RESPONSES):
     """Create a chatbot instance using LangGraph and LiteLLM"""
-    # Initialize the LLM
-    llm = ChatLiteLLM(
+    # The LLM stack (LiteLLM above all) takes seconds to import, so it is loaded
+    # here rather than at startup; `main` runs this on a background thread.
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langgraph.graph import StateGraph, END, START
+
+    from checkpointing import create_checkpointer
+    from history import ChatState, HistoryManager
+    from llm_router import get_chat_model
+    from response_cache import get_response_cache
+
+    # Create prompt template
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="messages"),
+    ])
+
+    # Get the shared LLM client for this model
+    llm = get_chat_model(
         model=model,
         temperature=0.7
     )
+
+    # Keep the prompt within a token budget, summarizing older turns if enabled
+    history = HistoryManager(
+        llm=llm if SUMMARIZE_HISTORY else None,
+        max_tokens=MAX_HISTORY_TOKENS
+    )
+    
+    # Shared exact/semantic cache for repeated questions
+    response_cache = get_response_cache()
     
     # Create the workflow
-    workflow = StateGraph(state_schema=MessagesState)
+    workflow = StateGraph(state_schema=ChatState)
     
     # Define the model node
-    def call_model(state: MessagesState):
+    def call_model(state: ChatState):
         """Call the model with the current state"""
-        # Format messages with prompt template
-        formatted_prompt = prompt.format_messages(messages=state["messages"])
+        # Format the budgeted history (summary + recent messages) with prompt template
+        formatted_prompt = prompt.format_messages(messages=history.context(state))
+
+        # Answer from the response cache if this prompt (or a near-duplicate) was seen before
+        cached = response_cache.lookup(
+            formatted_prompt, model, llm.temperature, llm.max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES
+        )
+        if cached is not None:
+            return {"messages": AIMessage(content=cached.content)}
         
-        # Get response from model
-        response = llm.invoke(formatted_prompt)
+        if not streaming:
+            # Get response from model
+            response = llm.invoke(formatted_prompt)
+        else:
+            # Stream from the model so LangGraph can forward tokens as they arrive,
+            # then merge the chunks so the full reply gets checkpointed
+            response = AIMessageChunk(content="")
+            for chunk in llm.stream(formatted_prompt):
+                response += chunk
+            response = message_chunk_to_message(response)
+
+        response_cache.store(
+            formatted_prompt, model, llm.temperature, response.content, llm.max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES, usage=response.usage_metadata
+        )
         
         # Return the updated messages state with the new response
         return {"messages": response}
     
-    # Add the model node
-    workflow.add_node("model", call_model)
+    # Add the history and model nodes
+    workflow.add_node("history", telemetry.traced("node.history", history.summarize))
+    workflow.add_node("model", telemetry.traced("node.model", call_model))
     
     # Add edges
-    workflow.add_edge(START, "model")
+    workflow.add_edge(START, "history")
+    workflow.add_edge("history", "model")
     workflow.add_edge("model", END)
     
-    # Compile the workflow with memory
-    memory = MemorySaver()
+    # Compile the workflow with bounded (optionally persistent) memory
+    memory = create_checkpointer()
     app = workflow.compile(checkpointer=memory)
     
     return app
 
-def clear_conversation(conversation):
+def clear_conversation(conversation, thread_id):
     """Clear the conversation history"""
-    # Create a new conversation instance
-    conversation = create_chatbot()
+    # Free the old thread's checkpoints; the caller starts a new thread ID
+    conversation.checkpointer.delete_thread(thread_id)
     console.print("[yellow]Conversation history cleared![/yellow]")
     return conversation
 
@@ -90,8 +136,12 @@ def main():
         console.print("[red]Error: Please set your OPENAI_API_KEY environment variable[/red]")
         return
     
-    # Create chatbot instance
-    conversation = create_chatbot()
+    # Export spans if CHATBOT_TELEMETRY is set (see telemetry.py)
+    telemetry.configure_from_env()
+
+    # Build the chatbot in the background while the user reads the banner and types
+    warmup = Warmup(create_chatbot, model=MODEL_NAME).start()
+    conversation = None
     
     # Generate a unique thread ID for this conversation
     current_thread_id = str(uuid.uuid4())
@@ -116,7 +166,8 @@ def main():
                 console.print("\n[green]Goodbye! Have a great day![/green]")
                 break
             elif user_input.lower() == 'clear':
-                conversation = clear_conversation(conversation)
+                if conversation is not None:
+                    conversation = clear_conversation(conversation, current_thread_id)
                 current_thread_id = str(uuid.uuid4())
                 console.print(f"[yellow]New Thread ID: {current_thread_id}[/yellow]")
                 continue
@@ -131,14 +182,32 @@ def main():
                 display_help()
                 continue
             
+            if conversation is None:
+                # Only the first message can get here before the warm-up is done
+                with console.status("[dim]Starting up...[/dim]"):
+                    conversation = warmup.result()
+            
             # Create input message
             input_messages = [HumanMessage(content=user_input)]
             
+            if STREAM_RESPONSES:
+                # Stream the response and render it as live Markdown
+                stats = StreamStats()
+                reply = ""
+                console.print("\n[bold green]Assistant:[/bold green]")
+                with Live(Markdown(reply), console=console, refresh_per_second=12) as live:
+                    for token in stream_reply(conversation, input_messages, current_thread_id, stats):
+                        reply += token
+                        live.update(Markdown(reply))
+                console.print(f"[dim]{stats.summary()}[/dim]")
+                continue
+
             # Get response from the model with thread ID for memory
-            result = conversation.invoke(
-                {"messages": input_messages},
-                config={"configurable": {"thread_id": current_thread_id}}
-            )
+            with telemetry.span("chat.turn", thread_id=current_thread_id):
+                result = conversation.invoke(
+                    {"messages": input_messages},
+                    config={"configurable": {"thread_id": current_thread_id}}
+                )
 
             # Print the response
             if result and "messages" in result and result["messages"]:
@@ -1,8 +1,10 @@
 from dotenv import load_dotenv
 import os
-from langchain_litellm import ChatLiteLLM
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
+from llm_registry import get_llm
+from snowflake_auth import get_snowflake_token
+
 load_dotenv()
 
 # Constants
@@ -10,73 +12,58 @@ MODEL_NAME = "snowflake/mistral-7b"
 
 def setup_snowflake_credentials():
     """Set up Snowflake credentials from environment variables"""
-    required_vars = [
-        "SNOWFLAKE_JWT",  # JWT token for authentication
-        "SNOWFLAKE_ACCOUNT_ID"  # Account identifier
-    ]
-    
-    # Check if all required variables are set
-    missing_vars = [var for var in required_vars if not os.environ.get(var)]
-    if missing_vars:
-        raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+    if not os.environ.get("SNOWFLAKE_ACCOUNT_ID"):  # Account identifier
+        raise ValueError("Missing required environment variables: SNOWFLAKE_ACCOUNT_ID")
     
-    # Return credentials from environment variables
+    # Key-pair JWTs are renewed in the background before they expire (see snowflake_auth.py)
     return {
-        "jwt": os.environ["SNOWFLAKE_JWT"],
+        "jwt": get_snowflake_token(),
         "account_id": os.environ["SNOWFLAKE_ACCOUNT_ID"]
     }
 
 def get_single_llm_response(prompt: str, credentials: dict, model: str = MODEL_NAME):
-    try:
-        # Initialize the LiteLLM chat model with Snowflake Cortex
-        llm = ChatLiteLLM(
-            model=model,
-            temperature=0.7,
-            max_tokens=500,
-            api_key=credentials["jwt"],  # Use JWT token as API key
-            api_base=f"https://{credentials['account_id']}.snowflakecomputing.com/api/v2/cortex/inference:complete"
-        )
-        
-        # Create a simple prompt with just the user message
-        messages = [
-            HumanMessage(content=prompt)
-        ]
-        
-        print(f"HumanMessage sent to LLM: {messages}")
+    # Reuse the shared LiteLLM chat model for this Snowflake Cortex configuration
+    llm = get_llm(
+        model=model,
+        temperature=0.7,
+        max_tokens=500,
+        api_key=credentials["jwt"].token(),  # Use the current JWT as API key
+        api_base=f"https://{credentials['account_id']}.snowflakecomputing.com/api/v2/cortex/inference:complete"
+    )
+    
+    # Create a simple prompt with just the user message
+    messages = [
+        HumanMessage(content=prompt)
+    ]
+    
+    print(f"HumanMessage sent to LLM: {messages}")
 
-        # Get response
-        response = llm.invoke(messages)
-        print(f"Full Response from LLM: {response}")
-        
-        return response.content
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return None
+    # Get response
+    response = llm.invoke(messages)
+    print(f"Full Response from LLM: {response}")
+    
+    return response.content
 
 def get_llm_response_with_context(prompt: str, system_prompt: str, credentials: dict, model: str = MODEL_NAME):
-    try:
-        # Initialize the LiteLLM chat model with Snowflake Cortex
-        llm = ChatLiteLLM(
-            model=model,
-            temperature=0.7,
-            max_tokens=500,
-            api_key=credentials["jwt"],  # Use JWT token as API key
-            api_base=f"https://{credentials['account_id']}.snowflakecomputing.com/api/v2/cortex/inference:complete"
-        )
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=prompt)
-        ]
-        
-        # Get response
-        response = llm.invoke(messages)
-        print(f"Full Response from LLM: {response}")
-        
-        return response.content
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return None
+    # Reuse the shared LiteLLM chat model for this Snowflake Cortex configuration
+    llm = get_llm(
+        model=model,
+        temperature=0.7,
+        max_tokens=500,
+        api_key=credentials["jwt"].token(),  # Use the current JWT as API key
+        api_base=f"https://{credentials['account_id']}.snowflakecomputing.com/api/v2/cortex/inference:complete"
+    )
+    
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=prompt)
+    ]
+    
+    # Get response
+    response = llm.invoke(messages)
+    print(f"Full Response from LLM: {response}")
+    
+    return response.content
     
 if __name__ == "__main__":
     try:
@@ -0,0 +1,745 @@
+"""
+Client-side rate-limit and failure control shared by every LLM and embedding call.
+
+One `LLMController` per provider ("openai", "snowflake", ...) runs the calls:
+
+- 429s, 5xx, timeouts and connection errors are retried. The wait is what the
+  provider asks for (`retry-after`, `retry-after-ms`, `x-ratelimit-reset-*`)
+  or else full-jitter exponential backoff. Other errors are raised at once.
+- Concurrency is limited AIMD-style: each success adds 1/limit (about +1 per
+  round of calls) and a throttle (429/503/529) halves the limit, at most once
+  per cooldown. A `retry-after` on a throttle also pauses new calls to the
+  provider until then, not only the caller that saw it.
+- A circuit breaker opens after consecutive server or connection failures.
+  While open, calls fail fast with `CircuitOpenError` until a probe succeeds.
+- Each call has an overall deadline covering waits, attempts and backoff.
+  `DeadlineExceeded` is raised as soon as the next retry cannot fit.
+- Sync (`call`) and async (`acall`) callers share the same state; async waits
+  never block the event loop.
+- `call_policy(deadline=..., max_attempts=...)` tightens the limits for calls
+  made in a block, e.g. so a router can fall back to another provider quickly.
+
+`get_controller(provider)` returns the process-wide controller for a provider.
+`llm_registry.get_llm` installs a `ControlledLiteLLMClient` as each
+`ChatLiteLLM`'s client, so invoke, stream and their async forms all go through
+it. For streams, the deadline and retries cover opening the stream, and the
+concurrency slot is held until the stream is consumed or closed.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+import warnings
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Mapping, Optional
+
+import httpx
+
+# Use the model cost map bundled with LiteLLM instead of downloading the latest
+# one from GitHub on import, a network round trip on every cold start. Set
+# LITELLM_LOCAL_MODEL_COST_MAP to an empty string to download it again.
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+import litellm  # noqa: E402
+
+# After each stream, LiteLLM's logging thread model_dump()s the response it
+# rebuilt from the chunks, and pydantic warns that its choices match neither
+# `Choices` nor `StreamingChoices` exactly. The payload is only used for
+# LiteLLM's own logging; don't print the warning on every streamed reply.
+warnings.filterwarnings("ignore", message=r"(?s)Pydantic serializer warnings:.*Expected `StreamingChoices`",
+                        category=UserWarning)
+
+import telemetry
+
+DEFAULT_DEADLINE = 120.0
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_INITIAL_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_INITIAL_CONCURRENCY = 8
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_DECREASE_COOLDOWN = 1.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+THROTTLE_STATUSES = frozenset({429, 503, 529})
+RETRYABLE_STATUSES = THROTTLE_STATUSES | {408, 409, 500, 502, 504}
+
+THROTTLED = "throttled"
+UNAVAILABLE = "unavailable"
+
+# (deadline, max_attempts) overrides set by `call_policy`.
+_policy: contextvars.ContextVar = contextvars.ContextVar("llm_call_policy", default=(None, None))
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's deadline passed, or the next retry would not fit in it."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider's circuit breaker is open; the call was not attempted."""
+
+
+@contextmanager
+def call_policy(deadline: Optional[float] = None, max_attempts: Optional[int] = None):
+    """
+    Caps the deadline and attempts of controller calls made in this context
+    (this thread or task); calls keep the lower of these and their own limits.
+    """
+    current_deadline, current_attempts = _policy.get()
+    if current_deadline is not None and deadline is not None:
+        deadline = min(deadline, current_deadline)
+    if current_attempts is not None and max_attempts is not None:
+        max_attempts = min(max_attempts, current_attempts)
+    token = _policy.set((deadline if deadline is not None else current_deadline,
+                         max_attempts if max_attempts is not None else current_attempts))
+    try:
+        yield
+    finally:
+        _policy.reset(token)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a LiteLLM, OpenAI or httpx error, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _headers(error: BaseException) -> Mapping[str, str]:
+    headers = getattr(error, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return {}
+    return {str(key).lower(): str(value) for key, value in headers.items()}
+
+
+def _duration(value: str) -> Optional[float]:
+    """Parses OpenAI's reset durations ("20ms", "1s", "6m0s") or plain seconds."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait before retrying, from the error's
+    response headers, or None if it did not say.
+    """
+    headers = _headers(error)
+    if "retry-after-ms" in headers:
+        try:
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        seconds = _duration(value)
+        if seconds is not None:
+            return seconds
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    # Rate-limit headers: wait for whichever exhausted bucket resets.
+    resets = [
+        _duration(headers[f"x-ratelimit-reset-{kind}"])
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0" and f"x-ratelimit-reset-{kind}" in headers
+    ]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+
+def classify(error: BaseException) -> Optional[str]:
+    """THROTTLED or UNAVAILABLE for errors worth retrying, None for the rest."""
+    status = status_code(error)
+    if status in THROTTLE_STATUSES:
+        return THROTTLED
+    if status in RETRYABLE_STATUSES:
+        return UNAVAILABLE
+    if status is None and isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return UNAVAILABLE
+    # The OpenAI SDK raises APIConnectionError / APITimeoutError from the httpx error.
+    if status is None and isinstance(error.__cause__, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return UNAVAILABLE
+    return None
+
+
+def _set_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Waiter:
+    """A queued acquire: a thread waiting on an event or a coroutine awaiting a future."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.granted = False
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_set_result, self.future)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Slots are handed to waiters in arrival order, whether they wait in a thread
+    (`acquire`) or on an event loop (`aacquire`).
+    """
+
+    def __init__(
+        self,
+        initial: float = DEFAULT_INITIAL_CONCURRENCY,
+        minimum: float = DEFAULT_MIN_CONCURRENCY,
+        maximum: float = DEFAULT_MAX_CONCURRENCY,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+        decrease_cooldown: float = DEFAULT_DECREASE_COOLDOWN,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _grant(self):
+        # Caller holds the lock.
+        while self._waiters and self.in_flight < self._capacity():
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.wake()
+
+    def _enqueue(self, waiter: Optional[_Waiter]) -> Optional[_Waiter]:
+        """Takes a free slot (returns None) or queues `waiter`."""
+        with self._lock:
+            if not self._waiters and self.in_flight < self._capacity():
+                self.in_flight += 1
+                return None
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """After a wait ends: True if the slot was granted, else dequeues the waiter."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Blocks for a slot for up to `timeout` seconds; True if one was taken."""
+        waiter = self._enqueue(_Waiter())
+        if waiter is None:
+            return True
+        waiter.event.wait(timeout)
+        return self._abandon(waiter)
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        """Async `acquire`: waits without blocking the event loop."""
+        waiter = self._enqueue(_Waiter(asyncio.get_running_loop()))
+        if waiter is None:
+            return True
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            if self._abandon(waiter):
+                self.release()
+            raise
+        return self._abandon(waiter)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._grant()
+
+    def record(self, outcome: Optional[str]):
+        """Adjusts the limit: up after a success (None), down after a throttle."""
+        with self._lock:
+            if outcome is None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == THROTTLED:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            self._grant()
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_timeout` seconds, letting one probe call through;
+    the probe's success closes it and its failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a probe through (0 unless open)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def cancel_probe(self):
+        """Ends a call that proved nothing either way (a throttle, or an aborted call)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.opened += 1
+
+
+class LLMController:
+    """
+    Retries, pacing and circuit breaking for one provider.
+
+    Args:
+        provider (str): Name used in errors and stats, e.g. "openai".
+        deadline (float): Default overall seconds per call (waits and retries included).
+        max_attempts (int): Attempts per call, the first included.
+        initial_delay (float): Backoff ceiling after the first failure; doubles per attempt.
+        max_delay (float): Largest backoff ceiling.
+        limiter (AIMDLimiter, optional): Concurrency limit.
+        breaker (CircuitBreaker, optional): Circuit breaker.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        deadline: float = DEFAULT_DEADLINE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        initial_delay: float = DEFAULT_INITIAL_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        limiter: Optional[AIMDLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.provider = provider
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.limiter = limiter or AIMDLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "attempts": 0, "successes": 0, "retries": 0, "throttled": 0,
+            "failures": 0, "rejected": 0, "deadline_exceeded": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {**stats, "concurrency_limit": self.limiter.limit, "in_flight": self.limiter.in_flight,
+                "circuit": self.breaker.state}
+
+    def pause(self, seconds: float):
+        """Holds back new attempts for `seconds` (e.g. the provider's retry-after)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _expired(self, reason: str, error: Optional[BaseException] = None) -> DeadlineExceeded:
+        self._count("deadline_exceeded")
+        return DeadlineExceeded(f"{self.provider}: {reason}" + (f" (last error: {error})" if error else ""))
+
+    def _pause_remaining(self, deadline_at: float) -> float:
+        with self._lock:
+            paused_until = self._paused_until
+        now = time.monotonic()
+        if paused_until > deadline_at:
+            raise self._expired("provider asked to wait past the deadline")
+        return max(0.0, paused_until - now)
+
+    def _admit(self):
+        """Runs with a slot held; releases it and raises if the circuit is open."""
+        if not self.breaker.allow():
+            self.limiter.release()
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.provider} circuit is open; retry in {self.breaker.retry_in():.1f}s")
+        self._count("attempts")
+
+    def _attempt_kwargs(self, kwargs: dict, timeout_arg: Optional[str], deadline_at: float) -> dict:
+        if timeout_arg is None:
+            return kwargs
+        remaining = max(0.001, deadline_at - time.monotonic())
+        current = kwargs.get(timeout_arg)
+        return {**kwargs, timeout_arg: remaining if current is None else min(current, remaining)}
+
+    def _aborted(self):
+        self.breaker.cancel_probe()
+        self.limiter.release()
+
+    def _succeeded(self, release: bool = True):
+        self.breaker.record_success()
+        self.limiter.record(None)
+        if release:
+            self.limiter.release()
+        self._count("successes")
+
+    def _limits(self, deadline: Optional[float]):
+        """(deadline_at, max_attempts) for a new call, applying any `call_policy`."""
+        policy_deadline, policy_attempts = _policy.get()
+        seconds = self.deadline if deadline is None else deadline
+        if policy_deadline is not None:
+            seconds = min(seconds, policy_deadline)
+        max_attempts = min(self.max_attempts, policy_attempts) if policy_attempts else self.max_attempts
+        return time.monotonic() + seconds, max_attempts
+
+    def _failed(self, error: BaseException, attempt: int, deadline_at: float, max_attempts: int) -> float:
+        """Records a failed attempt and returns the delay before the next, or raises."""
+        kind = classify(error)
+        self.limiter.release()
+        if kind is None:
+            # A bad request or auth error says nothing about the provider's health:
+            # free the probe slot, but only a real response closes the breaker.
+            self.breaker.cancel_probe()
+            raise error
+        wait = retry_after(error)
+        if kind == THROTTLED:
+            self._count("throttled")
+            self.breaker.cancel_probe()
+            self.limiter.record(THROTTLED)
+            if wait is not None:
+                self.pause(wait)
+        else:
+            self._count("failures")
+            self.breaker.record_failure()
+        if attempt >= max_attempts:
+            raise error
+        ceiling = min(self.max_delay, self.initial_delay * 2 ** (attempt - 1))
+        delay = max(wait or 0.0, ceiling * random.random())
+        if time.monotonic() + delay >= deadline_at:
+            raise self._expired(f"no time left to retry after {attempt} attempts", error) from error
+        self._count("retries")
+        return delay
+
+    def _call(self, fn: Callable[..., Any], args: tuple, kwargs: dict, deadline: Optional[float],
+              timeout_arg: Optional[str], release: bool):
+        self._count("calls")
+        deadline_at, max_attempts = self._limits(deadline)
+        attempt, queued = 0, 0.0
+        try:
+            while True:
+                attempt += 1
+                waiting_since = time.monotonic()
+                time.sleep(self._pause_remaining(deadline_at))
+                if not self.limiter.acquire(deadline_at - time.monotonic()):
+                    raise self._expired("timed out waiting for a concurrency slot")
+                queued += time.monotonic() - waiting_since
+                self._admit()
+                try:
+                    result = fn(*args, **self._attempt_kwargs(kwargs, timeout_arg, deadline_at))
+                except Exception as e:
+                    time.sleep(self._failed(e, attempt, deadline_at, max_attempts))
+                    continue
+                except BaseException:
+                    self._aborted()
+                    raise
+                self._succeeded(release)
+                return result
+        finally:
+            telemetry.annotate(attempts=attempt, queue_wait_s=queued)
+
+    async def _acall(self, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict, deadline: Optional[float],
+                     timeout_arg: Optional[str], release: bool):
+        self._count("calls")
+        deadline_at, max_attempts = self._limits(deadline)
+        attempt, queued = 0, 0.0
+        try:
+            while True:
+                attempt += 1
+                waiting_since = time.monotonic()
+                await asyncio.sleep(self._pause_remaining(deadline_at))
+                if not await self.limiter.aacquire(deadline_at - time.monotonic()):
+                    raise self._expired("timed out waiting for a concurrency slot")
+                queued += time.monotonic() - waiting_since
+                self._admit()
+                try:
+                    result = await fn(*args, **self._attempt_kwargs(kwargs, timeout_arg, deadline_at))
+                except Exception as e:
+                    await asyncio.sleep(self._failed(e, attempt, deadline_at, max_attempts))
+                    continue
+                except BaseException:
+                    self._aborted()
+                    raise
+                self._succeeded(release)
+                return result
+        finally:
+            telemetry.annotate(attempts=attempt, queue_wait_s=queued)
+
+    def call(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None,
+             timeout_arg: Optional[str] = None, **kwargs):
+        """
+        Calls `fn(*args, **kwargs)` under the controller.
+
+        Args:
+            deadline (float, optional): Overall seconds for this call (default: the controller's).
+            timeout_arg (str, optional): Keyword of `fn` that takes a per-attempt timeout,
+                e.g. "timeout"; it is capped at the time left before the deadline.
+        """
+        return self._call(fn, args, kwargs, deadline, timeout_arg, release=True)
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, deadline: Optional[float] = None,
+                    timeout_arg: Optional[str] = None, **kwargs):
+        """Async `call` for a coroutine function."""
+        return await self._acall(fn, args, kwargs, deadline, timeout_arg, release=True)
+
+    def _release_after(self, stream: Iterator) -> Iterator:
+        try:
+            yield from stream
+        finally:
+            self.limiter.release()
+
+    async def _arelease_after(self, stream: AsyncIterator) -> AsyncIterator:
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            self.limiter.release()
+
+    def call_stream(self, fn: Callable[..., Iterator], *args, deadline: Optional[float] = None,
+                    timeout_arg: Optional[str] = None, **kwargs) -> Iterator:
+        """Opens a stream with `call`; the slot is held until the stream ends or is closed."""
+        return self._release_after(self._call(fn, args, kwargs, deadline, timeout_arg, release=False))
+
+    async def acall_stream(self, fn: Callable[..., Awaitable[AsyncIterator]], *args, deadline: Optional[float] = None,
+                           timeout_arg: Optional[str] = None, **kwargs) -> AsyncIterator:
+        """Async `call_stream` for a coroutine function that returns an async iterator."""
+        return self._arelease_after(await self._acall(fn, args, kwargs, deadline, timeout_arg, release=False))
+
+
+def _chunk_dict(chunk):
+    # langchain-litellm 0.2.1 model_dump()s each streamed chunk and then reads
+    # `delta.role`, which fails on the dumped dict; keep the delta objects.
+    if isinstance(chunk, dict):
+        return chunk
+    choices = [{"index": c.index, "delta": c.delta, "finish_reason": c.finish_reason} for c in chunk.choices]
+    return {"id": chunk.id, "model": chunk.model, "choices": choices}
+
+
+def _record_usage(span, usage, kwargs: dict, completion_chunks: Optional[int] = None):
+    """Sets token counts on an `llm.call` span, estimating them when the provider sent no usage."""
+    if usage is not None:
+        span.set(prompt_tokens=getattr(usage, "prompt_tokens", None),
+                 completion_tokens=getattr(usage, "completion_tokens", None))
+        return
+    try:
+        prompt_tokens = litellm.token_counter(model=kwargs.get("model", ""), messages=kwargs.get("messages", []))
+    except Exception:
+        prompt_tokens = None
+    span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_chunks, tokens_estimated=True)
+
+
+def _stream_chunks(stream: Iterator, span, kwargs: dict) -> Iterator:
+    chunks, usage = 0, None
+    try:
+        for chunk in stream:
+            if chunks == 0:
+                span.set(ttft_s=span.elapsed)
+            chunks += 1
+            usage = getattr(chunk, "usage", None) or usage
+            yield _chunk_dict(chunk)
+    except BaseException as e:
+        span.end(e)
+        raise
+    if span is not telemetry.NOOP_SPAN:
+        _record_usage(span, usage, kwargs, chunks)
+    span.end()
+
+
+async def _astream_chunks(stream: AsyncIterator, span, kwargs: dict) -> AsyncIterator:
+    chunks, usage = 0, None
+    try:
+        async for chunk in stream:
+            if chunks == 0:
+                span.set(ttft_s=span.elapsed)
+            chunks += 1
+            usage = getattr(chunk, "usage", None) or usage
+            yield _chunk_dict(chunk)
+    except BaseException as e:
+        span.end(e)
+        raise
+    if span is not telemetry.NOOP_SPAN:
+        _record_usage(span, usage, kwargs, chunks)
+    span.end()
+
+
+class ControlledLiteLLMClient:
+    """
+    Stands in for the `litellm` module as `ChatLiteLLM.client`, running
+    `completion` and `acreate` (sync, async and streaming) through a controller.
+
+    `ChatLiteLLM` assigns its `api_key`, `api_base` and `organization` to its
+    client before each call; they are kept per client and passed with each
+    request instead of being set on the shared `litellm` module.
+
+    Each call is an `llm.call` telemetry span; a stream's span ends with the stream.
+    """
+
+    _PER_CLIENT = ("api_key", "api_base", "organization")
+
+    def __init__(self, controller: LLMController):
+        object.__setattr__(self, "controller", controller)
+        object.__setattr__(self, "_credentials", {})
+
+    def __setattr__(self, name: str, value):
+        if name in self._PER_CLIENT:
+            self._credentials[name] = value
+        else:
+            # Provider-specific keys (openai_key, ...) keep LiteLLM's module-level behaviour.
+            setattr(litellm, name, value)
+
+    def _request(self, kwargs: dict) -> dict:
+        credentials = {name: value for name, value in self._credentials.items() if value is not None}
+        return {**credentials, **{name: value for name, value in kwargs.items() if value is not None}}
+
+    def _span(self, kwargs: dict):
+        return telemetry.start_span("llm.call", model=kwargs.get("model"), provider=self.controller.provider,
+                                    stream=bool(kwargs.get("stream")))
+
+    def completion(self, **kwargs):
+        kwargs = self._request(kwargs)
+        span = self._span(kwargs)
+        try:
+            with telemetry.use_span(span):
+                if kwargs.get("stream"):
+                    stream = self.controller.call_stream(litellm.completion, timeout_arg="timeout", **kwargs)
+                    return _stream_chunks(stream, span, kwargs)
+                response = self.controller.call(litellm.completion, timeout_arg="timeout", **kwargs)
+        except BaseException as e:
+            span.end(e)
+            raise
+        if span is not telemetry.NOOP_SPAN:
+            _record_usage(span, getattr(response, "usage", None), kwargs)
+        span.end()
+        return response
+
+    async def acreate(self, **kwargs):
+        kwargs = self._request(kwargs)
+        span = self._span(kwargs)
+        try:
+            with telemetry.use_span(span):
+                if kwargs.get("stream"):
+                    stream = await self.controller.acall_stream(litellm.acompletion, timeout_arg="timeout", **kwargs)
+                    return _astream_chunks(stream, span, kwargs)
+                response = await self.controller.acall(litellm.acompletion, timeout_arg="timeout", **kwargs)
+        except BaseException as e:
+            span.end(e)
+            raise
+        if span is not telemetry.NOOP_SPAN:
+            _record_usage(span, getattr(response, "usage", None), kwargs)
+        span.end()
+        return response
+
+    def __getattr__(self, name: str):
+        if name in self._PER_CLIENT:
+            return self._credentials.get(name)
+        return getattr(litellm, name)
+
+
+_controllers: dict = {}
+_controllers_lock = threading.Lock()
+
+
+def provider_for(model: str) -> str:
+    """The provider a LiteLLM model name routes to: its prefix, or "openai"."""
+    return model.split("/", 1)[0] if "/" in model else "openai"
+
+
+def get_controller(provider: str = "openai") -> LLMController:
+    """Returns the process-wide controller for `provider`, creating it on first use."""
+    with _controllers_lock:
+        controller = _controllers.get(provider)
+        if controller is None:
+            controller = _controllers[provider] = LLMController(provider)
+        return controller
+
+
+def controller_stats() -> dict:
+    """Stats of every controller created so far, keyed by provider."""
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {provider: controller.stats for provider, controller in controllers.items()}
+
+
+def clear_controllers():
+    """Drops all controllers (mainly for tests and benchmarks)."""
+    with _controllers_lock:
+        _controllers.clear()
@@ -0,0 +1,168 @@
+"""
+Process-wide registry of LLM clients and compiled chatbot graphs.
+
+Building a `ChatLiteLLM` per call, or compiling a graph per browser session,
+repeats work that can be shared: one client per model configuration and one
+compiled graph per process are enough, because conversations are already
+isolated by `thread_id` in the checkpointer.
+
+- `get_llm(...)` returns a shared `ChatLiteLLM` keyed by
+  (model, temperature, max_tokens, api_base) plus a fingerprint of the API key;
+  `discard_llm(...)` drops one, e.g. the client of a rotated token.
+- `get_graph(key, factory)` builds a compiled graph once and reuses it.
+- `configure_http_pool()` installs one pooled keep-alive HTTP client that
+  LiteLLM uses for its synchronous provider calls.
+
+Every client from `get_llm` sends its completions through the provider's
+shared `llm_control.LLMController` (retries, AIMD concurrency, circuit breaker
+and per-call deadline).
+"""
+import hashlib
+import threading
+from typing import Callable, Hashable, Optional
+
+import httpx
+import litellm
+from langchain_litellm import ChatLiteLLM
+
+from llm_control import ControlledLiteLLMClient, get_controller, provider_for
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+# Re-entrant: graph factories call get_llm() while get_graph() holds the lock.
+_lock = threading.RLock()
+_llms: dict = {}
+_graphs: dict = {}
+_stats = {"llm_hits": 0, "llm_misses": 0, "graph_hits": 0, "graph_misses": 0}
+
+
+def configure_http_pool(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+):
+    """
+    Installs a shared, pooled HTTP client for LiteLLM's synchronous calls.
+
+    Does nothing if a client session has already been configured, so it is safe
+    to call from every entry point.
+    """
+    with _lock:
+        if litellm.client_session is None:
+            litellm.client_session = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                timeout=DEFAULT_TIMEOUT,
+            )
+
+
+def _fingerprint(secret: Optional[str]) -> Optional[str]:
+    # Keep rotated credentials (e.g. a refreshed JWT) from reusing a stale client
+    # without holding the secret itself in the registry key.
+    if secret is None:
+        return None
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def _llm_key(model, temperature, max_tokens, api_base, api_key, kwargs) -> tuple:
+    return (model, temperature, max_tokens, api_base, _fingerprint(api_key), tuple(sorted(kwargs.items())))
+
+
+def get_llm(
+    model: str,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    api_base: Optional[str] = None,
+    api_key: Optional[str] = None,
+    **kwargs,
+) -> ChatLiteLLM:
+    """
+    Returns a shared `ChatLiteLLM` for the given configuration, creating it on first use.
+
+    Args:
+        model (str): LiteLLM model name, e.g. "gpt-3.5-turbo" or "snowflake/mistral-7b".
+        temperature (float): Sampling temperature.
+        max_tokens (int, optional): Completion token limit.
+        api_base (str, optional): Custom endpoint, e.g. the Snowflake Cortex URL.
+        api_key (str, optional): API key or token; only a fingerprint is used as key.
+        **kwargs: Other `ChatLiteLLM` fields; must be hashable.
+    """
+    key = _llm_key(model, temperature, max_tokens, api_base, api_key, kwargs)
+    with _lock:
+        llm = _llms.get(key)
+        if llm is not None:
+            _stats["llm_hits"] += 1
+            return llm
+        _stats["llm_misses"] += 1
+
+    configure_http_pool()
+    params = {"model": model, "temperature": temperature, **kwargs}
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    if api_base is not None:
+        params["api_base"] = api_base
+    if api_key is not None:
+        params["api_key"] = api_key
+    llm = ChatLiteLLM(**params)
+    llm.client = ControlledLiteLLMClient(get_controller(provider_for(model)))
+
+    with _lock:
+        # Another thread may have won the race; keep the first instance.
+        return _llms.setdefault(key, llm)
+
+
+def discard_llm(
+    model: str,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    api_base: Optional[str] = None,
+    api_key: Optional[str] = None,
+    **kwargs,
+) -> bool:
+    """
+    Drops the shared client `get_llm` returns for these arguments, e.g. the one
+    built for a token that has since been renewed. Returns True if it was cached.
+    Callers still holding the client can keep using it.
+    """
+    with _lock:
+        return _llms.pop(_llm_key(model, temperature, max_tokens, api_base, api_key, kwargs), None) is not None
+
+
+def get_graph(key: Hashable, factory: Callable[[], object]):
+    """
+    Returns the compiled graph registered under `key`, building it with `factory` once.
+
+    Args:
+        key: Any hashable identifying the graph configuration, e.g. ("chatbot", model).
+        factory: Zero-argument callable that builds and compiles the graph.
+    """
+    with _lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            _stats["graph_hits"] += 1
+            return graph
+        _stats["graph_misses"] += 1
+        graph = factory()
+        _graphs[key] = graph
+        return graph
+
+
+def registry_stats() -> dict:
+    """Returns hit/miss counters and the number of cached clients and graphs."""
+    with _lock:
+        return {**_stats, "llms": len(_llms), "graphs": len(_graphs)}
+
+
+def clear_registry():
+    """Drops all cached clients and graphs (mainly for tests and benchmarks)."""
+    with _lock:
+        _llms.clear()
+        _graphs.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,543 @@
+"""
+Routing of chat requests across providers (OpenAI, Snowflake Cortex, ...)
+by measured latency, error rate and cost, with hedging and fallback.
+
+- A `Route` is a LiteLLM model with its endpoint, credentials and prices.
+- `LLMRouter` ranks routes by p50 latency + error_penalty * error rate +
+  cost_weight * price. Routes with too few samples are tried first, routes
+  whose circuit breaker is open go last, and a small share of requests goes to
+  a random other route so a recovered or improved provider gets noticed.
+- A non-streamed request with no answer after the primary route's p95 latency
+  is hedged: the same request goes to the next route and the first answer
+  wins. Hedges are capped at `max_hedge_ratio` of requests.
+- A failed request falls back to the next route. Each route runs under a
+  short `llm_control.call_policy`, so a failing provider costs seconds rather
+  than the controller's full deadline.
+- Streams fall back only until their first chunk arrives, and are not hedged.
+- `RoutedChatModel` is a LangChain chat model over a router, usable anywhere
+  a `ChatLiteLLM` is.
+
+`get_chat_model("auto")` returns the router-backed model over
+`default_routes()` (OpenAI if OPENAI_API_KEY is set, Cortex if Snowflake
+credentials are). Any other model name returns `llm_registry.get_llm(model)`.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+import warnings
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from llm_control import call_policy, get_controller, provider_for
+from llm_registry import discard_llm, get_llm
+
+AUTO_MODEL = "auto"
+OPENAI_MODEL = "gpt-3.5-turbo"
+CORTEX_MODEL = "snowflake/mistral-7b"
+
+# USD per 1K (prompt, completion) tokens; approximate list prices, adjust to your contract.
+PRICES = {
+    OPENAI_MODEL: (0.0005, 0.0015),
+    CORTEX_MODEL: (0.0003, 0.0003),
+}
+
+DEFAULT_COST_WEIGHT = 100.0  # seconds of latency worth $1 per 1K tokens
+DEFAULT_ERROR_PENALTY = 5.0  # seconds of latency worth a 100% error rate
+DEFAULT_PRIOR_LATENCY = 0.0
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_EXPLORE_RATIO = 0.05
+DEFAULT_MIN_HEDGE_DELAY = 0.25
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+DEFAULT_ROUTE_DEADLINE = 30.0
+DEFAULT_ROUTE_ATTEMPTS = 2
+ERROR_RATE_ALPHA = 0.2
+DEFAULT_ERROR_HALF_LIFE = 10.0
+
+INVOKE = "invoke"
+STREAM = "stream"
+
+# Inner provider calls don't report to the caller's callbacks; the routed model does.
+_NO_CALLBACKS = {"callbacks": []}
+
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-route")
+
+
+class AllRoutesFailed(RuntimeError):
+    """Every route failed; `errors` holds (route name, exception) pairs."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors) or "No routes configured")
+
+
+@dataclass
+class Route:
+    """
+    One provider endpoint the router can use.
+
+    Attributes:
+        name (str): Label in stats, e.g. "openai" or "cortex".
+        model (str): LiteLLM model name.
+        prompt_price (float): USD per 1K prompt tokens.
+        completion_price (float): USD per 1K completion tokens.
+        api_base (str, optional): Endpoint URL.
+        api_key (str or callable, optional): Key, or a function returning the
+            current one (e.g. a `snowflake_auth.TokenRefresher`).
+    """
+    name: str
+    model: str
+    prompt_price: float = 0.0
+    completion_price: float = 0.0
+    api_base: Optional[str] = None
+    api_key: Union[None, str, Callable[[], str]] = None
+    # Key each (temperature, max_tokens) client was last fetched with.
+    _keys: Dict[tuple, Optional[str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _lock: Any = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def llm(self, temperature: float, max_tokens: Optional[int]):
+        # A renewed key gets its own shared client from the registry, and the
+        # previous key's client is dropped so rotations don't pile up clients.
+        api_key = self.api_key() if callable(self.api_key) else self.api_key
+        with self._lock:
+            previous = self._keys.get((temperature, max_tokens), api_key)
+            self._keys[(temperature, max_tokens)] = api_key
+        if previous != api_key:
+            discard_llm(self.model, temperature, max_tokens, api_base=self.api_base, api_key=previous)
+        return get_llm(self.model, temperature, max_tokens, api_base=self.api_base, api_key=api_key)
+
+    @property
+    def price(self) -> float:
+        return (self.prompt_price + self.completion_price) / 2
+
+    def cost(self, message: BaseMessage) -> float:
+        usage = getattr(message, "usage_metadata", None) or {}
+        return (usage.get("input_tokens", 0) * self.prompt_price
+                + usage.get("output_tokens", 0) * self.completion_price) / 1000
+
+
+class RouteStats:
+    """
+    Recent latencies per request kind, an error-rate EWMA and counters for one route.
+
+    The error rate also halves every `error_half_life` seconds, so a route that
+    failed during an outage is tried again even if little traffic reaches it.
+    """
+
+    def __init__(self, window: int = 200, error_half_life: float = DEFAULT_ERROR_HALF_LIFE):
+        self.latencies = {INVOKE: deque(maxlen=window), STREAM: deque(maxlen=window)}
+        self.error_half_life = error_half_life
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+        self.cost = 0.0
+
+    def percentile(self, kind: str, pct: float) -> Optional[float]:
+        ordered = sorted(self.latencies[kind])
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def samples(self, kind: str) -> int:
+        return len(self.latencies[kind])
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_updated) / self.error_half_life)
+
+    def record_outcome(self, failed: bool):
+        self._error_rate = self.error_rate + ERROR_RATE_ALPHA * (failed - self.error_rate)
+        self._error_updated = time.monotonic()
+
+
+class LLMRouter:
+    """
+    Args:
+        routes (list): Routes to choose between.
+        cost_weight (float): Seconds of latency worth $1 per 1K tokens in the score.
+        error_penalty (float): Seconds of latency worth a 100% error rate.
+        prior_latency (float): Assumed latency for routes with fewer than
+            `min_samples` samples; the default 0 tries new routes first.
+        min_samples (int): Samples before measured latency (and hedging) is used.
+        explore_ratio (float): Share of requests sent to a random other route first.
+        error_half_life (float): Seconds for a route's error rate to halve without new outcomes.
+        hedge (bool): Hedge slow non-streamed requests to the next route.
+        min_hedge_delay (float): Never hedge sooner than this many seconds.
+        max_hedge_ratio (float): Most hedged requests as a fraction of all requests.
+        route_deadline (float): Overall seconds per route attempt (controller retries included).
+        route_attempts (int): Controller attempts per route before falling back.
+    """
+
+    def __init__(
+        self,
+        routes: List[Route],
+        cost_weight: float = DEFAULT_COST_WEIGHT,
+        error_penalty: float = DEFAULT_ERROR_PENALTY,
+        prior_latency: float = DEFAULT_PRIOR_LATENCY,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        explore_ratio: float = DEFAULT_EXPLORE_RATIO,
+        error_half_life: float = DEFAULT_ERROR_HALF_LIFE,
+        hedge: bool = True,
+        min_hedge_delay: float = DEFAULT_MIN_HEDGE_DELAY,
+        max_hedge_ratio: float = DEFAULT_MAX_HEDGE_RATIO,
+        route_deadline: float = DEFAULT_ROUTE_DEADLINE,
+        route_attempts: int = DEFAULT_ROUTE_ATTEMPTS,
+    ):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = list(routes)
+        self.cost_weight = cost_weight
+        self.error_penalty = error_penalty
+        self.prior_latency = prior_latency
+        self.min_samples = min_samples
+        self.explore_ratio = explore_ratio
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.route_deadline = route_deadline
+        self.route_attempts = route_attempts
+        self.stats: Dict[str, RouteStats] = {
+            route.name: RouteStats(error_half_life=error_half_life) for route in self.routes
+        }
+        self.counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "fallbacks": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def score(self, route: Route, kind: str = INVOKE) -> float:
+        """Lower is better; infinite while the route's circuit breaker is open and not yet probing."""
+        if get_controller(provider_for(route.model)).breaker.retry_in() > 0:
+            return float("inf")
+        with self._lock:
+            stats = self.stats[route.name]
+            latency = stats.percentile(kind, 50) if stats.samples(kind) >= self.min_samples else self.prior_latency
+            error_rate = stats.error_rate
+        return latency + self.error_penalty * error_rate + self.cost_weight * route.price
+
+    def ranked(self, kind: str = INVOKE) -> List[Route]:
+        """Routes best first, except that `explore_ratio` of the time a random other available route leads."""
+        scores = {route.name: self.score(route, kind) for route in self.routes}
+        routes = sorted(self.routes, key=lambda route: scores[route.name])
+        others = [route for route in routes[1:] if scores[route.name] != float("inf")]
+        if others and random.random() < self.explore_ratio:
+            routes.remove(explored := random.choice(others))
+            routes.insert(0, explored)
+        return routes
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _record(self, route: Route, kind: str, latency: Optional[float], message: Optional[BaseMessage] = None):
+        """Records one finished attempt; `latency` is None for a failure."""
+        with self._lock:
+            stats = self.stats[route.name]
+            stats.requests += 1
+            failed = latency is None
+            stats.record_outcome(failed)
+            if failed:
+                stats.failures += 1
+            else:
+                stats.latencies[kind].append(latency)
+            if message is not None:
+                stats.cost += route.cost(message)
+
+    def _hedge_delay(self, route: Route) -> Optional[float]:
+        if not self.hedge or len(self.routes) < 2:
+            return None
+        with self._lock:
+            stats = self.stats[route.name]
+            if stats.samples(INVOKE) < self.min_samples:
+                return None
+            return max(self.min_hedge_delay, stats.percentile(INVOKE, 95))
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.counters["hedges"] >= self.max_hedge_ratio * self.counters["requests"]:
+                return False
+            self.counters["hedges"] += 1
+            return True
+
+    def _policy(self):
+        return call_policy(deadline=self.route_deadline, max_attempts=self.route_attempts)
+
+    def _invoke_route(self, route: Route, messages, temperature, max_tokens, kwargs) -> AIMessage:
+        started = time.perf_counter()
+        try:
+            with self._policy():
+                message = route.llm(temperature, max_tokens).invoke(messages, config=_NO_CALLBACKS, **kwargs)
+        except Exception:
+            self._record(route, INVOKE, None)
+            raise
+        self._record(route, INVOKE, time.perf_counter() - started, message)
+        message.response_metadata = {**message.response_metadata, "route": route.name}
+        return message
+
+    async def _ainvoke_route(self, route: Route, messages, temperature, max_tokens, kwargs) -> AIMessage:
+        started = time.perf_counter()
+        try:
+            with self._policy():
+                message = await route.llm(temperature, max_tokens).ainvoke(messages, config=_NO_CALLBACKS, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(route, INVOKE, None)
+            raise
+        self._record(route, INVOKE, time.perf_counter() - started, message)
+        message.response_metadata = {**message.response_metadata, "route": route.name}
+        return message
+
+    def invoke(self, messages: List[BaseMessage], temperature: float = 0.7, max_tokens: Optional[int] = None,
+               **kwargs) -> AIMessage:
+        """Answers on the best route, hedging if it is slow and falling back if it fails."""
+        self._count("requests")
+        pending = self.ranked(INVOKE)
+        primary = pending.pop(0)
+        running, errors = {}, []
+
+        def launch(route: Route):
+            # Run in a copy of the caller's context, so its `call_policy` and telemetry span apply.
+            context = contextvars.copy_context()
+            running[_hedge_executor.submit(context.run, self._invoke_route, route, messages, temperature, max_tokens,
+                                           kwargs)] = route
+
+        launch(primary)
+        hedge_delay = self._hedge_delay(primary) if pending else None
+        while running:
+            done, _ = wait(running, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # The primary is slower than its p95: race the next route (if the budget allows).
+                hedge_delay = None
+                if pending and self._take_hedge():
+                    launch(pending.pop(0))
+                continue
+            for future in done:
+                route = running.pop(future)
+                try:
+                    message = future.result()
+                except Exception as e:
+                    errors.append((route.name, e))
+                    continue
+                if route is not primary:
+                    self._count("hedge_wins" if not errors else "fallbacks")
+                # A losing hedge finishes in its thread and is still recorded.
+                return message
+            if not running and pending:
+                hedge_delay = None
+                launch(pending.pop(0))
+        self._count("failed")
+        raise AllRoutesFailed(errors)
+
+    async def ainvoke(self, messages: List[BaseMessage], temperature: float = 0.7, max_tokens: Optional[int] = None,
+                      **kwargs) -> AIMessage:
+        """Async `invoke`; a losing hedge is cancelled."""
+        self._count("requests")
+        pending = self.ranked(INVOKE)
+        primary = pending.pop(0)
+        running, errors = {}, []
+
+        def launch(route: Route):
+            task = asyncio.ensure_future(self._ainvoke_route(route, messages, temperature, max_tokens, kwargs))
+            running[task] = route
+
+        launch(primary)
+        hedge_delay = self._hedge_delay(primary) if pending else None
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_delay = None
+                    if pending and self._take_hedge():
+                        launch(pending.pop(0))
+                    continue
+                for task in done:
+                    route = running.pop(task)
+                    try:
+                        message = task.result()
+                    except Exception as e:
+                        errors.append((route.name, e))
+                        continue
+                    if route is not primary:
+                        self._count("hedge_wins" if not errors else "fallbacks")
+                    return message
+                if not running and pending:
+                    hedge_delay = None
+                    launch(pending.pop(0))
+        finally:
+            for task in running:
+                task.cancel()
+        self._count("failed")
+        raise AllRoutesFailed(errors)
+
+    def stream(self, messages: List[BaseMessage], temperature: float = 0.7, max_tokens: Optional[int] = None,
+               **kwargs) -> Iterator[AIMessageChunk]:
+        """Streams from the best route, falling back to the next until a first chunk arrives."""
+        self._count("requests")
+        errors = []
+        for i, route in enumerate(self.ranked(STREAM)):
+            started = time.perf_counter()
+            try:
+                with self._policy():
+                    chunks = iter(route.llm(temperature, max_tokens).stream(messages, config=_NO_CALLBACKS, **kwargs))
+                    first = next(chunks, None)
+            except Exception as e:
+                self._record(route, STREAM, None)
+                errors.append((route.name, e))
+                continue
+            self._record(route, STREAM, time.perf_counter() - started)
+            if i:
+                self._count("fallbacks")
+            if first is not None:
+                first.response_metadata = {**first.response_metadata, "route": route.name}
+                yield first
+                yield from chunks
+            return
+        self._count("failed")
+        raise AllRoutesFailed(errors)
+
+    async def astream(self, messages: List[BaseMessage], temperature: float = 0.7, max_tokens: Optional[int] = None,
+                      **kwargs) -> AsyncIterator[AIMessageChunk]:
+        """Async `stream`."""
+        self._count("requests")
+        errors = []
+        for i, route in enumerate(self.ranked(STREAM)):
+            started = time.perf_counter()
+            try:
+                with self._policy():
+                    chunks = route.llm(temperature, max_tokens).astream(messages, config=_NO_CALLBACKS, **kwargs)
+                    first = await anext(chunks, None)
+            except Exception as e:
+                self._record(route, STREAM, None)
+                errors.append((route.name, e))
+                continue
+            self._record(route, STREAM, time.perf_counter() - started)
+            if i:
+                self._count("fallbacks")
+            if first is not None:
+                first.response_metadata = {**first.response_metadata, "route": route.name}
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+            return
+        self._count("failed")
+        raise AllRoutesFailed(errors)
+
+    def report(self) -> dict:
+        """Counters, plus per-route scores, latency percentiles, error rate and cost."""
+        routes = {}
+        for route in self.routes:
+            score = self.score(route)
+            with self._lock:
+                stats = self.stats[route.name]
+                routes[route.name] = {
+                    "model": route.model,
+                    "score": score,
+                    "requests": stats.requests,
+                    "failures": stats.failures,
+                    "error_rate": stats.error_rate,
+                    "p50_s": stats.percentile(INVOKE, 50),
+                    "p95_s": stats.percentile(INVOKE, 95),
+                    "ttft_p50_s": stats.percentile(STREAM, 50),
+                    "cost_usd": stats.cost,
+                }
+        with self._lock:
+            return {**self.counters, "routes": routes}
+
+
+class RoutedChatModel(BaseChatModel):
+    """A LangChain chat model that sends each request through an `LLMRouter`."""
+
+    router: Any
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-litellm"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.router.invoke(messages, self.temperature, self.max_tokens, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = await self.router.ainvoke(messages, self.temperature, self.max_tokens, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        for chunk in self.router.stream(messages, self.temperature, self.max_tokens, stop=stop, **kwargs):
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self.router.astream(messages, self.temperature, self.max_tokens, stop=stop, **kwargs):
+            yield ChatGenerationChunk(message=chunk)
+
+
+def cortex_url(account: str) -> str:
+    return f"https://{account}.snowflakecomputing.com/api/v2/cortex/inference:complete"
+
+
+def default_routes() -> List[Route]:
+    """
+    OpenAI if OPENAI_API_KEY is set, Snowflake Cortex if SNOWFLAKE_ACCOUNT_ID and
+    credentials are (SNOWFLAKE_USER and SNOWFLAKE_PRIVATE_KEY_PATH, or SNOWFLAKE_JWT).
+
+    A Cortex configuration that can't be used (an unreadable or invalid key, a
+    wrong passphrase, a malformed or expired JWT) skips Cortex with a warning rather than failing the other routes.
+    """
+    routes, cortex_error = [], None
+    if os.getenv("OPENAI_API_KEY"):
+        routes.append(Route("openai", OPENAI_MODEL, *PRICES[OPENAI_MODEL]))
+    account = os.getenv("SNOWFLAKE_ACCOUNT_ID")
+    keypair = os.getenv("SNOWFLAKE_USER") and os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH")
+    if account and (keypair or os.getenv("SNOWFLAKE_JWT")):
+        from snowflake_auth import get_snowflake_token
+
+        try:
+            tokens = get_snowflake_token()
+            # Issue one token now: a bad key, passphrase or expired JWT only fails when a token is needed.
+            tokens.token()
+            routes.append(Route("cortex", CORTEX_MODEL, *PRICES[CORTEX_MODEL],
+                                api_base=cortex_url(account), api_key=tokens))
+        except (OSError, ValueError, RuntimeError) as e:
+            cortex_error = f"Snowflake Cortex credentials unusable: {e}"
+            if routes:
+                warnings.warn(f"{cortex_error}; routing without Cortex", RuntimeWarning)
+    if not routes:
+        raise ValueError(cortex_error or "No provider configured: set OPENAI_API_KEY and/or the Snowflake credentials")
+    return routes
+
+
+_shared_router: Optional[LLMRouter] = None
+_routed_models: dict = {}
+_shared_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Returns the process-wide router over `default_routes()`."""
+    global _shared_router
+    with _shared_lock:
+        if _shared_router is None:
+            _shared_router = LLMRouter(default_routes())
+        return _shared_router
+
+
+def get_chat_model(model: str, temperature: float = 0.7, max_tokens: Optional[int] = None, **kwargs):
+    """
+    `get_llm(model, ...)`, except that model "auto" returns a shared
+    `RoutedChatModel` over `get_router()`.
+    """
+    if model != AUTO_MODEL:
+        return get_llm(model, temperature, max_tokens, **kwargs)
+    router = get_router()
+    with _shared_lock:
+        key = (temperature, max_tokens)
+        if key not in _routed_models:
+            _routed_models[key] = RoutedChatModel(router=router, temperature=temperature, max_tokens=max_tokens)
+        return _routed_models[key]
@@ -0,0 +1,121 @@
+"""
+Load test for the async chat service using a local fake LLM.
+
+Each simulated session is its own conversation thread and sends several turns
+back to back. Requests are driven straight through the ASGI callable, so the
+numbers reflect the graph, checkpointer and event loop rather than a network
+stack. Because the fake LLM only waits on `asyncio.sleep`, any latency above
+the simulated model time is overhead of a single worker process.
+
+Usage:
+    python load_test_chat_service.py --sessions 10 100 1000 --turns 3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from async_chatbot import create_async_chatbot
+from chat_service import create_chat_service
+from fake_llm import FakeChatModel
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _post_message(service, thread_id: str, content: str):
+    """Sends one turn through the ASGI app and returns (ttft, total) in seconds."""
+    body = json.dumps({"content": content}).encode("utf-8")
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": f"/threads/{thread_id}/messages",
+        "headers": [(b"content-type", b"application/json")],
+    }
+    received = False
+    timings = {"first_token": None}
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"Unexpected status {message['status']}")
+        if message["type"] != "http.response.body":
+            return
+        if message["body"].startswith(b"event: error"):
+            raise RuntimeError(message["body"].decode("utf-8"))
+        if timings["first_token"] is None and message["body"].startswith(b"event: token"):
+            timings["first_token"] = time.perf_counter()
+
+    await service(scope, receive, send)
+    finished = time.perf_counter()
+    return timings["first_token"] - started, finished - started
+
+
+async def _run_session(service, turns: int, results: list):
+    thread_id = str(uuid.uuid4())
+    for turn in range(turns):
+        # Unique questions per session, so the response cache doesn't answer them.
+        results.append(await _post_message(service, thread_id, f"Question {turn} from {thread_id}"))
+
+
+async def run_load_test(sessions: int, turns: int, llm: FakeChatModel):
+    """Runs `sessions` concurrent conversations against one service instance."""
+    service = create_chat_service(create_async_chatbot(llm=llm))
+    results = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_run_session(service, turns, results) for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    ttfts = [ttft for ttft, _ in results]
+    totals = [total for _, total in results]
+    return {
+        "sessions": sessions,
+        "turns": len(results),
+        "elapsed_s": elapsed,
+        "turns_per_s": len(results) / elapsed,
+        "ttft_p50_ms": _percentile(ttfts, 50) * 1000,
+        "ttft_p95_ms": _percentile(ttfts, 95) * 1000,
+        "total_p50_ms": statistics.median(totals) * 1000,
+        "total_p95_ms": _percentile(totals, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 500, 1000],
+                        help="Concurrent session counts to try")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--first-token-delay", type=float, default=0.3,
+                        help="Simulated model latency before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02,
+                        help="Simulated delay between tokens (s)")
+    args = parser.parse_args()
+
+    llm = FakeChatModel(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    model_time_ms = (args.first_token_delay + args.token_delay * (len(llm._tokens()) - 1)) * 1000
+    print(f"Simulated model time per turn: {model_time_ms:.0f} ms")
+    print(f"{'sessions':>8} {'turns/s':>9} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'total p95':>10}")
+
+    for sessions in args.sessions:
+        result = asyncio.run(run_load_test(sessions, args.turns, llm))
+        print(
+            f"{result['sessions']:>8} {result['turns_per_s']:>9.1f} "
+            f"{result['ttft_p50_ms']:>7.0f}ms {result['ttft_p95_ms']:>7.0f}ms "
+            f"{result['total_p50_ms']:>8.0f}ms {result['total_p95_ms']:>8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Storm test for `llm_control`: many async callers against a fake provider
+that throttles and fails on a schedule.
+
+The fake provider serves `--rate` requests per second with at most
+`--provider-concurrency` in flight and answers the rest with 429s carrying
+`retry-after-ms`, as OpenAI does. The schedule:
+
+    normal -> 429 storm (capacity cut to --storm-rate) -> outage (every call
+    is a 500) -> recovered
+
+Callers go through an `LLMController`, or with `--naive` through the notebook's
+old retry loop (fixed concurrency, exponential backoff on any error, headers
+ignored). The report shows successful calls per second over time, what the
+provider had to absorb (429s, 500s), and whether throughput came back to the
+provider's capacity after the storm and the outage.
+
+Usage:
+    python load_test_llm_control.py --clients 200
+    python load_test_llm_control.py --clients 200 --naive
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import httpx
+import litellm
+
+from llm_control import AIMDLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded, LLMController
+
+REQUEST = httpx.Request("POST", "https://fake-provider.invalid/v1/chat/completions")
+
+
+class FakeProvider:
+    """
+    Simulated completions API: a token bucket of `rate` requests per second,
+    a concurrency cap and scripted phases.
+
+    Args:
+        phases (list): (name, seconds, rate) in order; a rate of 0 is an outage.
+    """
+
+    def __init__(self, phases, max_concurrency: int, latency: float):
+        self.phases = phases
+        self.max_concurrency = max_concurrency
+        self.latency = latency
+        self.in_flight = 0
+        self.responses = Counter()
+        self.successes = []
+        self._tokens = 0.0
+        self._updated = None
+        self._started = None
+
+    def start(self):
+        self._started = self._updated = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def phase(self, elapsed: float):
+        end = 0.0
+        for name, seconds, rate in self.phases:
+            end += seconds
+            if elapsed < end:
+                return name, rate
+        name, _, rate = self.phases[-1]
+        return name, rate
+
+    @property
+    def duration(self) -> float:
+        return sum(seconds for _, seconds, _ in self.phases)
+
+    async def complete(self, timeout: float = None) -> str:
+        now = time.perf_counter()
+        _, rate = self.phase(now - self._started)
+        if rate == 0:
+            self.responses[500] += 1
+            await asyncio.sleep(self.latency / 4)
+            raise litellm.InternalServerError("Simulated outage", llm_provider="fake", model="fake")
+        self._tokens = min(rate, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+        if self.in_flight >= self.max_concurrency or self._tokens < 1:
+            self.responses[429] += 1
+            wait = max(self.latency if self.in_flight >= self.max_concurrency else 0.0, (1 - self._tokens) / rate)
+            response = httpx.Response(429, headers={"retry-after-ms": str(int(wait * 1000) + 1)}, request=REQUEST)
+            raise litellm.RateLimitError("Simulated rate limit", llm_provider="fake", model="fake", response=response)
+        self._tokens -= 1
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        self.responses[200] += 1
+        self.successes.append(time.perf_counter() - self._started)
+        return "ok"
+
+
+async def _naive_call(provider: FakeProvider, max_retries: int = 15, initial_delay: float = 1.0):
+    """The notebook's `retry_with_exponential_backoff`, made async."""
+    delay = initial_delay
+    for _ in range(max_retries + 1):
+        try:
+            return await provider.complete()
+        except (litellm.RateLimitError, litellm.InternalServerError):
+            delay *= 2 * (1 + random.random())
+            await asyncio.sleep(delay)
+    raise RuntimeError(f"Maximum number of retries ({max_retries}) exceeded.")
+
+
+async def _client(provider: FakeProvider, controller, outcomes: Counter, latencies: list, deadline: float):
+    while provider.elapsed() < provider.duration:
+        started = time.perf_counter()
+        try:
+            if controller is None:
+                await _naive_call(provider)
+            else:
+                await controller.acall(provider.complete, deadline=deadline, timeout_arg="timeout")
+            outcomes["ok"] += 1
+            latencies.append(time.perf_counter() - started)
+        except CircuitOpenError:
+            outcomes["circuit open"] += 1
+            # A real caller would show an error; don't spin on the open circuit.
+            await asyncio.sleep(0.1)
+        except DeadlineExceeded:
+            outcomes["deadline exceeded"] += 1
+        except Exception as e:
+            outcomes[type(e).__name__] += 1
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _capacity(rate: float, max_concurrency: int, latency: float) -> float:
+    return min(rate, max_concurrency / latency)
+
+
+async def run(args) -> bool:
+    phases = [
+        ("normal", args.phase_seconds, args.rate),
+        ("429 storm", args.phase_seconds, args.storm_rate),
+        ("outage", args.phase_seconds / 2, 0),
+        ("recovered", args.phase_seconds * 1.5, args.rate),
+    ]
+    provider = FakeProvider(phases, args.provider_concurrency, args.latency)
+    controller = None
+    if not args.naive:
+        controller = LLMController(
+            "fake",
+            deadline=args.deadline,
+            limiter=AIMDLimiter(initial=8, maximum=4 * args.provider_concurrency, decrease_cooldown=args.latency),
+            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=args.reset_timeout),
+        )
+    outcomes, latencies = Counter(), []
+    provider.start()
+    await asyncio.gather(*[_client(provider, controller, outcomes, latencies, args.deadline)
+                           for _ in range(args.clients)])
+
+    print(f"{'naive retry loop' if args.naive else 'LLMController'}: {args.clients} clients, "
+          f"{provider.duration:.0f}s, provider capacity {_capacity(args.rate, args.provider_concurrency, args.latency):.0f}/s "
+          f"(storm {_capacity(args.storm_rate, args.provider_concurrency, args.latency):.0f}/s)")
+    print(f"{'second':>6} {'phase':>10} {'ok/s':>6}")
+    for second in range(int(provider.duration)):
+        phase, _ = provider.phase(second + 0.5)
+        ok = sum(second <= t < second + 1 for t in provider.successes)
+        print(f"{second:6d} {phase:>10} {ok:6d}")
+    print(f"provider responses: {dict(provider.responses)}")
+    print(f"caller outcomes:    {dict(outcomes)}")
+    if latencies:
+        print(f"call latency:       p50 {_percentile(latencies, 50):.2f}s  p95 {_percentile(latencies, 95):.2f}s  "
+              f"max {max(latencies):.2f}s")
+    if controller is not None:
+        stats = controller.stats
+        print(f"controller:         {stats} breaker opened {controller.breaker.opened}x")
+
+    # Recovered if the last phase's second half runs near capacity.
+    window_end = provider.duration
+    window_start = window_end - phases[-1][1] / 2
+    recovered = sum(window_start <= t < window_end for t in provider.successes) / (window_end - window_start)
+    capacity = _capacity(args.rate, args.provider_concurrency, args.latency)
+    ok = recovered >= 0.8 * capacity
+    print(f"throughput after recovery: {recovered:.1f}/s ({recovered / capacity:.0%} of capacity) -> "
+          f"{'recovered' if ok else 'NOT recovered'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent callers")
+    parser.add_argument("--rate", type=float, default=100.0, help="Provider requests per second")
+    parser.add_argument("--storm-rate", type=float, default=20.0, help="Requests per second during the 429 storm")
+    parser.add_argument("--provider-concurrency", type=int, default=20, help="Provider's in-flight cap")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated call time (s)")
+    parser.add_argument("--phase-seconds", type=float, default=4.0, help="Length of the normal and storm phases")
+    parser.add_argument("--deadline", type=float, default=10.0, help="Per-call deadline (s)")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="Circuit breaker reset timeout (s)")
+    parser.add_argument("--naive", action="store_true", help="Use the old retry loop instead of the controller")
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
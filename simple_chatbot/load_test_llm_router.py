@@ -0,0 +1,155 @@
+"""
+End-to-end test of `llm_router` against the local mock OpenAI and Cortex endpoints.
+
+`MockLLMServer` plays both providers: OpenAI is fast with a slow tail, Cortex
+is a little slower but steady and cheaper. Cortex requests carry short-lived
+JWTs from a `TokenRefresher`, so several renewals happen during the run. The
+schedule:
+
+    normal -> OpenAI outage (every call is a 500) -> recovered
+
+Each phase runs `--clients` concurrent callers through a `RoutedChatModel`,
+once with hedging and (with `--compare`) once without. The report shows which
+route answered, p50/p95 latency per phase, hedges and fallbacks, JWT renewals,
+and the mock's responses per status code. The run fails if any request failed
+or if Cortex ever answered 401, i.e. if a request had to wait for or use an
+expired token.
+
+Usage:
+    python load_test_llm_router.py --clients 8 --phase-seconds 5 --compare
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+from collections import Counter
+
+import litellm
+from langchain_core.messages import HumanMessage
+
+from llm_control import clear_controllers, get_controller, provider_for
+from llm_router import LLMRouter, PRICES, Route, RoutedChatModel, CORTEX_MODEL, OPENAI_MODEL
+from mock_llm_server import MockBehavior, MockLLMServer
+from snowflake_auth import TokenRefresher
+
+
+def _fake_jwt(lifetime: float):
+    """An unsigned token with an `exp` claim; the mock only checks expiry."""
+    encode = lambda data: base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    expires_at = time.time() + lifetime
+    return f"{encode({'alg': 'none'})}.{encode({'exp': expires_at})}.", expires_at
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _run_phase(model: RoutedChatModel, clients: int, seconds: float, stream_every: int):
+    routes, latencies, failures = Counter(), [], Counter()
+    lock = threading.Lock()
+    end = time.perf_counter() + seconds
+
+    def client(index: int):
+        n = 0
+        while time.perf_counter() < end:
+            n += 1
+            messages = [HumanMessage(content=f"Question {index}-{n} about routing")]
+            started = time.perf_counter()
+            try:
+                if stream_every and n % stream_every == 0:
+                    chunks = list(model.stream(messages))
+                    route = chunks[0].response_metadata.get("route")
+                else:
+                    route = model.invoke(messages).response_metadata.get("route")
+            except Exception as e:
+                with lock:
+                    failures[type(e).__name__] += 1
+                continue
+            with lock:
+                routes[route] += 1
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return routes, latencies, failures
+
+
+def run(args, hedge: bool) -> bool:
+    clear_controllers()
+    for model_name in (OPENAI_MODEL, CORTEX_MODEL):
+        # Let a tripped circuit probe again within the run.
+        get_controller(provider_for(model_name)).breaker.reset_timeout = args.reset_timeout
+    openai = MockBehavior(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    cortex = MockBehavior(latency=args.latency * 1.5)
+    server = MockLLMServer(openai=openai, cortex=cortex).start()
+    tokens = TokenRefresher(lambda: _fake_jwt(args.jwt_lifetime), refresh_margin=args.jwt_lifetime / 2)
+    router = LLMRouter(
+        [
+            Route("openai", OPENAI_MODEL, *PRICES[OPENAI_MODEL], api_base=server.openai_base, api_key="mock"),
+            Route("cortex", CORTEX_MODEL, *PRICES[CORTEX_MODEL], api_base=server.cortex_url, api_key=tokens),
+        ],
+        hedge=hedge,
+        route_deadline=args.route_deadline,
+        error_half_life=args.error_half_life,
+    )
+    model = RoutedChatModel(router=router, max_tokens=64)
+
+    phases = [("normal", 0.0), ("openai outage", 1.0), ("recovered", 0.0)]
+    print(f"\n{'with' if hedge else 'without'} hedging: {args.clients} clients, {args.phase_seconds:.0f}s per phase")
+    print(f"{'phase':>14} {'requests':>8} {'failed':>6} {'p50':>6} {'p95':>6}  routes")
+    ok = True
+    for name, openai_error_rate in phases:
+        openai.error_rate = openai_error_rate
+        routes, latencies, failures = _run_phase(model, args.clients, args.phase_seconds, args.stream_every)
+        p50 = _percentile(latencies, 50) if latencies else float("nan")
+        p95 = _percentile(latencies, 95) if latencies else float("nan")
+        print(f"{name:>14} {len(latencies):8d} {sum(failures.values()):6d} {p50:5.2f}s {p95:5.2f}s  "
+              f"{dict(routes)} {dict(failures) if failures else ''}")
+        ok = ok and not failures
+    server.stop()
+
+    report = router.report()
+    print(f"hedges {report['hedges']} (won {report['hedge_wins']}), fallbacks {report['fallbacks']}, "
+          f"failed {report['failed']} of {report['requests']} requests")
+    for route_name, stats in report["routes"].items():
+        p50 = f"{stats['p50_s']:.2f}s" if stats["p50_s"] is not None else "-"
+        print(f"  {route_name:>6}: {stats['requests']} calls, {stats['failures']} failed, p50 {p50}, "
+              f"cost ${stats['cost_usd']:.4f}")
+    print(f"JWT renewals: {tokens.refreshes}")
+    print(f"mock responses: {dict(sorted(server.responses.items()))}")
+    unauthorized = server.responses[("cortex", 401)]
+    if unauthorized:
+        print(f"Cortex rejected {unauthorized} expired or missing tokens")
+    return ok and not unauthorized
+
+
+def main():
+    # The outage phase fails on purpose; skip LiteLLM's per-error help banner.
+    litellm.suppress_debug_info = True
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--phase-seconds", type=float, default=5.0, help="Length of each phase")
+    parser.add_argument("--latency", type=float, default=0.05, help="OpenAI mock latency (s); Cortex is 1.5x")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Fraction of slow OpenAI replies")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of slow OpenAI replies (s)")
+    parser.add_argument("--jwt-lifetime", type=float, default=4.0, help="Seconds each mock JWT is valid")
+    parser.add_argument("--route-deadline", type=float, default=5.0, help="Seconds per route before falling back")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="Circuit breaker reset timeout (s)")
+    parser.add_argument("--error-half-life", type=float, default=1.0, help="Router error-rate half-life (s)")
+    parser.add_argument("--stream-every", type=int, default=5, help="Stream every Nth request (0: never)")
+    parser.add_argument("--compare", action="store_true", help="Also run without hedging")
+    args = parser.parse_args()
+    ok = run(args, hedge=True)
+    if args.compare:
+        ok = run(args, hedge=False) and ok
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+A local mock of the OpenAI and Snowflake Cortex chat endpoints, and of OpenAI
+embeddings.
+
+LiteLLM can be pointed at it with `api_base`, so provider routing, fallback and
+token refresh can be exercised end to end without API keys:
+
+- OpenAI:  `get_llm("gpt-3.5-turbo", api_base=server.openai_base, api_key="mock")`
+- Cortex:  `get_llm("snowflake/mistral-7b", api_base=server.cortex_url, api_key=jwt)`
+- Embeddings: `openai.OpenAI(base_url=server.openai_base, api_key="mock")`, or
+  OPENAI_API_BASE for LiteLLM
+
+Both chat routes serve OpenAI-shaped chat completions, plain or streamed as
+Server-Sent Events. The Cortex route also checks the key-pair JWT headers
+LiteLLM sends and answers 401 once the token's `exp` has passed. Embeddings
+are hashed bags of words, so texts sharing words get similar vectors.
+
+`MockBehavior` sets latency, a slow tail, the streaming token rate, the reply
+length, and the fraction of 429s and 500s; it can be changed while the server
+runs to script outages. With a `seed`, replies and injected errors are the
+same from run to run (for a given request order).
+
+Usage:
+    python mock_llm_server.py --port 8001 --latency 0.2 --tokens-per-second 50 --error-rate 0.05
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from snowflake_auth import jwt_expiry
+
+OPENAI_PATH = "/v1/chat/completions"
+EMBEDDINGS_PATH = "/v1/embeddings"
+CORTEX_PATH = "/api/v2/cortex/inference:complete"
+DEFAULT_EMBEDDING_DIMENSIONS = 256
+FILLER_WORDS = ("the", "index", "retrieves", "relevant", "chunks", "and", "an", "agent", "answers", "with",
+                "sources", "from", "blog", "posts", "about", "llama", "embeddings", "queries")
+
+
+@dataclass
+class MockBehavior:
+    """
+    How the mock answers.
+
+    Attributes:
+        latency (float): Seconds before a reply (or before the first streamed token).
+        token_delay (float): Seconds between streamed tokens.
+        tokens_per_second (float): Streaming rate; overrides `token_delay` when set.
+        reply_tokens (int): Pad replies to this many words (0: a short echo of the question).
+        slow_rate (float): Fraction of requests that take `slow_latency` instead.
+        slow_latency (float): Latency of the slow tail.
+        rate_limit_rate (float): Fraction answered with 429 and `retry-after-ms`.
+        error_rate (float): Fraction answered with 500.
+    """
+    latency: float = 0.05
+    token_delay: float = 0.0
+    tokens_per_second: float = 0.0
+    reply_tokens: int = 0
+    slow_rate: float = 0.0
+    slow_latency: float = 2.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+
+
+def _reply_text(provider: str, messages: list, reply_tokens: int = 0) -> str:
+    question = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    text = f"Mock {provider} reply to: {' '.join(question.split()[:12])}"
+    words = text.split()
+    if len(words) < reply_tokens:
+        # Deterministic filler, so a reply's length (and the history it adds) is known.
+        words += [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(reply_tokens - len(words))]
+    return " ".join(words)
+
+
+def mock_embedding(text: str, dimensions: int = DEFAULT_EMBEDDING_DIMENSIONS) -> list:
+    """A hashed bag of words, L2-normalized; texts sharing words get similar vectors."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[value % dimensions] += 1.0 if value & (1 << 63) else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockLLMServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, headers: Optional[dict] = None):
+        self._send_json(status, {"error": {"message": message, "type": "mock_error", "code": status}}, headers)
+
+    def do_HEAD(self):
+        # Lets clients pre-open a keep-alive connection (see `warmup.preconnect`).
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _inject(self, provider: str, behavior: "MockBehavior") -> bool:
+        """Answers with an injected 429 or 500 if the dice say so; returns True if it did."""
+        roll = self.server.random()
+        if roll < behavior.rate_limit_rate:
+            self.server.count(provider, 429)
+            self._error(429, "Mock rate limit", {"retry-after-ms": str(int(behavior.latency * 1000) + 1)})
+            return True
+        if roll < behavior.rate_limit_rate + behavior.error_rate:
+            time.sleep(behavior.latency / 4)
+            self.server.count(provider, 500)
+            self._error(500, "Mock server error")
+            return True
+        return False
+
+    def _sleep(self, behavior: "MockBehavior"):
+        time.sleep(behavior.slow_latency if self.server.random() < behavior.slow_rate else behavior.latency)
+
+    def _embeddings(self, body: dict):
+        behavior = self.server.behaviors["embeddings"]
+        if self._inject("embeddings", behavior):
+            return
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        # Token-id inputs (lists of ints) are embedded by their ids.
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        dimensions = int(body.get("dimensions") or self.server.embedding_dimensions)
+        self._sleep(behavior)
+        data = []
+        for i, text in enumerate(texts):
+            vector = mock_embedding(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(len(text.split()) for text in texts)
+        self.server.count("embeddings", 200)
+        self._send_json(200, {"object": "list", "data": data, "model": body.get("model", "mock"),
+                              "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == EMBEDDINGS_PATH:
+            return self._embeddings(body)
+        if self.path == OPENAI_PATH:
+            provider = "openai"
+        elif self.path == CORTEX_PATH:
+            provider = "cortex"
+            authorization = self.headers.get("Authorization", "")
+            if self.headers.get("X-Snowflake-Authorization-Token-Type") != "KEYPAIR_JWT" \
+                    or not authorization.startswith("Bearer "):
+                self.server.count(provider, 401)
+                return self._error(401, "Missing key-pair JWT")
+            expires_at = jwt_expiry(authorization[len("Bearer "):])
+            if expires_at is None or expires_at <= time.time():
+                self.server.count(provider, 401)
+                return self._error(401, "JWT token has expired")
+        else:
+            return self._error(404, f"Unknown path {self.path}")
+
+        behavior = self.server.behaviors[provider]
+        if self._inject(provider, behavior):
+            return
+
+        self._sleep(behavior)
+        text = _reply_text(provider, body.get("messages", []), behavior.reply_tokens)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        completion_tokens = len(text.split())
+        model = body.get("model", "mock")
+        self.server.count(provider, 200)
+        if body.get("stream"):
+            token_delay = 1.0 / behavior.tokens_per_second if behavior.tokens_per_second else behavior.token_delay
+            return self._stream(model, text, token_delay)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream(self, model: str, text: str, token_delay: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i and token_delay:
+                time.sleep(token_delay)
+            delta = {"content": word if i == 0 else " " + word}
+            if i == 0:
+                delta["role"] = "assistant"
+            self._event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _event(self, data: dict):
+        self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """
+    Serves the mock endpoints on a background thread.
+
+    Args:
+        port (int): 0 picks a free port.
+        openai (MockBehavior, optional): Behaviour of the OpenAI route.
+        cortex (MockBehavior, optional): Behaviour of the Cortex route.
+        embeddings (MockBehavior, optional): Behaviour of the embeddings route.
+        embedding_dimensions (int): Vector size when a request doesn't ask for one.
+        seed (int, optional): Seeds the slow-tail and error dice.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, openai: Optional[MockBehavior] = None, cortex: Optional[MockBehavior] = None,
+                 host: str = "127.0.0.1", embeddings: Optional[MockBehavior] = None,
+                 embedding_dimensions: int = DEFAULT_EMBEDDING_DIMENSIONS, seed: Optional[int] = None):
+        super().__init__((host, port), _Handler)
+        self.behaviors = {"openai": openai or MockBehavior(), "cortex": cortex or MockBehavior(),
+                          "embeddings": embeddings or MockBehavior(latency=0.02)}
+        self.embedding_dimensions = embedding_dimensions
+        self.responses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_error(self, request, client_address):
+        # Hedged and timed-out requests hang up mid-reply on purpose.
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def random(self) -> float:
+        """The next roll of the (seeded) dice; handler threads share one generator."""
+        with self._lock:
+            return self._random.random()
+
+    def count(self, provider: str, status: int):
+        with self._lock:
+            self.responses[(provider, status)] += 1
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def cortex_url(self) -> str:
+        return f"{self.url}{CORTEX_PATH}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per reply")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Streaming rate (overrides --token-delay)")
+    parser.add_argument("--reply-tokens", type=int, default=0, help="Pad replies to this many words")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of slow replies")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="Seconds per slow reply")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500s")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Seconds per embeddings request")
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_EMBEDDING_DIMENSIONS, help="Embedding size")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the slow-tail and error dice")
+    args = parser.parse_args()
+
+    behavior = MockBehavior(args.latency, args.token_delay, args.tokens_per_second, args.reply_tokens,
+                            args.slow_rate, args.slow_latency, args.rate_limit_rate, args.error_rate)
+    embeddings = MockBehavior(latency=args.embedding_latency, rate_limit_rate=args.rate_limit_rate,
+                              error_rate=args.error_rate)
+    server = MockLLMServer(args.port, openai=behavior, cortex=MockBehavior(**vars(behavior)), embeddings=embeddings,
+                           embedding_dimensions=args.dimensions, seed=args.seed)
+    print(f"OpenAI: {server.openai_base}  Cortex: {server.cortex_url}  Embeddings: {server.openai_base}/embeddings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+A two-tier response cache in front of the LLM.
+
+- Exact tier: keyed by the normalized prompt (role + whitespace/case-normalized
+  content of every message) plus the model parameters.
+- Semantic tier: for prompts whose earlier messages and parameters match, the
+  last (user) message is embedded and a cached answer is returned when the
+  cosine similarity is at least `similarity_threshold`.
+
+Per-turn context that is not part of the conversation (e.g. retrieved blog
+excerpts) is passed separately as `context`. It is part of the exact key, so
+an exact hit was answered from the same context, but not of the semantic
+group: a near-duplicate question matches even if retrieval returned slightly
+different chunks for it.
+
+Entries are evicted least-recently-used beyond `max_entries` and expire after
+`ttl_seconds`. With `db_path` set, entries are stored in SQLite and reloaded on
+start, so the cache survives restarts.
+
+Sampled responses (temperature > 0) are not served from or written to the cache
+unless the caller passes `allow_sampled=True`. The chatbots only do so when
+CHATBOT_CACHE_SAMPLED is set: their cache is shared by every session, so the
+semantic tier could otherwise hand one user's sampled reply to another.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from history import token_counter
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    grp TEXT NOT NULL,
+    response TEXT NOT NULL,
+    embedding BLOB,
+    saved_tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+def _normalize(text) -> str:
+    if not isinstance(text, str):
+        text = json.dumps(text, sort_keys=True)
+    return " ".join(text.split()).lower()
+
+
+def _message_parts(message) -> tuple:
+    """Returns (role, normalized content) for a LangChain message or an OpenAI-style dict."""
+    if isinstance(message, dict):
+        return message["role"], _normalize(message["content"])
+    return message.type, _normalize(message.content)
+
+
+def _hash(value) -> str:
+    return hashlib.sha256(json.dumps(value).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheHit:
+    """A cached response returned by `ResponseCache.lookup`."""
+
+    content: str
+    tier: str  # "exact" or "semantic"
+    similarity: float = 1.0
+
+
+@dataclass
+class _Entry:
+    key: str
+    group: str
+    response: str
+    embedding: Optional[np.ndarray]
+    saved_tokens: int
+    created_at: float
+    last_access: float
+
+
+class ResponseCache:
+    """
+    Exact + semantic response cache with LRU/TTL eviction and optional persistence.
+
+    Args:
+        embed_fn (callable, optional): Maps a string to an embedding vector. If None,
+            only the exact tier is used.
+        similarity_threshold (float): Minimum cosine similarity for a semantic hit.
+        max_entries (int): Maximum number of cached responses.
+        ttl_seconds (float | None): Age after which an entry is ignored and dropped.
+        db_path (str, optional): SQLite file to persist entries across restarts.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], Sequence[float]]] = None,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        db_path: Optional[str] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.RLock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # group -> keys of entries with embeddings, and a cached (keys, matrix) stack
+        self._groups: dict[str, set] = {}
+        self._matrices: dict[str, tuple] = {}
+        self._recent_vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+
+        self._counters = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "saved_tokens": 0,
+        }
+        self._lookup_seconds = deque(maxlen=1000)
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._load()
+
+    # --- Keys ---
+
+    @staticmethod
+    def _params(model: str, temperature: float, max_tokens: Optional[int]) -> list:
+        return [model, float(temperature), max_tokens]
+
+    def _keys(self, messages, model, temperature, max_tokens, context=None) -> tuple:
+        parts = [_message_parts(m) for m in messages]
+        params = self._params(model, temperature, max_tokens)
+        exact_key = _hash([params, parts] if context is None else [params, parts, _message_parts(context)])
+        # Semantic matches are only considered when everything but the last message
+        # matches; the per-turn context is left out on purpose (see the module docstring).
+        group = _hash([params, parts[:-1]])
+        return exact_key, group, parts[-1][1] if parts else ""
+
+    # --- Storage helpers (caller holds the lock) ---
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT key, grp, response, embedding, saved_tokens, created_at, last_access "
+            "FROM response_cache ORDER BY last_access DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, group, response, embedding, saved_tokens, created_at, last_access in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self._add(_Entry(key, group, response, vector, saved_tokens, created_at, last_access))
+
+    def _add(self, entry: _Entry):
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        if entry.embedding is not None:
+            self._groups.setdefault(entry.group, set()).add(entry.key)
+            self._matrices.pop(entry.group, None)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry.embedding is not None:
+            keys = self._groups.get(entry.group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[entry.group]
+            self._matrices.pop(entry.group, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def _touch(self, entry: _Entry, now: float):
+        entry.last_access = now
+        self._entries.move_to_end(entry.key)
+        if self._conn is not None:
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?", (now, entry.key)
+            )
+
+    def _embed(self, text: str) -> np.ndarray:
+        # A miss is usually followed by a store of the same prompt; don't embed it twice.
+        with self._lock:
+            vector = self._recent_vectors.get(text)
+        if vector is not None:
+            return vector
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        with self._lock:
+            self._recent_vectors[text] = vector
+            if len(self._recent_vectors) > 256:
+                self._recent_vectors.popitem(last=False)
+        return vector
+
+    def _semantic_search(self, group: str, vector: np.ndarray, now: float) -> Optional[tuple]:
+        keys = self._groups.get(group)
+        if not keys:
+            return None
+        if group not in self._matrices:
+            ordered = list(keys)
+            self._matrices[group] = (ordered, np.stack([self._entries[k].embedding for k in ordered]))
+        ordered, matrix = self._matrices[group]
+        similarities = matrix @ vector
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.similarity_threshold:
+                return None
+            entry = self._entries[ordered[index]]
+            if not self._expired(entry, now):
+                return entry, float(similarities[index])
+        return None
+
+    # --- Public API ---
+
+    def lookup(
+        self,
+        messages,
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int] = None,
+        allow_sampled: bool = False,
+        context=None,
+    ) -> Optional[CacheHit]:
+        """
+        Looks up a cached response for a prompt.
+
+        Args:
+            messages (list): LangChain messages or OpenAI-style {"role", "content"} dicts.
+            model (str): Model name the response was generated with.
+            temperature (float): Sampling temperature of the request.
+            max_tokens (int, optional): Completion token limit of the request.
+            allow_sampled (bool): Serve cached answers even if temperature > 0.
+            context (optional): A message with this turn's context, sent to the
+                model along with `messages` but not part of the conversation.
+
+        Returns:
+            CacheHit | None: The cached response, or None on a miss or bypass.
+        """
+        if temperature > 0 and not allow_sampled:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return None
+
+        started = time.perf_counter()
+        exact_key, group, last_message = self._keys(messages, model, temperature, max_tokens, context)
+        # Embed outside the lock; it may be a network call.
+        vector = None
+        if self.embed_fn is not None and last_message:
+            with self._lock:
+                needs_vector = exact_key not in self._entries and group in self._groups
+            if needs_vector:
+                vector = self._embed(last_message)
+
+        with self._lock:
+            now = time.time()
+            self._counters["lookups"] += 1
+            hit = None
+            entry = self._entries.get(exact_key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(exact_key)
+                entry = None
+            if entry is not None:
+                hit = CacheHit(entry.response, "exact")
+                self._counters["exact_hits"] += 1
+            elif vector is not None:
+                found = self._semantic_search(group, vector, now)
+                if found is not None:
+                    entry, similarity = found
+                    hit = CacheHit(entry.response, "semantic", similarity)
+                    self._counters["semantic_hits"] += 1
+
+            if hit is None:
+                self._counters["misses"] += 1
+            else:
+                self._counters["saved_tokens"] += entry.saved_tokens
+                self._touch(entry, now)
+            self._lookup_seconds.append(time.perf_counter() - started)
+            return hit
+
+    def store(
+        self,
+        messages,
+        model: str,
+        temperature: float,
+        response: str,
+        max_tokens: Optional[int] = None,
+        allow_sampled: bool = False,
+        usage: Optional[dict] = None,
+        context=None,
+    ):
+        """
+        Stores a response for a prompt.
+
+        Args:
+            messages (list): The prompt the response was generated for.
+            model, temperature, max_tokens: The request parameters.
+            response (str): The response text.
+            allow_sampled (bool): Cache the response even if temperature > 0.
+            usage (dict, optional): Token usage ({"input_tokens", "output_tokens"}),
+                used to report saved tokens. Estimated from the text if missing.
+            context (optional): The turn's context message, as passed to `lookup`.
+        """
+        if (temperature > 0 and not allow_sampled) or not response:
+            return
+        exact_key, group, last_message = self._keys(messages, model, temperature, max_tokens, context)
+        if usage:
+            saved_tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        else:
+            prompt_text = " ".join(content for _, content in (_message_parts(m) for m in messages))
+            saved_tokens = token_counter.count_text(prompt_text) + token_counter.count_text(response)
+        vector = self._embed(last_message) if self.embed_fn is not None and last_message else None
+
+        with self._lock:
+            now = time.time()
+            self._remove(exact_key)
+            self._add(_Entry(exact_key, group, response, vector, saved_tokens, now, now))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        exact_key,
+                        group,
+                        response,
+                        vector.tobytes() if vector is not None else None,
+                        saved_tokens,
+                        now,
+                        now,
+                    ),
+                )
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    async def alookup(self, *args, **kwargs) -> Optional[CacheHit]:
+        """Async `lookup`; runs in a worker thread only when an embedding call may be needed."""
+        if self.embed_fn is None:
+            return self.lookup(*args, **kwargs)
+        return await asyncio.to_thread(self.lookup, *args, **kwargs)
+
+    async def astore(self, *args, **kwargs):
+        """Async `store`; runs in a worker thread only when an embedding call may be needed."""
+        if self.embed_fn is None:
+            return self.store(*args, **kwargs)
+        return await asyncio.to_thread(self.store, *args, **kwargs)
+
+    def clear(self):
+        """Removes every entry, including the persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._matrices.clear()
+            self._recent_vectors.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM response_cache")
+
+    def stats(self) -> dict:
+        """Returns hit rate, saved tokens and lookup latency metrics."""
+        with self._lock:
+            served = self._counters["lookups"]
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            latencies = sorted(self._lookup_seconds)
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": hits / served if served else 0.0,
+                "lookup_p50_ms": latencies[int(round(0.50 * (len(latencies) - 1)))] * 1000 if latencies else 0.0,
+                "lookup_p95_ms": latencies[int(round(0.95 * (len(latencies) - 1)))] * 1000 if latencies else 0.0,
+            }
+
+
+def litellm_embedder(model: str = "text-embedding-3-small", **kwargs) -> Callable[[str], list]:
+    """Returns an `embed_fn` that embeds text through LiteLLM, under the provider's `LLMController`."""
+    import litellm
+
+    import telemetry
+    from llm_control import get_controller, provider_for
+
+    controller = get_controller(provider_for(model))
+
+    def embed(text: str) -> list:
+        with telemetry.span("embedding", model=model, texts=1):
+            response = controller.call(litellm.embedding, model=model, input=[text], timeout_arg="timeout", **kwargs)
+        return response.data[0]["embedding"]
+
+    return embed
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide response cache used by the chatbots.
+
+    Configured from the environment:
+        CHATBOT_RESPONSE_CACHE_DB: SQLite file to persist the cache (in-memory if unset).
+        CHATBOT_CACHE_EMBEDDING_MODEL: Embedding model that enables the semantic tier.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            embedding_model = os.getenv("CHATBOT_CACHE_EMBEDDING_MODEL")
+            _shared_cache = ResponseCache(
+                embed_fn=litellm_embedder(embedding_model) if embedding_model else None,
+                db_path=os.getenv("CHATBOT_RESPONSE_CACHE_DB"),
+            )
+        return _shared_cache
@@ -0,0 +1,168 @@
+"""
+Key-pair JWTs for the Snowflake Cortex REST API, renewed before they expire.
+
+Cortex authenticates with a JWT signed by the service user's RSA key (the user
+created by `snowflake_rl_wh_user_setup.sql`), valid for at most an hour.
+`TokenRefresher` hands out the current token and, once it is within
+`refresh_margin` of expiring, renews it on a background thread. Requests keep
+using the still-valid token meanwhile. `token()` only waits when there is no
+valid token at all (first use, or renewals failing past expiry).
+
+Configured from the environment (see `get_snowflake_token`):
+    SNOWFLAKE_ACCOUNT_ID: Account identifier.
+    SNOWFLAKE_USER and SNOWFLAKE_PRIVATE_KEY_PATH (optionally
+        SNOWFLAKE_PRIVATE_KEY_PASSPHRASE): Issue and renew key-pair JWTs.
+    SNOWFLAKE_JWT: A pre-issued token, used when no private key is configured;
+        it cannot be renewed, so requests fail once it expires.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+DEFAULT_LIFETIME = 3600
+DEFAULT_REFRESH_MARGIN = 300.0
+MIN_RETRY_INTERVAL = 10.0
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """The `exp` claim of a JWT (epoch seconds), read without verifying the signature."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def keypair_jwt(account: str, user: str, private_key_pem: bytes, passphrase: Optional[bytes] = None,
+                lifetime: int = DEFAULT_LIFETIME) -> Tuple[str, float]:
+    """
+    Issues a key-pair JWT for `user` (requires `pyjwt` and `cryptography`).
+
+    Returns:
+        (token, expires_at): The token and its expiry in epoch seconds.
+    """
+    import jwt
+    from cryptography.hazmat.primitives import serialization
+
+    private_key = serialization.load_pem_private_key(private_key_pem, password=passphrase)
+    public_key = private_key.public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    fingerprint = "SHA256:" + base64.b64encode(hashlib.sha256(public_key).digest()).decode("ascii")
+    # The account locator without region or cloud, e.g. "xy12345.us-east-1" -> "XY12345".
+    qualified_user = f"{account.split('.')[0].upper()}.{user.upper()}"
+    now = int(time.time())
+    expires_at = now + lifetime
+    claims = {"iss": f"{qualified_user}.{fingerprint}", "sub": qualified_user, "iat": now, "exp": expires_at}
+    return jwt.encode(claims, private_key, algorithm="RS256"), float(expires_at)
+
+
+class TokenRefresher:
+    """
+    Serves a token from `issue` and renews it in the background before it expires.
+
+    Args:
+        issue (callable): Returns (token, expires_at in epoch seconds).
+        refresh_margin (float): Seconds before expiry at which renewal starts.
+    """
+
+    def __init__(self, issue: Callable[[], Tuple[str, float]], refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self._issue = issue
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Thread] = None
+        self._last_attempt = float("-inf")
+        self.refreshes = 0
+        self.error: Optional[str] = None
+
+    def _refresh(self):
+        try:
+            token, expires_at = self._issue()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            self._token, self.expires_at = token, expires_at
+            self.refreshes += 1
+            self.error = None
+            # Only failed renewals are rate limited.
+            self._last_attempt = float("-inf")
+
+    def _start_refresh(self) -> threading.Thread:
+        """Starts one background renewal unless one is running; returns it."""
+        with self._lock:
+            if self._refreshing is None or not self._refreshing.is_alive():
+                self._last_attempt = time.monotonic()
+                self._refreshing = threading.Thread(target=self._refresh, name="token-refresh", daemon=True)
+                self._refreshing.start()
+            return self._refreshing
+
+    def token(self, timeout: Optional[float] = 30.0) -> str:
+        """
+        Returns a valid token. Renews in the background when close to expiry;
+        waits up to `timeout` seconds only if the current token is unusable.
+        """
+        now = time.time()
+        with self._lock:
+            token, expires_at = self._token, self.expires_at
+            retry_due = time.monotonic() - self._last_attempt >= MIN_RETRY_INTERVAL
+        if token is not None and now < expires_at:
+            if now >= expires_at - self.refresh_margin and retry_due:
+                self._start_refresh()
+            return token
+        self._start_refresh().join(timeout)
+        with self._lock:
+            if self._token is None or time.time() >= self.expires_at:
+                raise RuntimeError(f"No valid token: {self.error or 'renewal timed out'}")
+            return self._token
+
+    def __call__(self) -> str:
+        return self.token()
+
+
+_shared_token: Optional[TokenRefresher] = None
+_shared_lock = threading.Lock()
+
+
+def _static_token(token: str) -> Tuple[str, float]:
+    expires_at = jwt_expiry(token)
+    if expires_at is None:
+        raise ValueError("SNOWFLAKE_JWT is not a JWT with an 'exp' claim")
+    return token, expires_at
+
+
+def get_snowflake_token() -> TokenRefresher:
+    """
+    Returns the process-wide Snowflake token source, configured from the environment.
+
+    With SNOWFLAKE_USER and SNOWFLAKE_PRIVATE_KEY_PATH, tokens are issued and
+    renewed from the private key; otherwise SNOWFLAKE_JWT is served until it expires.
+    """
+    global _shared_token
+    with _shared_lock:
+        if _shared_token is not None:
+            return _shared_token
+        account = os.environ.get("SNOWFLAKE_ACCOUNT_ID")
+        user = os.environ.get("SNOWFLAKE_USER")
+        key_path = os.environ.get("SNOWFLAKE_PRIVATE_KEY_PATH")
+        if account and user and key_path:
+            with open(key_path, "rb") as f:
+                private_key_pem = f.read()
+            passphrase = os.environ.get("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE")
+            passphrase = passphrase.encode("utf-8") if passphrase else None
+            issue = lambda: keypair_jwt(account, user, private_key_pem, passphrase)
+        elif os.environ.get("SNOWFLAKE_JWT"):
+            static = os.environ["SNOWFLAKE_JWT"]
+            issue = lambda: _static_token(static)
+        else:
+            raise ValueError("Set SNOWFLAKE_USER and SNOWFLAKE_PRIVATE_KEY_PATH (or SNOWFLAKE_JWT) "
+                             "to authenticate with Snowflake Cortex")
+        _shared_token = TokenRefresher(issue)
+        return _shared_token
@@ -0,0 +1,448 @@
+"""
+Spans for chat turns: graph nodes, LLM calls, checkpointer I/O and retrieval.
+
+Instrumented code opens spans with `span(name, **attributes)` (or wraps a
+function with `traced(name, fn)`); spans nest through a context variable, so a
+node's LLM call and checkpoint writes become its children, across LangGraph's
+worker threads and async tasks. What the repo instruments:
+
+    chat.turn         one user turn (`chat_streaming.stream_reply`)
+    node.<name>       each graph node
+    llm.call          every ChatLiteLLM completion: model, provider, stream,
+                      queue_wait_s, attempts, ttft_s, prompt/completion tokens
+    checkpoint.load   / checkpoint.save / checkpoint.save_writes (in-memory);
+                      checkpoint.sqlite.* for the SQLite saver
+    embedding         embedding requests (response cache and blog retrieval)
+    index.search      faiss search; bm25.search and retrieval.fuse for hybrid
+
+Spans are only recorded when the layer is enabled (`configure(...)` or
+CHATBOT_TELEMETRY=1) or inside `collect()`, which gathers one context's spans,
+e.g. for the Streamlit debug panel. Otherwise `span()` returns a shared no-op
+object after one flag and one context-variable check.
+
+Finished spans go to exporters:
+- `PrometheusExporter` serves span-duration histograms and token counters in
+  the Prometheus text format (CHATBOT_METRICS_PORT=9464).
+- `OTelExporter` forwards spans to the OpenTelemetry tracer provider
+  (CHATBOT_OTEL=1; needs `opentelemetry-sdk`, and
+  `opentelemetry-exporter-otlp` to send them over OTLP).
+"""
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_METRICS_PORT = 9464
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = False
+_exporters: List[Any] = []
+_current: ContextVar[Optional["Span"]] = ContextVar("telemetry_span", default=None)
+_collector: ContextVar[Optional[list]] = ContextVar("telemetry_collector", default=None)
+
+
+class Span:
+    """
+    One timed operation.
+
+    Attributes:
+        name (str): Operation name, e.g. "llm.call".
+        attributes (dict): Details, e.g. {"model": ..., "prompt_tokens": ...}.
+        parent (Span | None): The enclosing span.
+        trace_id (str), span_id (str), parent_id (str | None): OpenTelemetry-style ids.
+        start_time (float): Epoch seconds at start.
+        duration (float | None): Seconds, once ended.
+        error (str | None): "Type: message" if the operation raised.
+    """
+
+    __slots__ = ("name", "attributes", "parent", "trace_id", "span_id", "parent_id", "start_time", "duration",
+                 "error", "exported", "_started", "_collector", "_token")
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"], collector: Optional[list]):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.exported: dict = {}
+        self._collector = collector
+        self._token = None
+        self._started = time.perf_counter()
+        for exporter in _exporters:
+            on_start = getattr(exporter, "on_start", None)
+            if on_start is not None:
+                on_start(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the span started."""
+        return time.perf_counter() - self._started
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self._collector is not None:
+            self._collector.append(self)
+        for exporter in _exporters:
+            exporter.on_end(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in another context (e.g. a generator closed elsewhere).
+            pass
+        self.end(exc)
+        return False
+
+
+class _NoopSpan:
+    """Returned by `span()`/`start_span()` while nothing is recording."""
+
+    __slots__ = ()
+    name = None
+    attributes: dict = {}
+    elapsed = 0.0
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def recording() -> bool:
+    """True if spans opened in the current context are recorded."""
+    return _enabled or _collector.get() is not None
+
+
+def start_span(name: str, **attributes):
+    """
+    Starts a span without making it current; `end()` it when done. Use it
+    for operations that outlive a `with` block, e.g. a stream being consumed.
+    """
+    collector = _collector.get()
+    if not _enabled and collector is None:
+        return NOOP_SPAN
+    return Span(name, attributes, _current.get(), collector)
+
+
+def span(name: str, **attributes):
+    """A span as a context manager; it is the parent of spans opened inside it."""
+    collector = _collector.get()
+    if not _enabled and collector is None:
+        return NOOP_SPAN
+    return Span(name, attributes, _current.get(), collector)
+
+
+class use_span:
+    """Makes a started span current for a block without ending it."""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        if isinstance(self.span, Span):
+            self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current.reset(self._token)
+        return False
+
+
+def annotate(**attributes):
+    """Adds attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced(name: str, fn: Optional[Callable] = None) -> Callable:
+    """
+    Wraps a sync or async function (e.g. a graph node) so each call is a span.
+    Without `fn`, returns a decorator: `@traced("checkpoint.save")`.
+    """
+    if fn is None:
+        return functools.partial(traced, name)
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class collect:
+    """
+    Records the spans finished in this context (and the threads and tasks it
+    spawns), whether or not the layer is enabled:
+
+        with telemetry.collect() as spans:
+            ...
+    """
+
+    __slots__ = ("spans", "_token")
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._token = None
+
+    def __enter__(self) -> List[Span]:
+        self._token = _collector.set(self.spans)
+        return self.spans
+
+    def __exit__(self, exc_type, exc, tb):
+        _collector.reset(self._token)
+        return False
+
+
+def span_rows(spans: List[Span]) -> List[dict]:
+    """Flattens spans into start-ordered rows with the name indented by depth, for display."""
+    depth: Dict[str, int] = {}
+    by_id = {span.span_id: span for span in spans}
+    rows = []
+    for span in sorted(spans, key=lambda span: span.start_time):
+        parent = by_id.get(span.parent_id)
+        depth[span.span_id] = depth.get(parent.span_id, -1) + 1 if parent is not None else 0
+        rows.append({
+            "span": "  " * depth[span.span_id] + span.name,
+            "ms": round((span.duration or 0.0) * 1000, 1),
+            **{key: round(value, 4) if isinstance(value, float) else value
+               for key, value in span.attributes.items() if value is not None},
+            **({"error": span.error} if span.error else {}),
+        })
+    return rows
+
+
+def _escape_label(value) -> str:
+    """A label value for the Prometheus text format: backslash, double quote and newline escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusExporter:
+    """
+    Aggregates finished spans into Prometheus metrics:
+
+    - `chatbot_span_duration_seconds{span=...}` histogram (errors included, and
+      counted again in `chatbot_span_errors_total`)
+    - `chatbot_llm_queue_wait_seconds` and `chatbot_llm_ttft_seconds` histograms
+    - `chatbot_llm_tokens_total{model=..., kind="prompt"|"completion"}` counter
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[tuple, list] = {}
+        self._counters: Dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _observe(self, metric: str, labels: tuple, value: float):
+        key = (metric, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            # Bucket counts, then sum and count.
+            histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[i] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def on_end(self, span: Span):
+        attributes = span.attributes
+        with self._lock:
+            self._observe("chatbot_span_duration_seconds", (("span", span.name),), span.duration)
+            if span.error is not None:
+                self._counters[("chatbot_span_errors_total", (("span", span.name),))] += 1
+            if span.name != "llm.call":
+                return
+            model = str(attributes.get("model"))
+            if attributes.get("queue_wait_s") is not None:
+                self._observe("chatbot_llm_queue_wait_seconds", (("model", model),), attributes["queue_wait_s"])
+            if attributes.get("ttft_s") is not None:
+                self._observe("chatbot_llm_ttft_seconds", (("model", model),), attributes["ttft_s"])
+            for kind in ("prompt", "completion"):
+                tokens = attributes.get(f"{kind}_tokens")
+                if tokens:
+                    self._counters[("chatbot_llm_tokens_total", (("model", model), ("kind", kind)))] += tokens
+
+    @staticmethod
+    def _labels(labels: tuple, extra: tuple = ()) -> str:
+        pairs = [f'{name}="{_escape_label(value)}"' for name, value in labels + extra]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines, typed = [], set()
+        with self._lock:
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+            counters = dict(self._counters)
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{metric}_bucket{self._labels(labels, (('le', bound),))} {count}")
+            lines.append(f"{metric}_bucket{self._labels(labels, (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {values[-2]}")
+            lines.append(f"{metric}_count{self._labels(labels)} {values[-1]}")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = DEFAULT_METRICS_PORT, host: str = "0.0.0.0") -> "PrometheusExporter":
+        """Serves `render()` at http://host:port/metrics on a daemon thread."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class OTelExporter:
+    """
+    Mirrors spans into OpenTelemetry (requires `opentelemetry-api`).
+
+    Uses the global tracer provider. If none is configured and
+    `opentelemetry-sdk` is installed, one is set up with an OTLP exporter
+    (configured by the standard OTEL_EXPORTER_OTLP_* variables) when
+    `opentelemetry-exporter-otlp` is installed, else a console exporter.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        if tracer is None:
+            if type(trace.get_tracer_provider()).__name__ == "ProxyTracerProvider":
+                self._install_sdk_provider()
+            tracer = trace.get_tracer("chatbot")
+        self.tracer = tracer
+
+    def _install_sdk_provider(self):
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        except ImportError:
+            return
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter()
+        except ImportError:
+            exporter = ConsoleSpanExporter()
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "chatbot")}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        self._trace.set_tracer_provider(provider)
+
+    def on_start(self, span: Span):
+        parent = span.parent.exported.get("otel") if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        span.exported["otel"] = self.tracer.start_span(span.name, context=context,
+                                                      start_time=int(span.start_time * 1e9))
+
+    def on_end(self, span: Span):
+        otel_span = span.exported.get("otel")
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        if span.error is not None:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+
+def configure(enabled: bool = True, exporters: Optional[List[Any]] = None):
+    """
+    Turns recording on or off for the whole process and sets the exporters
+    (objects with `on_end(span)` and optionally `on_start(span)`).
+    """
+    global _enabled
+    _exporters[:] = list(exporters or [])
+    _enabled = enabled
+
+
+def configure_from_env() -> List[Any]:
+    """
+    Configures the layer from the environment; returns the exporters.
+
+    CHATBOT_TELEMETRY=1 enables it; CHATBOT_METRICS_PORT serves Prometheus
+    metrics on that port; CHATBOT_OTEL=1 adds the OpenTelemetry exporter.
+    """
+    if os.getenv("CHATBOT_TELEMETRY", "").lower() not in ("1", "true", "yes"):
+        return []
+    exporters = []
+    if os.getenv("CHATBOT_METRICS_PORT"):
+        exporters.append(PrometheusExporter().serve(int(os.environ["CHATBOT_METRICS_PORT"])))
+    if os.getenv("CHATBOT_OTEL", "").lower() in ("1", "true", "yes"):
+        exporters.append(OTelExporter())
+    configure(True, exporters)
+    return exporters
@@ -0,0 +1,168 @@
+"""
+Cold-start warm-up for the chat entry points.
+
+The first turn of a fresh process pays for work that has nothing to do with
+the question: importing LiteLLM (the OpenAI SDK and its pydantic types, 2-3 s),
+building the client and compiling the graph, loading the tiktoken encoding,
+and a TCP/TLS handshake with the provider. `Warmup` does all of it on a
+background thread while the UI renders or the user types:
+
+    warmup = Warmup(lambda: create_chatbot(), model=MODEL_NAME).start()
+    ...
+    app = warmup.result()  # waits only for whatever is left
+
+The steps are timed in `warmup.timings` (seconds per step). A failing build is
+re-raised by `result()`; tokenizer and connection failures are ignored, since
+the first request retries them anyway.
+
+Set CHATBOT_WARMUP=0 to skip the background work (`result()` then builds
+inline, as before).
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_OPENAI_API_BASE = "https://api.openai.com/v1"
+CONNECT_TIMEOUT = 5.0
+
+
+def warmup_enabled() -> bool:
+    """False if CHATBOT_WARMUP is set to 0/false/no."""
+    return os.getenv("CHATBOT_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+def endpoints(model: str) -> List[str]:
+    """
+    Returns the base URLs that requests for `model` go to: every route's for
+    "auto", OPENAI_API_BASE (or api.openai.com) for OpenAI models, and none
+    for providers whose endpoint LiteLLM picks itself.
+    """
+    from llm_router import AUTO_MODEL, get_router
+
+    if model == AUTO_MODEL:
+        return [route.api_base or _default_base(route.model) for route in get_router().routes
+                if route.api_base or _default_base(route.model)]
+    base = _default_base(model)
+    return [base] if base else []
+
+
+def _default_base(model: str) -> Optional[str]:
+    from llm_control import provider_for
+
+    if provider_for(model) != "openai":
+        return None
+    return os.getenv("OPENAI_API_BASE") or DEFAULT_OPENAI_API_BASE
+
+
+def preconnect(url: str, timeout: float = CONNECT_TIMEOUT) -> bool:
+    """
+    Opens a keep-alive connection to `url`'s host in LiteLLM's shared HTTP pool,
+    so the first completion skips the DNS lookup and TCP/TLS handshake.
+
+    Any HTTP status counts as success; only the connection matters. Returns
+    False if the host can't be reached.
+    """
+    import httpx
+    import litellm
+    from llm_registry import configure_http_pool
+
+    configure_http_pool()
+    try:
+        litellm.client_session.head(url, timeout=timeout)
+    except httpx.HTTPError:
+        return False
+    return True
+
+
+def _import_stack():
+    # LiteLLM and LangChain's model classes dominate the import time.
+    import llm_registry  # noqa: F401
+    import llm_router  # noqa: F401
+
+
+class Warmup:
+    """
+    Runs an entry point's startup work once, on a background thread.
+
+    Args:
+        build (callable): Builds what the first request needs, e.g. the
+            compiled graph; its return value is what `result()` returns.
+        model (str, optional): Model name whose endpoints are pre-connected.
+        connect (bool): Whether to pre-open provider connections.
+    """
+
+    def __init__(self, build: Callable[[], Any], model: Optional[str] = None, connect: bool = True):
+        self._build = build
+        self._model = model
+        self._connect = connect
+        self._value = None
+        self._error: Optional[Exception] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.timings: Dict[str, float] = {}
+
+    def start(self) -> "Warmup":
+        """Starts the warm-up if it hasn't started yet; returns immediately."""
+        if not warmup_enabled():
+            return self
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chatbot-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _step(self, name: str, fn: Callable[[], Any]):
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def _run(self):
+        try:
+            self._step("import", _import_stack)
+            self._value = self._step("build", self._build)
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            # The graph is usable from here on; the rest only shaves the first request.
+            self._done.set()
+        try:
+            from history import token_counter
+
+            self._step("tokenizer", lambda: token_counter.count_text("warm up"))
+            if self._connect and self._model:
+                self._step("connect", lambda: [preconnect(url) for url in endpoints(self._model)])
+        except Exception:
+            pass
+
+    @property
+    def status(self) -> str:
+        """One of "not started", "warming", "ready" or "failed"."""
+        if self._thread is None and not self._done.is_set():
+            return "not started"
+        if not self._done.is_set():
+            return "warming"
+        return "failed" if self._error is not None else "ready"
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Returns what `build` returned, waiting up to `timeout` seconds for the
+        warm-up. Builds inline if the warm-up was never started (CHATBOT_WARMUP=0).
+
+        Raises:
+            TimeoutError: The warm-up didn't finish within `timeout`.
+            Exception: Whatever `build` raised.
+        """
+        with self._lock:
+            if self._thread is None and not self._done.is_set():
+                self._value = self._step("build", self._build)
+                self._done.set()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"warm-up still running after {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._value
@@ -1,86 +1,222 @@
 import streamlit as st
+import contextlib
 import os
+import sys
 from dotenv import load_dotenv  # Used for loading environment variables
-from langchain_litellm import ChatLiteLLM
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langgraph.graph import StateGraph, END, START
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.message import MessagesState
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, AIMessageChunk, message_chunk_to_message
+import time
 import uuid
 
+# Shared helpers live next to the CLI examples in `simple_chatbot/`.
+# Only the light ones are imported here; the LLM stack (LiteLLM, LangGraph, the
+# blog index) is imported by `create_chatbot_app` on the warm-up thread, so the
+# first page renders without waiting seconds for it.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "simple_chatbot"))
+from chat_streaming import StreamStats, stream_reply
+import telemetry
+from warmup import Warmup
+
 # Load environment variables from .env file at the very beginning
 load_dotenv()
 
+
+@st.cache_resource
+def setup_telemetry():
+    """Starts the span exporters configured by CHATBOT_TELEMETRY once per server process."""
+    return telemetry.configure_from_env()
+
+
+setup_telemetry()
+
 # --- Configuration Constants ---
-MODEL_NAME = "gpt-3.5-turbo"  # Default LLM model name
+MODEL_NAME = os.getenv("CHATBOT_MODEL", "gpt-3.5-turbo")  # Default LLM model name; "auto" routes across providers
 SYSTEM_PROMPT = """You are Melanie's AI assistant. Keep your responses concise and friendly. Introduce yourself and ask for the user's name."""
+STREAM_RESPONSES = True  # Render tokens as they arrive instead of waiting for the full reply
+MAX_HISTORY_TOKENS = 3000  # Token budget for conversation history sent to the model
+SUMMARIZE_HISTORY = True  # Fold older turns into a running summary instead of dropping them
+CACHE_SAMPLED_RESPONSES = os.getenv("CHATBOT_CACHE_SAMPLED", "").lower() in ("1", "true", "yes")  # Also serve cached answers at temperature > 0 (opt-in)
+RAG_MODE = True  # Ground replies in the LlamaIndex blog index (loaded in the background)
+RAG_TOP_K = 3  # Blog chunks added to the prompt per turn
+HISTORY_PAGE_SIZE = 20  # Messages drawn per rerun; older ones are behind "Show earlier messages"
+GREETING = "Hello! I'm Melanie's AI assistant. What's your name?"
 
 # --- LangChain/LangGraph Setup ---
 
-# Define the chat prompt template, including a system prompt and a placeholder for messages.
-# This allows the model to maintain context of the conversation.
-prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="messages"),
-    ]
-)
-
 
-def create_chatbot_app(model: str = MODEL_NAME):
+def create_chatbot_app(model: str = MODEL_NAME, streaming: bool = STREAM_RESPONSES, rag: bool = RAG_MODE):
     """
     Creates and compiles a LangGraph chatbot application.
 
     Args:
         model (str): The name of the language model to use (e.g., "gpt-3.5-turbo").
+        streaming (bool): If True, the model node streams tokens from the LLM so
+                          they can be consumed with `stream_mode="messages"`.
+        rag (bool): If True, a 'retrieve' node adds the top blog chunks for the
+                    user's message to the prompt.
 
     Returns:
         StateGraph: A compiled LangGraph application with memory.
     """
-    # Initialize the Language Model (LLM) using ChatLiteLLM.
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langgraph.graph import StateGraph, END, START
+
+    from blog_retrieval import RAGChatState, context_message, get_blog_retriever, make_retrieve_node, source_refs
+    from checkpointing import create_checkpointer
+    from history import HistoryManager
+    from llm_router import get_chat_model
+    from response_cache import get_response_cache
+
+    # Define the chat prompt template, including a system prompt and a placeholder for messages.
+    # This allows the model to maintain context of the conversation.
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", SYSTEM_PROMPT),
+            MessagesPlaceholder(variable_name="messages"),
+        ]
+    )
+
+    # Get the shared Language Model (LLM) client, a ChatLiteLLM reused across calls.
     # temperature=0.7 makes the responses slightly more creative/less deterministic.
-    llm = ChatLiteLLM(model=model, temperature=0.7)
+    llm = get_chat_model(model=model, temperature=0.7)
 
-    # Initialize a StateGraph with MessagesState, which handles conversation history.
-    workflow = StateGraph(state_schema=MessagesState)
+    # Keep the prompt within a token budget, summarizing older turns if enabled.
+    history = HistoryManager(
+        llm=llm if SUMMARIZE_HISTORY else None, max_tokens=MAX_HISTORY_TOKENS
+    )
+
+    # Shared exact/semantic cache for repeated questions.
+    response_cache = get_response_cache()
+
+    # The blog index is shared by the whole process and loads in the background,
+    # so building the app (and the first page render) doesn't wait for it.
+    blog_retriever = get_blog_retriever() if rag else None
+
+    # Initialize a StateGraph with RAGChatState, which handles conversation history,
+    # the running summary of older turns, the retrieved context and per-turn timings.
+    workflow = StateGraph(state_schema=RAGChatState)
 
     # Define the function that calls the LLM.
-    def call_model(state: MessagesState):
+    def call_model(state: RAGChatState):
         """
         Invokes the language model with the current conversation state.
 
         Args:
-            state (MessagesState): The current state of the conversation,
-                                   containing a list of messages.
+            state (RAGChatState): The current state of the conversation,
+                                  containing a list of messages, a summary and
+                                  the blog context retrieved for this turn.
 
         Returns:
             dict: A dictionary containing the updated messages state with the AI's response.
         """
-        # Format the messages from the state using the defined prompt template.
-        formatted_prompt = prompt.format_messages(messages=state["messages"])
+        started = time.perf_counter()
+        # Format the budgeted history (summary + recent messages) with the prompt template.
+        conversation = prompt.format_messages(messages=history.context(state))
+        # Add this turn's blog excerpts right after the system prompt.
+        context = context_message(state.get("context"))
+        formatted_prompt = conversation if context is None else [conversation[0], context, *conversation[1:]]
+
+        def update(message):
+            # Add the reply, and the generation time next to the retrieval time.
+            timings = {**(state.get("timings") or {}), "generation_ms": (time.perf_counter() - started) * 1000}
+            # Keep what the UI shows under the reply on the message itself, so the
+            # checkpointed transcript is all it needs to draw the conversation.
+            message.response_metadata.update(timings=timings, sources=source_refs(state.get("context")))
+            return {"messages": message, "timings": timings}
+
+        # Answer from the response cache if this prompt (or a near-duplicate) was seen before.
+        # The excerpts are passed apart from the conversation, so a near-duplicate question
+        # can match even when retrieval returned slightly different chunks for it.
+        cached = response_cache.lookup(
+            conversation, model, llm.temperature, llm.max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES, context=context,
+        )
+        if cached is not None:
+            return update(AIMessage(content=cached.content))
 
-        # Invoke the LLM with the formatted prompt to get a response.
-        response = llm.invoke(formatted_prompt)
+        if not streaming:
+            # Invoke the LLM with the formatted prompt to get a response.
+            response = llm.invoke(formatted_prompt)
+        else:
+            # Stream from the LLM so LangGraph can forward tokens as they arrive.
+            # The chunks are merged into one message so the full reply is checkpointed.
+            response = AIMessageChunk(content="")
+            for chunk in llm.stream(formatted_prompt):
+                response += chunk
+            response = message_chunk_to_message(response)
+
+        response_cache.store(
+            conversation, model, llm.temperature, response.content, llm.max_tokens,
+            allow_sampled=CACHE_SAMPLED_RESPONSES, usage=response.usage_metadata, context=context,
+        )
 
         # Return the new state, adding the AI's response to the messages list.
-        return {"messages": response}
+        return update(response)
 
-    # Add the 'model' node to the workflow, which executes the call_model function.
-    workflow.add_node("model", call_model)
+    # Add the 'history' node, which folds old turns into the summary when over budget,
+    # and the 'model' node, which executes the call_model function.
+    workflow.add_node("history", telemetry.traced("node.history", history.summarize))
+    workflow.add_node("model", telemetry.traced("node.model", call_model))
 
     # Define the flow of the graph:
-    # START -> 'model' node -> END
-    workflow.add_edge(START, "model")
+    # START -> 'history' node -> ('retrieve' node ->) 'model' node -> END
+    workflow.add_edge(START, "history")
+    if rag:
+        retrieve = make_retrieve_node(blog_retriever, k=RAG_TOP_K)
+        workflow.add_node("retrieve", telemetry.traced("node.retrieve", retrieve))
+        workflow.add_edge("history", "retrieve")
+        workflow.add_edge("retrieve", "model")
+    else:
+        workflow.add_edge("history", "model")
     workflow.add_edge("model", END)
 
-    # Compile the workflow with a MemorySaver checkpointer.
-    # This allows the conversation history to be managed internally by LangGraph.
-    memory = MemorySaver()
+    # Compile the workflow with a bounded checkpointer.
+    # This allows the conversation history to be managed internally by LangGraph,
+    # while idle threads are evicted (and persisted if CHATBOT_CHECKPOINT_DB is set;
+    # otherwise the page warns when a conversation lost its history, see `transcript_view`).
+    memory = create_checkpointer()
     app = workflow.compile(checkpointer=memory)
     return app
 
 
+@st.cache_resource
+def start_warmup(model: str = MODEL_NAME) -> Warmup:
+    """
+    Starts building the chatbot application on a background thread, once per
+    server process: imports, LLM client, compiled graph, tokenizer and a
+    pre-opened connection to the provider (see `warmup.py`).
+
+    Args:
+        model (str): The name of the language model to use.
+
+    Returns:
+        Warmup: The process-wide warm-up, shared by every browser session.
+    """
+    return Warmup(lambda: create_chatbot_app(model), model=model).start()
+
+
+def get_chatbot_app(model: str = MODEL_NAME):
+    """
+    Returns the chatbot application shared by every browser session.
+
+    The compiled graph is built once per server process by `start_warmup`,
+    instead of per session; this waits for the warm-up if it is still running.
+    A failed warm-up is dropped from the cache after raising its error.
+    Conversations stay separate because each session uses its own thread_id.
+
+    Args:
+        model (str): The name of the language model to use.
+
+    Returns:
+        StateGraph: The shared compiled LangGraph application.
+    """
+    try:
+        return start_warmup(model).result()
+    except Exception:
+        # Don't keep a failed warm-up for the life of the process; the next session builds again.
+        start_warmup.clear()
+        raise
+
+
 # --- Streamlit Application Logic ---
 
 # Set the title of the Streamlit app
@@ -92,12 +228,8 @@ st.title("Melanie's AI Assistant")
 # Streamlit reruns the script from top to bottom on every interaction,
 # so session_state is crucial for preserving data.
 
-if "messages" not in st.session_state:
-    # 'messages' will store the entire conversation history for display.
-    st.session_state.messages = []
-
 if "chatbot_app" not in st.session_state:
-    # 'chatbot_app' will hold the LangGraph application instance.
+    # 'chatbot_app' will hold a reference to the shared LangGraph application.
     st.session_state.chatbot_app = None
 
 if "thread_id" not in st.session_state:
@@ -108,6 +240,26 @@ if "api_key_set" not in st.session_state:
     # 'api_key_set' tracks whether the OpenAI API key has been found.
     st.session_state.api_key_set = False
 
+if "history_limit" not in st.session_state:
+    # 'history_limit' is how many of the latest messages are drawn; "Show earlier messages" raises it.
+    # The messages themselves are only kept by the checkpointer (see `transcript_view`).
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+
+if "history_version" not in st.session_state:
+    # 'history_version' counts this session's turns, so the drawn window is re-read only after one.
+    st.session_state.history_version = 0
+
+if "history_view" not in st.session_state:
+    # 'history_view' caches the window of the transcript drawn on each rerun.
+    st.session_state.history_view = None
+
+if "debug_spans" not in st.session_state:
+    # 'debug_spans' holds the spans of this session's last turn for the debug panel.
+    st.session_state.debug_spans = []
+
+# Per-session switch for the debug panel; other sessions are not traced by it.
+st.sidebar.toggle("Debug panel", key="debug_panel", help="Show timings and tokens of each turn")
+
 # --- API Key Check ---
 # Check if the OPENAI_API_KEY environment variable is set.
 # This is crucial for the LiteLLM model to function.
@@ -118,16 +270,11 @@ if not os.getenv("OPENAI_API_KEY"):
     st.session_state.api_key_set = False
 else:
     st.session_state.api_key_set = True
-    # If the API key is set and the chatbot hasn't been initialized yet, do so.
-    if st.session_state.chatbot_app is None:
-        st.session_state.chatbot_app = create_chatbot_app()
-        # Add an initial greeting from the AI assistant
-        initial_ai_message = AIMessage(
-            content="Hello! I'm Melanie's AI assistant. What's your name?"
-        )
-        st.session_state.messages.append(
-            {"role": "assistant", "content": initial_ai_message.content}
-        )
+    # Start building the shared chatbot in the background (a no-op after the first
+    # session) so the page renders right away; the first message waits for it if needed.
+    warmup = start_warmup()
+    if st.session_state.chatbot_app is None and warmup.status == "ready":
+        st.session_state.chatbot_app = get_chatbot_app()
 
 
 # --- Helper Functions for UI Actions ---
@@ -138,29 +285,30 @@ def clear_conversation():
     Clears the conversation history and resets the chatbot,
     effectively starting a new conversation thread.
     """
-    st.session_state.messages = []
+    # Free the old thread's checkpoints so they don't linger in the checkpointer.
+    if st.session_state.chatbot_app is not None:
+        st.session_state.chatbot_app.checkpointer.delete_thread(st.session_state.thread_id)
     st.session_state.thread_id = str(
         uuid.uuid4()
     )  # Generate a new thread ID for the new conversation
-    # Re-initialize the chatbot app to ensure clean state with the new thread ID if needed.
-    # However, LangGraph's checkpointer uses the thread_id config, so re-initializing app itself is not strictly necessary for clearing memory within LangGraph.
-    # It's good practice to ensure consistency or if stateful nodes were outside checkpointer.
-    st.session_state.chatbot_app = create_chatbot_app()
-    st.session_state.messages.append(
-        {
-            "role": "assistant",
-            "content": "Hello! I'm Melanie's AI assistant. What's your name?",
-        }
-    )
+    # LangGraph's checkpointer is keyed by thread_id, so the existing app can be reused.
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+    st.session_state.history_view = None
     st.success("Conversation history cleared!")
 
 
+def show_earlier_messages():
+    """Draws another page of older messages above the current ones."""
+    st.session_state.history_limit += HISTORY_PAGE_SIZE
+
+
 def display_help_info():
     """Displays help information in an expander."""
     with st.expander("Commands Help"):
         st.markdown(
             """
             * **Just type your message!** The assistant will respond.
+            * **Sources:** Replies that use the LlamaIndex blog list the posts below the answer.
             * **Clear Chat:** Click the 'Clear Conversation' button below.
             * **Model Info:** Click the 'Show Current Model' button below.
             """
@@ -172,11 +320,149 @@ def display_model_info():
     st.info(f"Current model in use: **{MODEL_NAME}**")
 
 
+def debug_collector():
+    """Collects the spans of this turn for the debug panel, if it is on."""
+    if not st.session_state.debug_panel:
+        return contextlib.nullcontext()
+    collector = telemetry.collect()
+    st.session_state.debug_spans = collector.spans
+    return collector
+
+
+def display_debug_panel():
+    """Shows the last turn's spans (nodes, LLM calls, checkpoints, retrieval) in the sidebar."""
+    spans = st.session_state.debug_spans
+    with st.sidebar:
+        warmup = start_warmup()
+        if warmup.timings:
+            st.caption(f"Warm-up ({warmup.status}): "
+                       + " · ".join(f"{step} {seconds:.2f}s" for step, seconds in warmup.timings.items()))
+        st.subheader("Last turn")
+        if not spans:
+            st.caption("Send a message to see its timings.")
+            return
+        for span in spans:
+            if span.name == "llm.call":
+                attributes = span.attributes
+                st.caption(
+                    f"{attributes.get('model')}: queue {attributes.get('queue_wait_s') or 0:.2f}s · "
+                    f"TTFT {attributes.get('ttft_s') or 0:.2f}s · total {span.duration:.2f}s · "
+                    f"{attributes.get('prompt_tokens')} + {attributes.get('completion_tokens')} tokens"
+                )
+        st.dataframe(telemetry.span_rows(spans), hide_index=True)
+
+
+def display_sources(sources, error=None):
+    """
+    Lists the blog chunks a reply was grounded in (see `blog_retrieval.source_refs`),
+    in an expander, or why there are none when retrieval failed.
+    """
+    if error:
+        st.caption(f"Blog sources unavailable: {error}")
+    if not sources:
+        return
+    with st.expander(f"Sources ({len(sources)})"):
+        for source in sources:
+            label = f"[{source['label']}]({source['url']})" if source.get("url") else source["label"]
+            st.markdown(f"- {label} · score {source['score']:.3f}")
+
+
+def chat_entry(message):
+    """What the chat shows for a checkpointed message: role, text, and a reply's timings and sources."""
+    metadata = message.response_metadata if isinstance(message, AIMessage) else {}
+    return {
+        "role": "assistant" if isinstance(message, AIMessage) else "user",
+        "content": message.content,
+        "timings": metadata.get("timings") or {},
+        "sources": metadata.get("sources") or [],
+    }
+
+
+def transcript_view():
+    """
+    Returns the part of this session's conversation to draw: the latest
+    `history_limit` messages, and how many older ones are hidden.
+
+    The checkpointer holds the only copy of the transcript. Reading it back
+    deserializes the whole thread, so the window is cached in the session and
+    re-read only when a turn, "Clear Conversation" or "Show earlier messages"
+    changed it, not on every rerun.
+
+    A thread that comes back shorter than it was last drawn was dropped by the
+    checkpointer (idle threads expire unless CHATBOT_CHECKPOINT_DB is set);
+    the view is then marked "expired" so the page can say so.
+    """
+    key = (st.session_state.thread_id, st.session_state.history_version, st.session_state.history_limit)
+    view = st.session_state.history_view
+    if view is not None and view["key"] == key:
+        return view
+    messages = []
+    if st.session_state.chatbot_app is not None:
+        state = st.session_state.chatbot_app.get_state(
+            {"configurable": {"thread_id": st.session_state.thread_id}}
+        )
+        messages = [m for m in state.values.get("messages", []) if isinstance(m, (HumanMessage, AIMessage))]
+    limit = st.session_state.history_limit
+    # Messages are only ever appended to a thread, so a shorter one lost its history.
+    expired = (
+        view is not None
+        and view["key"][0] == st.session_state.thread_id
+        and len(messages) < view["hidden"] + len(view["entries"])
+    )
+    view = {
+        "key": key,
+        "hidden": max(0, len(messages) - limit),
+        "entries": [chat_entry(message) for message in messages[-limit:]],
+        "expired": expired,
+    }
+    st.session_state.history_view = view
+    return view
+
+
+def display_entry(entry):
+    """Draws one message of the conversation."""
+    with st.chat_message(entry["role"]):
+        st.markdown(entry["content"])
+        caption = timings_caption(entry.get("timings") or {})
+        if caption:
+            st.caption(caption)
+        display_sources(entry.get("sources"), (entry.get("timings") or {}).get("retrieval_error"))
+
+
+def display_history():
+    """Draws the latest messages, below a button for older ones or the greeting."""
+    view = transcript_view()
+    if view["expired"]:
+        st.warning(
+            "Earlier messages of this conversation expired from the server's memory. "
+            "Set `CHATBOT_CHECKPOINT_DB` to keep conversations on disk."
+        )
+    if view["hidden"]:
+        st.button(f"Show earlier messages ({view['hidden']} more)", key="show_earlier", on_click=show_earlier_messages)
+    elif st.session_state.api_key_set:
+        display_entry({"role": "assistant", "content": GREETING})
+    for entry in view["entries"]:
+        display_entry(entry)
+
+
+def timings_caption(timings, stats=None):
+    """Formats a turn's retrieval and generation timings (and streaming stats) for a caption."""
+    parts = []
+    if "retrieval_ms" in timings:
+        index_status = "" if timings.get("index") == "ready" else f" (blog index {timings.get('index')})"
+        parts.append(f"Retrieval: {timings['retrieval_ms']:.0f} ms{index_status}")
+    if stats is not None:
+        parts.append(stats.summary())
+    elif "generation_ms" in timings:
+        parts.append(f"Generation: {timings['generation_ms'] / 1000:.2f}s")
+    return " · ".join(parts)
+
+
 # --- Display Chat Messages ---
-# Iterate through the messages stored in session_state and display them.
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Draw the latest messages of this session's thread, read from the checkpointer.
+# Only a window of `HISTORY_PAGE_SIZE` messages is drawn per rerun, so a long
+# conversation doesn't slow down every click.
+display_history()
 
 # --- User Input and Chat Logic ---
 
@@ -186,34 +472,58 @@ for message in st.session_state.messages:
 user_input = st.chat_input("Type your message here...", key="chat_input")
 
 if user_input and st.session_state.api_key_set:
-    # Add user message to session state for display
-    st.session_state.messages.append({"role": "user", "content": user_input})
     # Display the user message immediately
     with st.chat_message("user"):
         st.markdown(user_input)
+    # The turn adds to the checkpointed transcript (even if it fails half-way),
+    # so the drawn window has to be re-read.
+    st.session_state.history_version += 1
 
     try:
+        if st.session_state.chatbot_app is None:
+            # Only a message sent right after the server started can get here.
+            with st.spinner("Starting up..."):
+                st.session_state.chatbot_app = get_chatbot_app()
+
         # Create an input message for the LangGraph chatbot
         input_messages = [HumanMessage(content=user_input)]
 
-        # Invoke the chatbot with the user's message and the current thread ID.
-        # The thread_id ensures conversation memory is maintained.
-        result = st.session_state.chatbot_app.invoke(
-            {"messages": input_messages},
-            config={"configurable": {"thread_id": st.session_state.thread_id}},
-        )
-
-        # Extract the AI's response from the result
-        if result and "messages" in result and result["messages"]:
-            ai_response_content = result["messages"][-1].content
-            # Add AI response to session state for display
-            st.session_state.messages.append(
-                {"role": "assistant", "content": ai_response_content}
-            )
-            # Display the AI response
+        if STREAM_RESPONSES:
+            # Stream the reply into the chat bubble as tokens arrive.
+            # The graph still checkpoints the complete message at the end of the turn.
+            stats = StreamStats()
             with st.chat_message("assistant"):
-                st.markdown(ai_response_content)
+                with debug_collector():
+                    ai_response_content = st.write_stream(
+                        stream_reply(
+                            st.session_state.chatbot_app,
+                            input_messages,
+                            st.session_state.thread_id,
+                            stats,
+                        )
+                    )
+                # The reply was just checkpointed; reading it back also refreshes the window.
+                reply = transcript_view()["entries"][-1]
+                st.caption(timings_caption(reply["timings"], stats))
+                display_sources(reply["sources"], reply["timings"].get("retrieval_error"))
         else:
+            # Invoke the chatbot with the user's message and the current thread ID.
+            # The thread_id ensures conversation memory is maintained.
+            with debug_collector(), telemetry.span("chat.turn", thread_id=st.session_state.thread_id):
+                result = st.session_state.chatbot_app.invoke(
+                    {"messages": input_messages},
+                    config={"configurable": {"thread_id": st.session_state.thread_id}},
+                )
+
+            # Extract the AI's response from the result
+            ai_response_content = None
+            if result and "messages" in result and result["messages"]:
+                reply = chat_entry(result["messages"][-1])
+                ai_response_content = reply["content"]
+                # Display the AI response
+                display_entry(reply)
+
+        if not ai_response_content:
             st.error("No response received from the AI assistant. Please try again.")
 
     except Exception as e:
@@ -237,5 +547,13 @@ with col3:
     st.button("Help", on_click=display_help_info)
 
 
+if st.session_state.debug_panel:
+    display_debug_panel()
+
 # Display current thread ID for debugging/information
 st.caption(f"Current Chat Session ID: `{st.session_state.thread_id}`")
+if RAG_MODE and st.session_state.chatbot_app is not None:
+    from blog_retrieval import get_blog_retriever
+
+    blog_retriever = get_blog_retriever()
+    st.caption(f"Blog index: {blog_retriever.status}" + (f" ({blog_retriever.error})" if blog_retriever.error else ""))
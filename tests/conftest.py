@@ -0,0 +1,14 @@
+"""
+Test setup: both projects keep their modules flat (imported as `checkpointing`,
+`chunker`, ...), as their scripts do when run from their own directory.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "simple_chatbot"))
+sys.path.insert(0, os.path.join(ROOT, "llama-index-blog-chatbot-main", "src"))
+
+# Don't pick up persistent checkpoints, caches or exporters from the developer's environment.
+for name in [name for name in os.environ if name.startswith("CHATBOT_")]:
+    del os.environ[name]
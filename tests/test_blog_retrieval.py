@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from langchain_core.messages import HumanMessage
+
+import telemetry
+from blog_retrieval import BackgroundRetriever, make_retrieve_node, source_refs
+
+
+class FakePipeline:
+    def __init__(self, error=None):
+        self.error = error
+
+    def retrieve_batch(self, questions, k):
+        if self.error:
+            raise self.error
+        chunk = SimpleNamespace(text="Title: Agents\n\nAgents call tools.", score=0.5,
+                                metadata={"title": "Agents", "section": "Tools", "url": "https://example.com/agents"})
+        return [[chunk] * k for _ in questions]
+
+
+def _run(retriever):
+    retriever.wait(timeout=5)
+    state = {"messages": [HumanMessage(content="What are agents?")]}
+    with telemetry.collect() as spans, telemetry.span("node.retrieve"):
+        result = make_retrieve_node(retriever, k=2)(state)
+    return result, spans[0].attributes
+
+
+def test_retrieve_returns_context_and_timings():
+    result, attributes = _run(BackgroundRetriever(FakePipeline))
+    assert len(result["context"]) == 2 and result["timings"]["index"] == "ready"
+    assert "retrieval_error" not in result["timings"] and "error" not in attributes
+    assert attributes["chunks"] == 2
+    assert source_refs(result["context"])[0] == {
+        "label": "Agents — Tools", "url": "https://example.com/agents", "score": 0.5}
+
+
+def test_retrieval_errors_are_recorded_for_the_ui():
+    result, attributes = _run(BackgroundRetriever(lambda: FakePipeline(error=TimeoutError("embedding timed out"))))
+    assert result["context"] == []
+    assert result["timings"]["retrieval_error"] == attributes["error"] == "TimeoutError: embedding timed out"
+
+
+def test_a_failed_index_load_is_recorded_for_the_ui():
+    def missing_index():
+        raise FileNotFoundError("vector_store/manifest.json")
+
+    result, attributes = _run(BackgroundRetriever(missing_index))
+    assert result["context"] == [] and result["timings"]["index"] == attributes["index"] == "failed"
+    assert result["timings"]["retrieval_error"] == attributes["error"] == "FileNotFoundError: vector_store/manifest.json"
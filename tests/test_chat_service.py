@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from async_chatbot import create_async_chatbot
+from chat_service import create_chat_service
+from fake_llm import FakeChatModel
+
+REPLY = " ".join(f"word{i}" for i in range(20))
+
+
+class TokenCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.tokens = 0
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.tokens += 1
+
+
+def _service(token_delay=0.0, callbacks=None):
+    llm = FakeChatModel(reply=REPLY, token_delay=token_delay, callbacks=callbacks)
+    return create_chat_service(create_async_chatbot(llm=llm))
+
+
+async def _post(service, thread_id, content, disconnect_after=None):
+    """Calls the service like an ASGI server; `send` fails like a closed connection after N body messages."""
+    body = json.dumps({"content": content}).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if disconnect_after is not None and message["type"] == "http.response.body" \
+                and sum(m["type"] == "http.response.body" for m in sent) >= disconnect_after:
+            raise ConnectionResetError("client went away")
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": f"/threads/{thread_id}/messages"}
+    await service(scope, receive, send)
+    return sent
+
+
+def _events(sent):
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body").decode()
+    return [block.split("\n", 1)[0].removeprefix("event: ") for block in body.split("\n\n") if block]
+
+
+def test_streams_tokens_then_done():
+    sent = asyncio.run(_post(_service(), str(uuid.uuid4()), f"hello {uuid.uuid4()}"))
+    assert sent[0]["status"] == 200
+    events = _events(sent)
+    assert events[-1] == "done"
+    assert events.count("token") == len(REPLY.split())
+
+
+def test_disconnect_stops_generation():
+    counter = TokenCounter()
+    service = _service(token_delay=0.02, callbacks=[counter])
+
+    async def run():
+        started = time.perf_counter()
+        sent = await _post(service, str(uuid.uuid4()), f"hello {uuid.uuid4()}", disconnect_after=2)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.2)  # a generation left running would keep emitting tokens
+        return sent, elapsed
+
+    sent, elapsed = asyncio.run(run())
+    assert _events(sent) == ["token", "token"]
+    assert elapsed < 0.02 * len(REPLY.split())
+    assert counter.tokens < len(REPLY.split())
+
+
+def test_concurrent_turn_on_same_thread_gets_409():
+    service = _service(token_delay=0.01)
+    thread_id = str(uuid.uuid4())
+
+    async def run():
+        first = asyncio.create_task(_post(service, thread_id, f"first {uuid.uuid4()}"))
+        await asyncio.sleep(0.05)
+        second = await _post(service, thread_id, f"second {uuid.uuid4()}")
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert _events(first)[-1] == "done"
+    assert second[0]["status"] == 409
+    # The thread is free again once the reply finished.
+    again = asyncio.run(_post(service, thread_id, f"third {uuid.uuid4()}"))
+    assert again[0]["status"] == 200
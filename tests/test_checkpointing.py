@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from async_chatbot import create_async_chatbot
+from checkpointing import BoundedMemorySaver, SQLiteSaver, create_checkpointer
+from fake_llm import FakeChatModel
+
+
+class RecordingSQLiteSaver(SQLiteSaver):
+    """Remembers which threads called the blocking methods."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.callers = set()
+
+    def list(self, *args, **kwargs):
+        self.callers.add(threading.get_ident())
+        return super().list(*args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        self.callers.add(threading.get_ident())
+        return super().put(*args, **kwargs)
+
+    def put_writes(self, *args, **kwargs):
+        self.callers.add(threading.get_ident())
+        return super().put_writes(*args, **kwargs)
+
+
+def _turn(app, thread_id, content):
+    config = {"configurable": {"thread_id": thread_id}}
+    return app.ainvoke({"messages": [HumanMessage(content=content)]}, config=config)
+
+
+def test_backing_store_io_stays_off_the_event_loop(tmp_path):
+    backing = RecordingSQLiteSaver(str(tmp_path / "chat.db"))
+    saver = BoundedMemorySaver(backing=backing, max_threads=1)
+    app = create_async_chatbot(llm=FakeChatModel())
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+
+    async def run():
+        await _turn(app, first, f"one {uuid.uuid4()}")
+        await _turn(app, second, f"two {uuid.uuid4()}")  # evicts `first`
+        await _turn(app, first, f"three {uuid.uuid4()}")  # reloads it from SQLite
+        return threading.get_ident()
+
+    app.checkpointer = saver
+    loop_thread = asyncio.run(run())
+    assert backing.callers and loop_thread not in backing.callers
+    assert saver.stats()["hydrations"] >= 1
+    state = asyncio.run(app.aget_state({"configurable": {"thread_id": first}}))
+    assert [m.type for m in state.values["messages"]] == ["human", "ai", "human", "ai"]
+
+
+def test_memory_only_async_round_trip():
+    saver = create_checkpointer(db_path="")
+    app = create_async_chatbot(llm=FakeChatModel())
+    app.checkpointer = saver
+    thread_id = str(uuid.uuid4())
+    asyncio.run(_turn(app, thread_id, f"hello {uuid.uuid4()}"))
+    checkpoints = asyncio.run(_collect(saver.alist({"configurable": {"thread_id": thread_id}})))
+    assert checkpoints
+    asyncio.run(saver.adelete_thread(thread_id))
+    assert asyncio.run(saver.aget_tuple({"configurable": {"thread_id": thread_id}})) is None
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
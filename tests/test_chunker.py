@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pytest
+from bs4 import BeautifulSoup
+
+from chunker import Chunk, Chunker, POST_CONTENT_CLASS, chunk_stats
+from embeddings import count_tokens
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = ["headings.html", "h3_sections.html", "code_blocks.html", "long_section.html", "tiny_sections.html"]
+
+
+def _page(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("max_tokens", [30, 64, 100, 350])
+@pytest.mark.parametrize("name", PAGES)
+def test_chunks_stay_within_max_tokens(name, max_tokens):
+    chunker = Chunker(min_tokens=min(40, max_tokens // 2), max_tokens=max_tokens, overlap_tokens=max_tokens // 5)
+    chunks = chunker.chunk_html(_page(name), url=name)
+    assert chunks
+    for index, chunk in enumerate(chunks):
+        assert chunk.token_count == count_tokens(chunk.text) <= max_tokens
+        assert chunk.chunk_index == index and chunk.url == name
+
+
+def test_oversized_words_and_whitespace_heavy_code_stay_within_max_tokens():
+    url = "https://example.com/" + "a1b2c3d4" * 200
+    code = "\n".join(f"{' ' * 16}value_{i} = {i}  {' ' * 30}# note" for i in range(40))
+    html = (f"<h1>Edge cases</h1><div class=\"{POST_CONTENT_CLASS}\"><p>See {url} for details.</p>"
+            f"<pre>{code}</pre></div>")
+    chunks = Chunker(min_tokens=5, max_tokens=10, overlap_tokens=0).chunk_html(html)
+    assert all(chunk.token_count <= 10 for chunk in chunks)
+    assert any(chunk.text.startswith("value_") for chunk in chunks)
+    # The URL is cut between characters, without losing any.
+    prose = f"See {url} for details."
+    pieces = [chunk.text for chunk in chunks if chunk.end <= len(prose)]
+    assert len(pieces) > 10 and "".join(pieces) == prose
+
+
+def test_sections_split_at_h2_with_h3_kept_as_text():
+    chunks = Chunker(min_tokens=0).chunk_html(_page("headings.html"))
+    assert [chunk.section for chunk in chunks] == [
+        None, "Step 1: building the retrieval", "Step 2: building the query", "Step 3: building the engine"]
+    assert chunks[0].title == "Building a RAG pipeline step by step"
+    assert "Details of the embedding" in chunks[1].text
+    assert "Subscribe" not in " ".join(chunk.text for chunk in chunks)  # outside the content div
+    assert chunks[1].to_text().startswith(
+        "Title: Building a RAG pipeline step by step\nSection: Step 1: building the retrieval\n\n")
+
+
+def test_sections_split_at_h3_when_a_post_has_no_h2():
+    chunks = Chunker(min_tokens=0).chunk_html(_page("h3_sections.html"))
+    assert [chunk.section for chunk in chunks] == [None, "Part 1", "Part 2", "Part 3"]
+
+
+def test_code_blocks_are_split_between_lines():
+    html = _page("code_blocks.html")
+    code = BeautifulSoup(html, "html.parser").find_all("pre")[-1].get_text()
+    lines = {line.rstrip() for line in code.splitlines()}
+    chunks = Chunker(max_tokens=64, overlap_tokens=10).chunk_html(html)
+    code_chunks = [chunk for chunk in chunks if "result_" in chunk.text]
+    assert len(code_chunks) > 3
+    for chunk in code_chunks:
+        for line in chunk.text.splitlines():
+            if "result_" in line:
+                assert line in lines
+    assert any("result_59" in chunk.text for chunk in code_chunks)
+
+
+def test_consecutive_chunks_overlap_by_at_most_overlap_tokens():
+    chunks = Chunker(min_tokens=0, max_tokens=100, overlap_tokens=40).chunk_html(_page("long_section.html"))
+    overlaps = []
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.start < chunk.start and previous.end < chunk.end
+        if chunk.start < previous.end:
+            overlaps.append(count_tokens(previous.text[chunk.start - previous.start:]))
+            assert chunk.text.startswith(previous.text[chunk.start - previous.start:])
+    assert overlaps and max(overlaps) <= 40
+
+    without = Chunker(min_tokens=0, max_tokens=100, overlap_tokens=0).chunk_html(_page("long_section.html"))
+    assert all(previous.end < chunk.start for previous, chunk in zip(without, without[1:]))
+
+
+def test_tiny_sections_are_merged_into_their_neighbours():
+    separate = Chunker(min_tokens=0).chunk_html(_page("tiny_sections.html"))
+    assert len(separate) == 9 and all(chunk.token_count < 40 for chunk in separate[1:])
+
+    merged = Chunker().chunk_html(_page("tiny_sections.html"))
+    assert len(merged) == 1
+    assert merged[0].section == " / ".join(f"Tip {i}" for i in range(1, 9))
+    assert merged[0].start == separate[0].start and merged[0].end == separate[-1].end
+
+    # Merging stops where the union would exceed max_tokens.
+    capped = Chunker(min_tokens=40, max_tokens=60, overlap_tokens=10).chunk_html(_page("tiny_sections.html"))
+    assert len(capped) > 1 and all(chunk.token_count <= 60 for chunk in capped)
+
+
+def test_merge_small_only_merges_when_the_union_fits():
+    text = "alpha beta. gamma delta epsilon. zeta"
+
+    def chunk(start, end, section):
+        return Chunk(text=text[start:end], title="T", section=section, url=None, start=start, end=end,
+                     token_count=count_tokens(text[start:end]))
+
+    small, large, tail = chunk(0, 11, "A"), chunk(12, 32, "B"), chunk(33, 37, "B")
+    # `small` and `tail` are below min_tokens; only `small` fits into its neighbour.
+    chunker = Chunker(min_tokens=large.token_count, max_tokens=count_tokens(text[:32]), overlap_tokens=1)
+    assert count_tokens(text) > chunker.max_tokens
+    merged = chunker._merge_small([small, large, tail], text)
+    assert [(c.text, c.section, c.token_count) for c in merged] == [
+        ("alpha beta. gamma delta epsilon.", "A / B", chunker.max_tokens), ("zeta", "B", tail.token_count)]
+    assert chunker._merge_small([large], text) == [large]
+
+
+def test_chunk_stats_reports_count_and_token_distribution():
+    chunks = Chunker().chunk_html(_page("long_section.html"))
+    tokens = np.array([chunk.token_count for chunk in chunks])
+    stats = chunk_stats(chunks)
+    assert stats == {
+        "chunks": len(chunks),
+        "total_tokens": int(tokens.sum()),
+        "min": int(tokens.min()),
+        "p50": int(np.percentile(tokens, 50)),
+        "p95": int(np.percentile(tokens, 95)),
+        "max": int(tokens.max()),
+        "mean": float(tokens.mean()),
+    }
+    assert stats["chunks"] > 5 and stats["min"] <= stats["p50"] <= stats["p95"] <= stats["max"] <= 350
+    assert chunk_stats([])["chunks"] == 0 and chunk_stats([])["total_tokens"] == 0
+
+
+def test_signature_tracks_the_settings():
+    assert Chunker().signature == Chunker().signature
+    assert Chunker(max_tokens=100).signature != Chunker().signature
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=50, overlap_tokens=50)
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from chunker import POST_CONTENT_CLASS, Chunker
+from crawler import CARD_CLASS, CARD_TITLE_CLASS, BlogCrawler, HostRateLimiter, create_session, list_blog_posts
+
+
+def _post(title, *paragraphs):
+    body = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    return (f"<html><body><nav>build {time.time()}</nav><h1>{title}</h1>"
+            f"<div class=\"{POST_CONTENT_CLASS}\"><h2>Intro</h2>{body}</div></body></html>")
+
+
+class BlogServer(ThreadingHTTPServer):
+    """Serves `pages` (path -> {"html", "etag", "last_modified"}) and answers conditional requests."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pages = {}
+        self.requests = []  # (path, request headers)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        etag, last_modified = page.get("etag"), page.get("last_modified")
+        if (etag and self.headers.get("If-None-Match") == etag) or \
+                (last_modified and self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = page["html"].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = BlogServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _crawler(state_path, **kwargs):
+    return BlogCrawler(state_path=state_path, requests_per_second=0, session=create_session(retries=0), **kwargs)
+
+
+def _headers_for(server, path):
+    return [headers for request_path, headers in server.requests if request_path == path]
+
+
+def test_recrawl_uses_validators_and_reports_each_outcome(server, tmp_path):
+    state = str(tmp_path / "crawl_state.json")
+    server.pages = {
+        "/etag": {"html": _post("ETag post", "Served with an ETag."), "etag": '"v1"'},
+        "/modified": {"html": _post("Dated post", "Served with Last-Modified."),
+                      "last_modified": "Mon, 05 Feb 2024 10:00:00 GMT"},
+        "/plain": {"html": _post("Plain post", "No validators, same article.")},
+        "/edited": {"html": _post("Edited post", "The first version.")},
+        "/flaky": {"html": _post("Flaky post", "Up on the first crawl.")},
+        "/gone": {"html": _post("Gone post", "Delisted after the first crawl.")},
+    }
+    urls = [server.url(path) for path in server.pages]
+    first = _crawler(state).crawl(urls)
+    assert sorted(first.changed) == sorted(urls) and not first.failed
+    flaky_chunks = [chunk.text for chunk in first.chunks if chunk.url == server.url("/flaky")]
+
+    server.pages["/edited"]["html"] = _post("Edited post", "The second version.")
+    # The page around the article changes on every request; only the article is compared.
+    server.pages["/plain"]["html"] = _post("Plain post", "No validators, same article.")
+    del server.pages["/flaky"]
+    server.requests.clear()
+    second = _crawler(state).crawl(urls[:-1])
+
+    assert _headers_for(server, "/etag")[0]["If-None-Match"] == '"v1"'
+    assert _headers_for(server, "/modified")[0]["If-Modified-Since"] == "Mon, 05 Feb 2024 10:00:00 GMT"
+    assert second.changed == [server.url("/edited")]
+    assert sorted(second.unchanged) == sorted(server.url(p) for p in ("/etag", "/modified", "/plain"))
+    assert second.removed == [server.url("/gone")]
+    assert list(second.failed) == [server.url("/flaky")]
+    # A failed post keeps its previous chunks; a removed one is dropped.
+    assert [chunk.text for chunk in second.chunks if chunk.url == server.url("/flaky")] == flaky_chunks
+    assert not [chunk for chunk in second.chunks if chunk.url == server.url("/gone")]
+    assert any("second version" in chunk.text for chunk in second.chunks)
+    assert [chunk.url for chunk in second.chunks] == sorted(
+        (chunk.url for chunk in second.chunks), key=lambda url: urls.index(url))
+
+
+def test_changed_chunker_settings_rechunk_every_post(server, tmp_path):
+    state = str(tmp_path / "crawl_state.json")
+    server.pages = {"/etag": {"html": _post("ETag post", "Served with an ETag."), "etag": '"v1"'}}
+    urls = [server.url("/etag")]
+    _crawler(state).crawl(urls)
+
+    server.requests.clear()
+    result = _crawler(state, chunker=Chunker(max_tokens=100, overlap_tokens=10)).crawl(urls)
+    assert "If-None-Match" not in _headers_for(server, "/etag")[0]
+    assert result.changed == urls
+    with open(state) as f:
+        assert json.load(f)[urls[0]]["chunker"] == Chunker(max_tokens=100, overlap_tokens=10).signature
+
+
+def test_state_file_is_replaced_atomically(server, tmp_path, monkeypatch):
+    state = str(tmp_path / "crawl_state.json")
+    server.pages = {"/post": {"html": _post("Post", "Some text.")}}
+    crawler = _crawler(state)
+    crawler.crawl([server.url("/post")])
+    with open(state) as f:
+        saved = f.read()
+    assert not os.path.exists(f"{state}.tmp")
+
+    def interrupted_dump(obj, f, **kwargs):
+        f.write('{"half": ')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(json, "dump", interrupted_dump)
+    with pytest.raises(KeyboardInterrupt):
+        crawler.save_state()
+    with open(state) as f:
+        assert f.read() == saved
+
+
+def test_a_post_that_fails_to_chunk_fails_alone(server, tmp_path):
+    class FragileChunker(Chunker):
+        def chunk(self, content, title, url):
+            if title == "Malformed post":
+                raise ValueError("unbalanced markup")
+            return super().chunk(content, title, url)
+
+    state = str(tmp_path / "crawl_state.json")
+    server.pages = {"/good": {"html": _post("Good post", "Fine.")}, "/bad": {"html": _post("Malformed post", "Odd.")}}
+    urls = [server.url("/good"), server.url("/bad")]
+    result = _crawler(state, chunker=FragileChunker()).crawl(urls)
+    assert result.changed == [urls[0]]
+    assert result.failed == {urls[1]: "ValueError: unbalanced markup"}
+    with open(state) as f:
+        assert list(json.load(f)) == [urls[0]]
+
+
+def test_list_blog_posts_reads_cards_in_order(server):
+    cards = "".join(
+        f"<div class=\"{CARD_CLASS}\"><p class=\"{CARD_TITLE_CLASS}\"><a href=\"{href}\">{href}</a></p></div>"
+        for href in ("/blog/b", "/blog/a", "/blog/b")
+    )
+    server.pages = {"/blog": {"html": f"<html><body>{cards}</body></html>"}}
+    base = server.url("")
+    waited = []
+    limiter = HostRateLimiter(requests_per_second=0)
+    limiter.wait = waited.append
+    assert list_blog_posts(create_session(retries=0), server.url("/blog"), base, rate_limiter=limiter) == [
+        f"{base}/blog/b", f"{base}/blog/a"]
+    assert waited == [server.url("/blog")]
+
+
+def test_host_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(requests_per_second=20)  # 50 ms apart
+    times = []
+    lock = threading.Lock()
+
+    def request(url):
+        limiter.wait(url)
+        with lock:
+            times.append((url, time.monotonic()))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=request, args=("http://a.test/post",)) for _ in range(5)]
+    threads.append(threading.Thread(target=request, args=("http://b.test/post",)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    same_host = sorted(t for url, t in times if "a.test" in url)
+    gaps = [later - earlier for earlier, later in zip(same_host, same_host[1:])]
+    assert min(gaps) >= 0.045
+    other_host = next(t for url, t in times if "b.test" in url)
+    assert other_host - started < 0.045
+    assert HostRateLimiter(requests_per_second=0).interval == 0.0
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+import pytest
+
+from evaluation import EvalCheckpoint, LimitedLLM, TokenBucket, load_questions, question_id, run_evaluation, stub_llm
+from retriever import RetrievedChunk
+
+QUESTIONS = [
+    {"id": f"q{i}", "question": f"What does feature {i} do?"} for i in range(6)
+]
+
+
+class FakePipeline:
+    def __init__(self):
+        self.batches = []
+
+    def retrieve_batch(self, questions, k):
+        self.batches.append(list(questions))
+        return [[RetrievedChunk(index=i, score=1.0, text=f"Feature {question.split()[3]} indexes documents.")
+                 for i in range(k)] for question in questions]
+
+
+class CountingLLM:
+    """The stub LLM, counting prompts and failing the ones that mention `fail_on`."""
+
+    def __init__(self, fail_on=None):
+        self.generate = stub_llm(latency=0)
+        self.fail_on = fail_on
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise ValueError("model refused")
+        return self.generate(prompt)
+
+
+def _llm(generate, **kwargs):
+    return LimitedLLM(generate, TokenBucket(rpm=0, tpm=0), retryable_errors=(ConnectionError,), **kwargs)
+
+
+def test_token_bucket_spaces_calls_past_the_budget():
+    bucket = TokenBucket(rpm=0, tpm=6000)  # 100 tokens per second
+    started = time.monotonic()
+    bucket.acquire(6000)
+    bucket.acquire(50)
+    assert 0.45 <= time.monotonic() - started < 1.0
+    assert bucket.waited == pytest.approx(0.5, abs=0.05)
+
+    bucket.refund(50)  # unused reservation comes back at once
+    started = time.monotonic()
+    bucket.acquire(50)
+    assert time.monotonic() - started < 0.05
+
+    requests = TokenBucket(rpm=1200, tpm=0)  # 20 requests per second
+    for _ in range(1200):
+        requests.acquire(1)
+    started = time.monotonic()
+    requests.acquire(1)
+    assert 0.04 <= time.monotonic() - started < 0.2
+
+
+def test_limited_llm_retries_transient_errors_and_counts_usage():
+    failures = [ConnectionError("reset"), ConnectionError("reset")]
+
+    def generate(prompt):
+        if failures:
+            raise failures.pop()
+        return "An answer."
+
+    llm = _llm(generate, initial_delay=0.001)
+    assert llm("A question?") == "An answer."
+    assert llm.stats["calls"] == 1 and llm.stats["retries"] == 2
+    assert llm.stats["prompt_tokens"] > 0 and llm.stats["completion_tokens"] > 0
+    assert llm.cost(prompt_price=1.0, completion_price=1.0) == pytest.approx(
+        (llm.stats["prompt_tokens"] + llm.stats["completion_tokens"]) / 1000)
+
+    with pytest.raises(ValueError):
+        _llm(lambda prompt: (_ for _ in ()).throw(ValueError("bad request")))("A question?")
+
+
+def test_load_questions_reads_every_format(tmp_path):
+    (tmp_path / "q.jsonl").write_text('{"question": "A?", "id": "a"}\n\n{"question": "B?"}\n')
+    (tmp_path / "q.json").write_text(json.dumps(["A?", {"question": "B?"}]))
+    (tmp_path / "q.txt").write_text("A?\n\nB?\n")
+    assert load_questions(str(tmp_path / "q.jsonl")) == [
+        {"question": "A?", "id": "a"}, {"question": "B?", "id": question_id("B?")}]
+    assert load_questions(str(tmp_path / "q.json")) == load_questions(str(tmp_path / "q.txt")) == [
+        {"question": "A?", "id": question_id("A?")}, {"question": "B?", "id": question_id("B?")}]
+
+
+def test_checkpoint_keeps_the_last_record_and_skips_a_torn_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    checkpoint = EvalCheckpoint(str(path))
+    checkpoint.save({"id": "q0", "answer": "first"})
+    checkpoint.save({"id": "q0", "answer": "second"})
+    with open(path, "a") as f:
+        f.write('{"id": "q1", "ans')
+    assert EvalCheckpoint(str(path)).records == {"q0": {"id": "q0", "answer": "second"}}
+
+
+def test_run_evaluation_resumes_and_adds_evaluators(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    pipeline = FakePipeline()
+
+    # First run: one question fails; the others are answered and judged.
+    generate = CountingLLM(fail_on="feature 3 do?")
+    report = run_evaluation(pipeline, _llm(generate), QUESTIONS, EvalCheckpoint(path),
+                            evaluators=["faithfulness"], k=2, workers=4)
+    assert report["complete"] == 5 and list(report["failed"]) == ["q3"]
+    assert report["scores"] == {"faithfulness": 1.0}
+    assert len(pipeline.batches) == 1 and len(pipeline.batches[0]) == 6  # one batched retrieval
+    assert len(generate.prompts) == 6 + 5  # six answers attempted, five judged
+
+    # Resume: only the failed question is retrieved and answered.
+    generate = CountingLLM()
+    report = run_evaluation(pipeline, _llm(generate), QUESTIONS, EvalCheckpoint(path),
+                            evaluators=["faithfulness"], k=2, workers=4)
+    assert report["resumed"] == 5 and report["processed"] == 1 and report["complete"] == 6
+    assert pipeline.batches[-1] == ["What does feature 3 do?"]
+    assert len(generate.prompts) == 2
+
+    # A new evaluator runs on the stored answers without answering again.
+    generate = CountingLLM()
+    report = run_evaluation(pipeline, _llm(generate), QUESTIONS, EvalCheckpoint(path),
+                            evaluators=["faithfulness", "relevancy"], k=2, workers=4)
+    assert report["processed"] == 6 and len(pipeline.batches) == 2
+    assert len(generate.prompts) == 6 and all("Query and Response:" in prompt for prompt in generate.prompts)
+    record = EvalCheckpoint(path).records["q0"]
+    assert set(record["evaluations"]) == {"faithfulness", "relevancy"}
+    assert record["answer"] == "Feature 0 indexes documents." and record["sources"] == [0, 1]
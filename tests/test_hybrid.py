@@ -0,0 +1,23 @@
+import time
+
+from hybrid import LatencyBudget, reciprocal_rank_fusion, rerank_within_budget
+
+
+def test_reciprocal_rank_fusion_favours_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, -1]], rrf_k=0)
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2]
+
+
+def test_rerank_failures_and_timeouts_keep_the_fused_order():
+    def reranker(question, texts):
+        if question == "broken":
+            raise ValueError("model not loaded")
+        if question == "slow":
+            time.sleep(0.3)
+        return [float(len(text)) for text in texts]
+
+    budget = LatencyBudget(rerank_ms=100)
+    scores = rerank_within_budget(reranker, ["ok", "broken", "slow"], [["a", "bb"]] * 3, budget)
+    assert scores == [[1.0, 2.0], None, None]
+    assert budget.errors["rerank"] == 1 and budget.last_error["rerank"] == "ValueError: model not loaded"
+    assert budget.summary()["rerank"]["errors"] == 1
@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+import litellm
+import pytest
+
+import load_test_llm_control
+from llm_control import (
+    THROTTLED, AIMDLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded, LLMController, call_policy,
+    retry_after,
+)
+
+REQUEST = httpx.Request("POST", "https://fake-provider.invalid/v1/chat/completions")
+
+
+def _throttle(**headers):
+    response = httpx.Response(429, headers=headers, request=REQUEST)
+    return litellm.RateLimitError("Rate limited", llm_provider="fake", model="fake", response=response)
+
+
+def _outage():
+    return litellm.InternalServerError("Outage", llm_provider="fake", model="fake")
+
+
+def _bad_request():
+    return litellm.BadRequestError("Bad request", model="fake", llm_provider="fake")
+
+
+class Script:
+    """A fake completion that raises or returns the scripted outcomes in order, then returns "ok"."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def __call__(self, timeout=None):
+        self.calls.append(time.monotonic())
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def _controller(**kwargs):
+    kwargs.setdefault("initial_delay", 0.001)
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=3, reset_timeout=0.1))
+    return LLMController("fake", **kwargs)
+
+
+def test_retries_until_success():
+    controller = _controller()
+    fn = Script(_outage(), _throttle(), "done")
+    assert controller.call(fn) == "done"
+    stats = controller.stats
+    assert (stats["attempts"], stats["retries"], stats["failures"], stats["throttled"]) == (3, 2, 1, 1)
+    assert stats["in_flight"] == 0 and stats["circuit"] == "closed"
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    controller = _controller()
+    fn = Script(_bad_request())
+    with pytest.raises(litellm.BadRequestError):
+        controller.call(fn)
+    assert len(fn.calls) == 1 and controller.stats["in_flight"] == 0
+
+
+def test_breaker_opens_on_consecutive_failures_and_closes_after_a_probe():
+    controller = _controller(max_attempts=1)
+    for _ in range(3):
+        with pytest.raises(litellm.InternalServerError):
+            controller.call(Script(_outage()))
+    assert controller.breaker.state == "open"
+    fn = Script()
+    with pytest.raises(CircuitOpenError):
+        controller.call(fn)
+    assert not fn.calls and controller.stats["rejected"] == 1
+
+    time.sleep(0.11)
+    # The half-open probe fails: open again.
+    with pytest.raises(litellm.InternalServerError):
+        controller.call(Script(_outage()))
+    assert controller.breaker.state == "open" and controller.breaker.opened == 2
+
+    time.sleep(0.11)
+    assert controller.call(Script("probe ok")) == "probe ok"
+    assert controller.breaker.state == "closed" and controller.breaker.failures == 0
+
+
+def test_a_non_retryable_error_does_not_close_the_breaker():
+    controller = _controller(max_attempts=1)
+    for _ in range(3):
+        with pytest.raises(litellm.InternalServerError):
+            controller.call(Script(_outage()))
+    time.sleep(0.11)
+    # A 400 on the probe proves nothing about the provider; the next call may probe again.
+    with pytest.raises(litellm.BadRequestError):
+        controller.call(Script(_bad_request()))
+    assert controller.breaker.state == "half-open"
+    with pytest.raises(litellm.InternalServerError):
+        controller.call(Script(_outage()))
+    assert controller.breaker.state == "open"
+
+
+def test_aimd_limit_halves_on_throttles_and_grows_back():
+    limiter = AIMDLimiter(initial=8, minimum=1, maximum=8, decrease_cooldown=0.05)
+    limiter.record(THROTTLED)
+    limiter.record(THROTTLED)  # within the cooldown: one decrease per burst
+    assert limiter.limit == 4
+    time.sleep(0.06)
+    limiter.record(THROTTLED)
+    assert limiter.limit == 2
+    for _ in range(20):
+        limiter.record(None)
+    assert 6 < limiter.limit <= 8
+    for _ in range(100):
+        limiter.record(None)
+    assert limiter.limit == 8
+
+
+def test_throttled_calls_shrink_the_concurrency_limit():
+    controller = _controller(limiter=AIMDLimiter(initial=16, decrease_cooldown=0))
+    controller.call(Script(_throttle(), _throttle(), _throttle()))
+    assert controller.limiter.limit == 2 + 1 / 2  # 16 halved three times, then one success
+    assert controller.breaker.state == "closed"  # throttles are not failures
+
+
+def test_retry_after_is_parsed_from_provider_headers():
+    assert retry_after(_throttle(**{"retry-after-ms": "250"})) == 0.25
+    assert retry_after(_throttle(**{"retry-after": "2"})) == 2.0
+    assert retry_after(_throttle(**{"retry-after": "1m30s"})) == 90.0
+    reset = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "20ms",
+             "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6m0s"}
+    assert retry_after(_throttle(**reset)) == 360.0
+    assert retry_after(_throttle()) is None
+    assert retry_after(_outage()) is None
+
+
+def test_retry_after_is_honoured_and_pauses_other_callers():
+    controller = _controller()
+    fn = Script(_throttle(**{"retry-after-ms": "200"}))
+    controller.call(fn)
+    assert fn.calls[1] - fn.calls[0] >= 0.19
+
+    other = Script()
+    started = time.monotonic()
+    controller.pause(0.2)
+    controller.call(other)
+    assert other.calls[0] - started >= 0.19
+
+
+def test_deadlines_are_enforced():
+    controller = _controller()
+    # The provider asks for longer than the deadline allows: give up without waiting,
+    # and hold back the provider's other callers.
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        controller.call(Script(_throttle(**{"retry-after": "5"})), deadline=0.5)
+    assert time.monotonic() - started < 0.2
+
+    # Backoff that would not fit: the retry is not attempted.
+    slow = _controller(initial_delay=10.0, max_delay=10.0)
+    fn = Script(*[_outage()] * 8)
+    with pytest.raises(DeadlineExceeded):
+        slow.call(fn, deadline=0.3)
+    assert time.monotonic() - started < 1.0
+    assert slow.stats["deadline_exceeded"] == 1
+
+    # No concurrency slot frees up in time.
+    busy = _controller(limiter=AIMDLimiter(initial=1))
+    assert busy.limiter.acquire()
+    with pytest.raises(DeadlineExceeded):
+        busy.call(Script(), deadline=0.05)
+
+    # call_policy tightens the deadline and attempts of calls made inside it.
+    with call_policy(deadline=0.5):
+        with pytest.raises(DeadlineExceeded):
+            _controller().call(Script(_throttle(**{"retry-after": "1"})), deadline=60)
+    with call_policy(max_attempts=2):
+        fn = Script(_outage(), _outage(), "not reached")
+        with pytest.raises(litellm.InternalServerError):
+            _controller().call(fn, deadline=60)
+        assert len(fn.calls) == 2
+
+
+def test_async_calls_share_the_controller_state():
+    controller = _controller(limiter=AIMDLimiter(initial=2))
+    running, peak = 0, 0
+
+    async def complete(timeout=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*[controller.acall(complete) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert peak <= 3 and controller.stats["in_flight"] == 0  # the limit grows by 1/limit per success
+
+
+def test_storm_load_test_recovers():
+    args = argparse.Namespace(clients=60, rate=100.0, storm_rate=20.0, provider_concurrency=20, latency=0.05,
+                              phase_seconds=1.0, deadline=5.0, reset_timeout=0.2, naive=False)
+    assert asyncio.run(load_test_llm_control.run(args))
+
+
+def test_blog_embeddings_and_answers_run_under_the_controller():
+    import openai
+
+    from embeddings import BatchEmbedder, OpenAIEmbeddingBackend
+    from llm_control import get_controller
+    from mock_llm_server import MockBehavior, MockLLMServer, mock_embedding
+    from rag import openai_generator
+
+    server = MockLLMServer(openai=MockBehavior(latency=0, rate_limit_rate=0.5),
+                           embeddings=MockBehavior(latency=0, rate_limit_rate=0.5), seed=1).start()
+    try:
+        client = openai.OpenAI(base_url=server.openai_base, api_key="mock")
+        assert OpenAIEmbeddingBackend(client).controller is get_controller("openai")
+
+        controller = _controller()
+        embedder = BatchEmbedder(OpenAIEmbeddingBackend(client, controller=controller), max_batch_size=1)
+        vectors = embedder.embed([f"llama index chunk {i}" for i in range(6)])
+        assert vectors[2] == pytest.approx(mock_embedding("llama index chunk 2"), abs=1e-6)
+        generate = openai_generator(client, controller=controller)
+        assert generate("What is a node?") == "Mock openai reply to: What is a node?"
+        assert controller.stats["throttled"] > 0 and controller.stats["successes"] == 7
+        assert server.responses[("embeddings", 429)] + server.responses[("openai", 429)] == \
+            controller.stats["throttled"]  # the client's own retries are off
+    finally:
+        server.stop()
+
+    # Connection errors from the OpenAI SDK are retried like httpx's.
+    unreachable = openai.OpenAI(base_url="http://127.0.0.1:9/v1", api_key="mock", max_retries=0)
+    controller = _controller(max_attempts=2)
+    with pytest.raises(openai.APIConnectionError):
+        OpenAIEmbeddingBackend(unreachable, controller=controller)(["text"])
+    assert controller.stats["attempts"] == 2
@@ -0,0 +1,165 @@
+import base64
+import json
+import math
+import struct
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmark_suite import compare
+from fake_llm import FakeChatModel
+from llm_registry import clear_registry, get_llm
+from load_test_llm_router import _fake_jwt
+from mock_llm_server import EMBEDDINGS_PATH, FILLER_WORDS, MockBehavior, MockLLMServer, mock_embedding
+
+QUESTION = [{"role": "user", "content": "How does the router pick an index?"}]
+
+
+@pytest.fixture
+def server():
+    server = MockLLMServer(openai=MockBehavior(latency=0), cortex=MockBehavior(latency=0),
+                           embeddings=MockBehavior(latency=0), seed=7).start()
+    yield server
+    server.stop()
+    clear_registry()
+
+
+def _post(url, body, headers=None):
+    """POSTs JSON; returns (status, headers, raw body) for errors too."""
+    request = urllib.request.Request(url, json.dumps(body).encode(), method="POST",
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def _chat(server, **body):
+    return _post(f"{server.openai_base}/chat/completions", {"model": "gpt-3.5-turbo", "messages": QUESTION, **body})
+
+
+def _first_chunk_and_total(llm, prompt="Hello there"):
+    started = time.monotonic()
+    first = None
+    chunks = []
+    for chunk in llm.stream([HumanMessage(content=prompt)]):
+        first = first if first is not None else time.monotonic() - started
+        chunks.append(chunk.content)
+    return first, time.monotonic() - started, "".join(chunks)
+
+
+def test_fake_model_streams_with_its_timing_knobs():
+    llm = FakeChatModel(reply="one two three four five", first_token_delay=0.1, token_delay=0.02)
+    first, total, text = _first_chunk_and_total(llm)
+    assert text == "one two three four five"
+    assert 0.1 <= first < 0.15
+    assert 0.18 <= total < 0.25  # first token, then four gaps
+
+    started = time.monotonic()
+    assert llm.invoke([HumanMessage(content="Hello there")]).content == llm.reply
+    assert 0.18 <= time.monotonic() - started < 0.25
+
+    # Prefill grows with the prompt: 400 characters are about 100 tokens.
+    prefill = FakeChatModel(reply="ok", prompt_token_delay=0.001)
+    first, _, _ = _first_chunk_and_total(prefill, "x" * 400)
+    assert 0.1 <= first < 0.15
+    assert _first_chunk_and_total(FakeChatModel(reply="ok"), "x" * 400)[0] < 0.02
+
+
+def test_chat_replies_are_deterministic(server):
+    status, _, body = _chat(server)
+    reply = json.loads(body)
+    assert status == 200
+    assert reply["choices"][0]["message"]["content"] == "Mock openai reply to: How does the router pick an index?"
+    assert reply["usage"] == {"prompt_tokens": 7, "completion_tokens": 11, "total_tokens": 18}
+    assert json.loads(_chat(server)[2])["choices"] == reply["choices"]
+
+    server.behaviors["openai"].reply_tokens = 30
+    words = json.loads(_chat(server)[2])["choices"][0]["message"]["content"].split()
+    assert len(words) == 30 and words[11:] == [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(19)]
+
+
+def test_streamed_reply_rebuilds_the_text(server):
+    server.behaviors["openai"].tokens_per_second = 200
+    status, headers, body = _chat(server, stream=True)
+    assert status == 200 and headers["Content-Type"] == "text/event-stream"
+    events = [line[len("data: "):] for line in body.decode().split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event)["choices"][0] for event in events[:-1]]
+    assert "".join(chunk["delta"].get("content", "") for chunk in chunks) == \
+        "Mock openai reply to: How does the router pick an index?"
+    assert chunks[0]["delta"]["role"] == "assistant" and chunks[-1]["finish_reason"] == "stop"
+
+
+def test_seeded_errors_repeat_from_run_to_run():
+    def statuses():
+        behavior = MockBehavior(latency=0.01, rate_limit_rate=0.3, error_rate=0.2)
+        server = MockLLMServer(openai=behavior, seed=3).start()
+        try:
+            results = [_chat(server)[:2] for _ in range(20)]
+        finally:
+            server.stop()
+        assert all(headers["retry-after-ms"] == "11" for status, headers in results if status == 429)
+        return [status for status, _ in results]
+
+    first = statuses()
+    assert first == statuses()
+    assert {200, 429, 500} <= set(first)
+
+
+def test_cortex_checks_the_key_pair_jwt(server):
+    def complete(token=None, token_type="KEYPAIR_JWT"):
+        headers = {"X-Snowflake-Authorization-Token-Type": token_type}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return _post(server.cortex_url, {"model": "mistral-7b", "messages": QUESTION}, headers)[0]
+
+    valid, _ = _fake_jwt(60)
+    expired, _ = _fake_jwt(-1)
+    assert complete() == 401
+    assert complete(valid, token_type="OAUTH") == 401
+    assert complete(expired) == 401
+    assert complete(valid) == 200
+    assert server.responses == {("cortex", 401): 3, ("cortex", 200): 1}
+
+
+def test_embeddings_are_normalized_and_deterministic(server):
+    url = f"{server.url}{EMBEDDINGS_PATH}"
+    texts = ["llama index retrieval", "Retrieval, llama index.", "unrelated cooking recipe"]
+    status, _, body = _post(url, {"model": "text-embedding-3-small", "input": texts})
+    vectors = [item["embedding"] for item in json.loads(body)["data"]]
+    assert status == 200 and len(vectors[0]) == 256
+    assert vectors[0] == vectors[1] == mock_embedding(texts[0])  # the same bag of words
+    assert math.isclose(sum(x * x for x in vectors[2]), 1.0)
+    assert abs(sum(a * b for a, b in zip(vectors[0], vectors[2]))) < 0.5
+
+    _, _, body = _post(url, {"input": "llama index retrieval", "dimensions": 64, "encoding_format": "base64"})
+    packed = base64.b64decode(json.loads(body)["data"][0]["embedding"])
+    assert struct.unpack("<64f", packed) == pytest.approx(mock_embedding(texts[0], 64), abs=1e-6)
+
+
+def test_litellm_reaches_the_mock_through_api_base(server):
+    llm = get_llm("gpt-3.5-turbo", api_base=server.openai_base, api_key="mock")
+    prompt = [HumanMessage(content="What is a node parser?")]
+    assert llm.invoke(prompt).content == "Mock openai reply to: What is a node parser?"
+    assert "".join(chunk.content for chunk in llm.stream(prompt)) == "Mock openai reply to: What is a node parser?"
+    assert server.responses[("openai", 200)] == 2
+
+
+def test_compare_flags_only_timed_regressions(capsys):
+    baseline = {"commit": "abc123", "results": {
+        "single_turn": {"invoke_p50_s": 0.10, "stream_ttft_p50_s": 0.05},
+        "retrieval": {"batch_per_s": 100.0, "recall": 0.9, "missing_s": 0.0},
+    }}
+    results = {
+        "single_turn": {"invoke_p50_s": 0.13, "stream_ttft_p50_s": 0.04, "new_metric_s": 1.0},
+        "retrieval": {"batch_per_s": 70.0, "recall": 0.5, "missing_s": 5.0},
+    }
+    assert compare(baseline, results, max_regression=20) == [
+        "single_turn.invoke_p50_s +30.0%", "retrieval.batch_per_s -30.0%"]
+    assert compare(baseline, results, max_regression=None) == []
+    assert "Change vs abc123:" in capsys.readouterr().out
@@ -0,0 +1,87 @@
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from mock_llm_server import mock_embedding
+from response_cache import ResponseCache
+
+MODEL = "gpt-3.5-turbo"
+SYSTEM = SystemMessage(content="You are a helpful assistant.")
+
+
+def _prompt(question, *history):
+    return [SYSTEM, *history, HumanMessage(content=question)]
+
+
+def _cache(**kwargs):
+    return ResponseCache(embed_fn=mock_embedding, **kwargs)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = _cache()
+    cache.store(_prompt("What is LlamaIndex?"), MODEL, 0.0, "A data framework.")
+    hit = cache.lookup(_prompt("  what is   llamaindex? "), MODEL, 0.0)
+    assert hit.content == "A data framework." and hit.tier == "exact"
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_near_duplicate_is_a_semantic_hit():
+    cache = _cache()
+    cache.store(_prompt("What is LlamaIndex used for?"), MODEL, 0.0, "Building RAG apps.")
+    hit = cache.lookup(_prompt("what is llamaindex used for"), MODEL, 0.0)
+    assert hit.tier == "semantic" and hit.similarity >= cache.similarity_threshold
+    assert cache.lookup(_prompt("How do I tune a vector index?"), MODEL, 0.0) is None
+
+
+def test_semantic_matches_stay_within_their_group():
+    cache = _cache()
+    cache.store(_prompt("What is LlamaIndex used for?"), MODEL, 0.0, "Building RAG apps.")
+    question = "what is llamaindex used for"
+    # Different earlier conversation, model or parameters: no match.
+    assert cache.lookup(_prompt(question, HumanMessage(content="Hi, I'm Ann.")), MODEL, 0.0) is None
+    assert cache.lookup(_prompt(question), "gpt-4o", 0.0) is None
+    assert cache.lookup(_prompt(question), MODEL, 0.0, max_tokens=100) is None
+
+
+def test_turn_context_is_in_the_exact_key_but_not_the_group():
+    cache = _cache()
+    question = _prompt("What is LlamaIndex used for?")
+    cache.store(question, MODEL, 0.0, "Grounded answer.", context=SystemMessage(content="Excerpt A"))
+    same = cache.lookup(question, MODEL, 0.0, context=SystemMessage(content="Excerpt A"))
+    assert same.tier == "exact"
+    # Other chunks for the same question: not an exact hit, but still found semantically.
+    other = cache.lookup(question, MODEL, 0.0, context=SystemMessage(content="Excerpt B"))
+    assert other.tier == "semantic" and other.content == "Grounded answer."
+
+
+def test_sampled_requests_bypass_the_cache_unless_allowed():
+    cache = _cache()
+    cache.store(_prompt("Tell me a joke"), MODEL, 0.7, "Not cached.")
+    assert cache.stats()["entries"] == 0
+    assert cache.lookup(_prompt("Tell me a joke"), MODEL, 0.7) is None
+    assert cache.stats()["bypassed"] == 1
+
+    cache.store(_prompt("Tell me a joke"), MODEL, 0.7, "Cached.", allow_sampled=True)
+    assert cache.lookup(_prompt("Tell me a joke"), MODEL, 0.7) is None
+    assert cache.lookup(_prompt("Tell me a joke"), MODEL, 0.7, allow_sampled=True).content == "Cached."
+    # A sampled answer is not served to a request at another temperature.
+    assert cache.lookup(_prompt("Tell me a joke"), MODEL, 0.0) is None
+
+
+def test_entries_persist_and_evict(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=path, max_entries=2)
+    for i in range(3):
+        cache.store(_prompt(f"question {i}"), MODEL, 0.0, f"answer {i}")
+    assert cache.stats()["evictions"] == 1
+    reloaded = ResponseCache(db_path=path, max_entries=2)
+    assert reloaded.lookup(_prompt("question 0"), MODEL, 0.0) is None
+    assert reloaded.lookup(_prompt("question 2"), MODEL, 0.0).content == "answer 2"
+
+
+def test_clear_forgets_entries_and_embeddings():
+    calls = []
+    cache = ResponseCache(embed_fn=lambda text: calls.append(text) or mock_embedding(text))
+    cache.store(_prompt("What is LlamaIndex used for?"), MODEL, 0.0, "Building RAG apps.")
+    cache.clear()
+    assert cache.lookup(_prompt("what is llamaindex used for"), MODEL, 0.0) is None
+    cache.store(_prompt("What is LlamaIndex used for?"), MODEL, 0.0, "Building RAG apps.")
+    assert calls.count("what is llamaindex used for?") == 2  # embedded again after the clear
@@ -0,0 +1,124 @@
+import os
+
+import pytest
+import streamlit as st
+from langchain_core.messages import HumanMessage
+from streamlit.testing.v1 import AppTest
+
+from mock_llm_server import MockBehavior, MockLLMServer
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit-chatbot.py")
+PAGE_SIZE = 20
+
+
+@pytest.fixture
+def app(monkeypatch):
+    server = MockLLMServer(openai=MockBehavior(latency=0)).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("OPENAI_API_BASE", server.openai_base)
+    monkeypatch.setenv("CHATBOT_MODEL", "gpt-3.5-turbo")
+    monkeypatch.setenv("CHATBOT_BLOG_INDEX_DIR", "/nonexistent")
+    st.cache_resource.clear()  # a fresh shared chatbot (and checkpointer) per test
+    at = AppTest.from_file(SCRIPT, default_timeout=120).run()
+    yield at
+    st.cache_resource.clear()
+    server.stop()
+
+
+def _chat(at, turns):
+    """Sends `turns` messages, then reruns: a turn's own messages are drawn live, below the window."""
+    for i in range(turns):
+        at.chat_input(key="chat_input").set_value(f"Question {i} about llama-index").run()
+        assert not at.exception, at.exception
+    at.run()
+
+
+def _drawn(at):
+    return [message.markdown[0].value for message in at.chat_message]
+
+
+def _buttons(at):
+    return [button.label for button in at.button]
+
+
+def test_only_the_latest_page_is_drawn(app):
+    _chat(app, 11)  # 22 messages
+    drawn = _drawn(app)
+    assert len(drawn) == PAGE_SIZE
+    assert drawn[0] == "Question 1 about llama-index"
+    assert drawn[-1] == "Mock openai reply to: Question 10 about llama-index"
+    assert "Show earlier messages (2 more)" in _buttons(app)
+
+    entry = app.session_state["history_view"]["entries"][-1]
+    assert entry["role"] == "assistant" and "generation_ms" in entry["timings"]
+    assert entry["timings"]["index"] != "ready" and entry["sources"] == []
+
+    app.button(key="show_earlier").click().run()
+    drawn = _drawn(app)
+    assert len(drawn) == 23 and drawn[0].startswith("Hello!")  # the greeting, then all 22 messages
+    assert not any(label.startswith("Show earlier") for label in _buttons(app))
+
+
+def test_the_window_is_reread_only_when_it_changed(app):
+    _chat(app, 2)
+    key = app.session_state["history_view"]["key"]
+    assert key == (app.session_state["thread_id"], 2, PAGE_SIZE)
+
+    # Drop the thread behind the page's back: plain reruns keep drawing the cached window.
+    app.session_state["chatbot_app"].checkpointer.delete_thread(app.session_state["thread_id"])
+    app.run()
+    assert len(_drawn(app)) == 1 + 4 and app.session_state["history_view"]["key"] == key
+
+    # A new turn re-reads the checkpointer, which now only has that turn.
+    _chat(app, 1)
+    assert _drawn(app)[1:] == ["Question 0 about llama-index", "Mock openai reply to: Question 0 about llama-index"]
+    assert "expired" in app.warning[0].value
+
+
+def test_an_evicted_thread_is_reported(app):
+    _chat(app, 2)
+    assert not app.warning
+    chatbot = app.session_state["chatbot_app"]
+    chatbot.checkpointer.max_threads = 1
+    # Another session's turn pushes this one out of the in-memory checkpointer.
+    chatbot.invoke({"messages": [HumanMessage(content="Hi")]}, config={"configurable": {"thread_id": "other"}})
+    assert chatbot.checkpointer.evictions == 1
+
+    _chat(app, 1)
+    assert "expired from the server's memory" in app.warning[0].value
+    assert _drawn(app)[1:] == ["Question 0 about llama-index", "Mock openai reply to: Question 0 about llama-index"]
+
+    # Once said, the warning goes away with the next turn.
+    _chat(app, 1)
+    assert not app.warning and len(_drawn(app)) == 1 + 4
+
+
+def test_clear_conversation_starts_a_new_window(app):
+    _chat(app, 11)
+    app.button(key="show_earlier").click().run()
+    old_thread = app.session_state["thread_id"]
+    checkpointer = app.session_state["chatbot_app"].checkpointer
+
+    app.button[_buttons(app).index("Clear Conversation")].click().run()
+    assert app.session_state["thread_id"] != old_thread
+    assert app.session_state["history_limit"] == PAGE_SIZE
+    assert _drawn(app) == [_drawn(app)[0]] and _drawn(app)[0].startswith("Hello!")
+    assert checkpointer.get_tuple({"configurable": {"thread_id": old_thread}}) is None
+
+    _chat(app, 1)
+    assert len(_drawn(app)) == 3
+
+
+def test_a_failed_warmup_is_retried(app, monkeypatch, tmp_path):
+    # The shared chatbot was built by the fixture; start over with a checkpoint file that can't be opened.
+    st.cache_resource.clear()
+    app.session_state["chatbot_app"] = None
+    monkeypatch.setenv("CHATBOT_CHECKPOINT_DB", str(tmp_path / "missing" / "chat.db"))
+    app.run()
+    app.chat_input(key="chat_input").set_value("Question 0 about llama-index").run()
+    assert "unable to open database file" in app.error[0].value
+
+    monkeypatch.setenv("CHATBOT_CHECKPOINT_DB", str(tmp_path / "chat.db"))
+    _chat(app, 1)
+    assert not app.error
+    assert _drawn(app)[-1] == "Mock openai reply to: Question 0 about llama-index"
@@ -0,0 +1,149 @@
+import asyncio
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import telemetry
+from async_chatbot import create_async_chatbot
+from fake_llm import FakeChatModel
+
+
+@pytest.fixture(autouse=True)
+def disabled():
+    telemetry.configure(enabled=False, exporters=[])
+    yield
+    telemetry.configure(enabled=False, exporters=[])
+
+
+def _ended(name, duration, error=None, **attributes):
+    """A finished span with a fixed duration, for the exporters."""
+    with telemetry.collect():
+        span = telemetry.start_span(name, **attributes)
+    span.end(error)
+    span.duration = duration
+    return span
+
+
+def test_spans_are_no_ops_unless_recording():
+    assert not telemetry.recording()
+    with telemetry.span("chat.turn") as span:
+        telemetry.annotate(ignored=True)
+    assert span is telemetry.NOOP_SPAN
+
+
+def test_collect_records_nested_spans_of_its_context():
+    @telemetry.traced("node.model")
+    def model():
+        telemetry.annotate(tokens=3)
+        return "reply"
+
+    @telemetry.traced("node.retrieve")
+    async def retrieve():
+        with telemetry.span("index.search", k=3):
+            await asyncio.sleep(0)
+        raise TimeoutError("index busy")
+
+    async def turn():
+        with telemetry.span("chat.turn", thread_id="t1"):
+            assert model() == "reply"
+            with pytest.raises(TimeoutError):
+                await asyncio.create_task(retrieve())
+
+    with telemetry.collect() as spans:
+        asyncio.run(turn())
+
+    by_name = {span.name: span for span in spans}
+    assert [span.name for span in spans] == ["node.model", "index.search", "node.retrieve", "chat.turn"]
+    root = by_name["chat.turn"]
+    assert {span.trace_id for span in spans} == {root.trace_id} and root.parent_id is None
+    assert by_name["node.model"].parent_id == by_name["node.retrieve"].parent_id == root.span_id
+    assert by_name["index.search"].parent_id == by_name["node.retrieve"].span_id
+    assert by_name["node.model"].attributes == {"tokens": 3}
+    assert by_name["node.retrieve"].error == "TimeoutError: index busy"
+    assert all(span.duration is not None for span in spans)
+    assert not telemetry.recording()
+
+    rows = telemetry.span_rows(spans)
+    assert [row["span"] for row in rows] == ["chat.turn", "  node.model", "  node.retrieve", "    index.search"]
+    assert rows[0]["thread_id"] == "t1" and rows[2]["error"] == "TimeoutError: index busy"
+
+
+def test_graph_nodes_and_checkpoints_are_spans():
+    app = create_async_chatbot(llm=FakeChatModel())
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    async def run():
+        with telemetry.collect() as spans:
+            await app.ainvoke({"messages": [HumanMessage(content=f"hello {uuid.uuid4()}")]}, config=config)
+        return spans
+
+    names = {span.name for span in asyncio.run(run())}
+    assert {"node.history", "node.model", "checkpoint.load", "checkpoint.save"} <= names
+
+
+def test_prometheus_exporter_renders_histograms_and_counters():
+    exporter = telemetry.PrometheusExporter(buckets=(0.1, 1.0))
+    exporter.on_end(_ended("node.model", 0.05))
+    exporter.on_end(_ended("node.model", 0.5, error=ValueError("bad")))
+    exporter.on_end(_ended("llm.call", 2.0, model="gpt-3.5-turbo", queue_wait_s=0.0, ttft_s=0.25,
+                           prompt_tokens=12, completion_tokens=30))
+    assert exporter.render() == "\n".join([
+        "# TYPE chatbot_llm_queue_wait_seconds histogram",
+        'chatbot_llm_queue_wait_seconds_bucket{model="gpt-3.5-turbo",le="0.1"} 1',
+        'chatbot_llm_queue_wait_seconds_bucket{model="gpt-3.5-turbo",le="1.0"} 1',
+        'chatbot_llm_queue_wait_seconds_bucket{model="gpt-3.5-turbo",le="+Inf"} 1',
+        'chatbot_llm_queue_wait_seconds_sum{model="gpt-3.5-turbo"} 0.0',
+        'chatbot_llm_queue_wait_seconds_count{model="gpt-3.5-turbo"} 1',
+        "# TYPE chatbot_llm_ttft_seconds histogram",
+        'chatbot_llm_ttft_seconds_bucket{model="gpt-3.5-turbo",le="0.1"} 0',
+        'chatbot_llm_ttft_seconds_bucket{model="gpt-3.5-turbo",le="1.0"} 1',
+        'chatbot_llm_ttft_seconds_bucket{model="gpt-3.5-turbo",le="+Inf"} 1',
+        'chatbot_llm_ttft_seconds_sum{model="gpt-3.5-turbo"} 0.25',
+        'chatbot_llm_ttft_seconds_count{model="gpt-3.5-turbo"} 1',
+        "# TYPE chatbot_span_duration_seconds histogram",
+        'chatbot_span_duration_seconds_bucket{span="llm.call",le="0.1"} 0',
+        'chatbot_span_duration_seconds_bucket{span="llm.call",le="1.0"} 0',
+        'chatbot_span_duration_seconds_bucket{span="llm.call",le="+Inf"} 1',
+        'chatbot_span_duration_seconds_sum{span="llm.call"} 2.0',
+        'chatbot_span_duration_seconds_count{span="llm.call"} 1',
+        'chatbot_span_duration_seconds_bucket{span="node.model",le="0.1"} 1',
+        'chatbot_span_duration_seconds_bucket{span="node.model",le="1.0"} 2',
+        'chatbot_span_duration_seconds_bucket{span="node.model",le="+Inf"} 2',
+        'chatbot_span_duration_seconds_sum{span="node.model"} 0.55',
+        'chatbot_span_duration_seconds_count{span="node.model"} 2',
+        "# TYPE chatbot_llm_tokens_total counter",
+        'chatbot_llm_tokens_total{model="gpt-3.5-turbo",kind="completion"} 30.0',
+        'chatbot_llm_tokens_total{model="gpt-3.5-turbo",kind="prompt"} 12.0',
+        "# TYPE chatbot_span_errors_total counter",
+        'chatbot_span_errors_total{span="node.model"} 1.0',
+    ]) + "\n"
+
+
+def test_configured_exporters_see_every_span_and_serve_metrics():
+    exporter = telemetry.PrometheusExporter()
+    telemetry.configure(enabled=True, exporters=[exporter])
+    with telemetry.span("chat.turn"):
+        pass
+    telemetry.configure(enabled=False, exporters=[])
+    with telemetry.span("chat.turn"):
+        pass
+
+    exporter.serve(port=0, host="127.0.0.1")
+    try:
+        base = f"http://127.0.0.1:{exporter._server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'chatbot_span_duration_seconds_count{span="chat.turn"} 1\n' in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other")
+    finally:
+        exporter.close()
+
+
+def test_prometheus_label_values_are_escaped():
+    exporter = telemetry.PrometheusExporter(buckets=())
+    exporter.on_end(_ended("llm.call", 1.0, model='ft:gpt "a"\\b\nc', prompt_tokens=5))
+    assert 'chatbot_llm_tokens_total{model="ft:gpt \\"a\\"\\\\b\\nc",kind="prompt"} 5.0\n' in exporter.render()
@@ -0,0 +1,62 @@
+import os
+import threading
+
+import numpy as np
+
+from embeddings import BatchEmbedder, FakeEmbeddingBackend
+from vector_store import VECTORS_FILE, VectorStore, _append_npy
+
+
+def _rows(start, count, dimension=4):
+    return np.arange(start, start + count, dtype=np.float32)[:, None].repeat(dimension, axis=1)
+
+
+def _check_aligned(store):
+    for i in range(len(store)):
+        assert store.vectors[i][0] == i
+        assert store.text(i) == f"text {i}"
+        assert store.metadata(i) == {"row": i}
+
+
+def test_append_and_reopen(tmp_path):
+    path = str(tmp_path / "store")
+    store = VectorStore.from_arrays(path, _rows(0, 3), [f"text {i}" for i in range(3)],
+                                    [{"row": i} for i in range(3)], model="fake")
+    store.append(_rows(3, 2), ["text 3", "text 4"], [{"row": 3}, {"row": 4}])
+    reopened = VectorStore.open(path)
+    assert len(reopened) == 5 and reopened.version == 2
+    _check_aligned(reopened)
+
+
+def test_append_after_an_interrupted_append_drops_the_orphan_rows(tmp_path):
+    path = str(tmp_path / "store")
+    store = VectorStore.from_arrays(path, _rows(0, 3), [f"text {i}" for i in range(3)],
+                                    [{"row": i} for i in range(3)], model="fake")
+    # A crash after the rows were written but before the manifest was replaced:
+    # the vectors got their rows and header, the texts only their data bytes.
+    _append_npy(os.path.join(path, VECTORS_FILE), _rows(100, 2))
+    with open(os.path.join(path, "texts.bin"), "ab") as f:
+        f.write(b"orphan text")
+    assert len(VectorStore.open(path)) == 3
+
+    store.append(_rows(3, 2), ["text 3", "text 4"], [{"row": 3}, {"row": 4}])
+    reopened = VectorStore.open(path)
+    assert len(reopened) == 5
+    assert np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r").shape == (5, 4)
+    _check_aligned(reopened)
+
+
+def test_embedder_stats_count_every_text_across_threads():
+    embedder = BatchEmbedder(FakeEmbeddingBackend(dimensions=8), max_batch_size=2)
+    threads = [
+        threading.Thread(target=lambda t=t: [embedder.embed([f"thread {t} text {i}" for i in range(4)])
+                                             for _ in range(50)])
+        for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert embedder.stats["texts"] == 8 * 50 * 4
+    assert embedder.stats["embedded"] == 8 * 50 * 4  # no cache: every call embeds its texts
+    assert embedder.stats["requests"] == 8 * 50 * 2